@@ -0,0 +1,48 @@
+"""add change_log
+
+Revision ID: 6c46a78f8098
+Revises: 366782842de9
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c46a78f8098'
+down_revision: Union[str, Sequence[str], None] = '366782842de9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "change_log",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column(
+            "txid",
+            sa.BigInteger(),
+            nullable=False,
+            server_default=sa.text("(pg_current_xact_id()::text)::bigint"),
+        ),
+        sa.Column("resource_type", sa.String(), nullable=False),
+        sa.Column("resource_id", sa.String(), nullable=False),
+        sa.Column("op", sa.String(), nullable=False),
+        sa.Column("changed_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("NOW()")),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    # index: 依 cursor 讀取、依時間清理
+    op.create_index("idx_change_log_txid_id", "change_log", ["txid", "id"], unique=False)
+    op.create_index("idx_change_log_changed_at", "change_log", ["changed_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("idx_change_log_changed_at", table_name="change_log")
+    op.drop_index("idx_change_log_txid_id", table_name="change_log")
+    op.drop_table("change_log")
@@ -0,0 +1,51 @@
+"""add pii purge progress and pii_date indexes
+
+Revision ID: b2f4c81d9e57
+Revises: 6c46a78f8098
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2f4c81d9e57'
+down_revision: Union[str, Sequence[str], None] = '6c46a78f8098'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "pii_purge_progress",
+        sa.Column("table_name", sa.String(), nullable=False),
+        sa.Column("cursor_pii_date", sa.BigInteger(), nullable=True),
+        sa.Column("cursor_id", sa.String(), nullable=True),
+        sa.Column("scrubbed_count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("last_completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("NOW()")),
+        sa.PrimaryKeyConstraint("table_name"),
+    )
+
+    # index: 依 (pii_date, id) keyset 分批；CONCURRENTLY 避免建立期間擋住寫入
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_human_resources_pii_date_id", "human_resources", ["pii_date", "id"],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            "idx_supplies_pii_date_id", "supplies", ["pii_date", "id"],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("idx_supplies_pii_date_id", table_name="supplies", postgresql_concurrently=True)
+        op.drop_index("idx_human_resources_pii_date_id", table_name="human_resources", postgresql_concurrently=True)
+    op.drop_table("pii_purge_progress")
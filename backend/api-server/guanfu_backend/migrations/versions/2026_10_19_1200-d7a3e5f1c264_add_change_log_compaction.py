@@ -0,0 +1,35 @@
+"""add change_log_compaction
+
+Revision ID: d7a3e5f1c264
+Revises: b2f4c81d9e57
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3e5f1c264'
+down_revision: Union[str, Sequence[str], None] = 'b2f4c81d9e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "change_log_compaction",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("deleted_txid", sa.BigInteger(), nullable=False),
+        sa.Column("deleted_id", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("NOW()")),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("change_log_compaction")
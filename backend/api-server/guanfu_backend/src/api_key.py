@@ -15,8 +15,12 @@ def _parse_allowlist(raw_values: str) -> set[str]:
     return {item.strip() for item in raw_values.split(",") if item.strip()}
 
 
-def _allowed_keys() -> set[str]:
-    return _parse_allowlist(settings.ALLOW_MODIFY_API_KEY_LIST)
+# settings 於啟動時載入後不會再變動，allowlist 只需解析一次
+_ALLOWED_KEYS: frozenset[str] = frozenset(_parse_allowlist(settings.ALLOW_MODIFY_API_KEY_LIST))
+
+
+def _allowed_keys() -> frozenset[str]:
+    return _ALLOWED_KEYS
 
 
 api_key_header_scheme = APIKeyHeader(name="X-Api-Key", auto_error=False)
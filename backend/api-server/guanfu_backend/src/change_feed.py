@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import event, text, tuple_
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# 會寫入 change_log 的資源；resource_type 即資料表名稱（與 API 路徑一致）
+TRACKED_MODELS = (
+    models.VolunteerOrganization,
+    models.Shelter,
+    models.MedicalStation,
+    models.MentalHealthResource,
+    models.Accommodation,
+    models.ShowerStation,
+    models.WaterRefillStation,
+    models.Restroom,
+    models.HumanResource,
+    models.Supply,
+    models.SupplyItem,
+    models.Report,
+    models.SupplyProvider,
+    models.Place,
+    models.RequirementsHr,
+    models.RequirementsSupplies,
+)
+TRACKED_TYPES = frozenset(m.__tablename__ for m in TRACKED_MODELS)
+
+# 即時推播（/stream）使用的 Postgres NOTIFY channel
+NOTIFY_CHANNEL = "guanfu_changes"
+
+# 子資源的異動也推播到上層資源的 topic，例如 supply_items 的進度會送到 supplies:{supply_id}
+PARENT_TOPICS = {
+    models.SupplyItem: ("supplies", "supply_id"),
+    models.RequirementsHr: ("places", "place_id"),
+    models.RequirementsSupplies: ("places", "place_id"),
+}
+
+# 進度欄位直接附在推播內容中，訂閱端不必再查詢一次
+PROGRESS_FIELDS = ("received_count", "total_number", "require_count")
+
+
+# ===================================================================
+# 寫入：在 flush 前收集新增 / 修改 / 刪除的資源
+# ===================================================================
+
+@event.listens_for(SessionLocal, "before_flush")
+def _record_changes(session: Session, flush_context, instances) -> None:
+    """
+    crud、supplies 與 requirements 等所有寫入路徑都會經過 flush，
+    在這裡統一寫入 change_log，和資料異動同一個交易提交或回滾。
+    """
+    entries = []
+    for obj in session.new:
+        if isinstance(obj, TRACKED_MODELS):
+            if obj.id is None:
+                # 主鍵預設值要到 INSERT 時才產生，這裡先補上才能記錄
+                obj.id = models.generate_uuid_str()
+            entries.append((obj, "created"))
+    for obj in session.dirty:
+        if isinstance(obj, TRACKED_MODELS) and session.is_modified(obj, include_collections=False):
+            entries.append((obj, "updated"))
+    for obj in session.deleted:
+        if isinstance(obj, TRACKED_MODELS):
+            entries.append((obj, "deleted"))
+
+    notifications = session.info.setdefault("change_notifications", [])
+    for obj, op in entries:
+        session.add(models.ChangeLog(resource_type=obj.__tablename__, resource_id=str(obj.id), op=op))
+        notifications.append(_notification_payload(obj, op))
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _notify_changes(session: Session, flush_context) -> None:
+    """
+    以 pg_notify 送出本次 flush 的異動。NOTIFY 屬於交易的一部分，
+    只有在 commit 後才會送達各 worker 的 LISTEN 連線，rollback 則不會送出。
+    """
+    notifications = session.info.pop("change_notifications", None)
+    if not notifications:
+        return
+    connection = session.connection()
+    for payload in notifications:
+        connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": payload})
+
+
+def _notification_payload(obj, op: str) -> str:
+    resource_type = obj.__tablename__
+    resource_id = str(obj.id)
+    topics = [resource_type, f"{resource_type}:{resource_id}"]
+    parent = PARENT_TOPICS.get(type(obj))
+    if parent is not None:
+        parent_type, parent_field = parent
+        parent_id = getattr(obj, parent_field)
+        if parent_id is not None:
+            topics += [parent_type, f"{parent_type}:{parent_id}"]
+
+    payload = {"type": resource_type, "id": resource_id, "op": op, "topics": topics}
+    data = {field: getattr(obj, field) for field in PROGRESS_FIELDS if hasattr(obj, field)}
+    if data:
+        payload["data"] = data
+    return json.dumps(payload, ensure_ascii=False)
+
+
+# ===================================================================
+# 讀取：/changes
+# ===================================================================
+
+def encode_cursor(txid: int, change_id: int) -> str:
+    return f"{txid}-{change_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        txid, change_id = cursor.split("-", 1)
+        return int(txid), int(change_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def get_changes(
+    db: Session, since: Optional[str], types: Optional[List[str]], limit: int
+) -> Tuple[List[models.ChangeLog], Optional[str], bool]:
+    """
+    依 (txid, id) 順序取回 since 之後的異動。
+    只回傳 txid 小於目前 snapshot xmin 的紀錄（寫入交易皆已結束），
+    因此之後不會再出現排在 cursor 之前的新紀錄，輪詢端不會漏接。
+
+    Returns:
+        (紀錄, 下一次要帶的 cursor, 是否還有更多)
+    """
+    xmin = db.execute(text("SELECT (pg_snapshot_xmin(pg_current_snapshot())::text)::bigint")).scalar()
+    query = db.query(models.ChangeLog).filter(models.ChangeLog.txid < xmin)
+
+    if since:
+        since_txid, since_id = decode_cursor(since)
+        # 與輪詢同樣以 (txid, id) 比較；cursor 那一筆本身被清除不影響，之後的紀錄有被清除才需要重新全量同步
+        compaction = db.get(models.ChangeLogCompaction, _COMPACTION_ROW_ID)
+        if compaction is not None and (since_txid, since_id) < (compaction.deleted_txid, compaction.deleted_id):
+            raise HTTPException(status_code=410, detail="Cursor expired, please resync from scratch")
+        query = query.filter(
+            tuple_(models.ChangeLog.txid, models.ChangeLog.id) > tuple_(since_txid, since_id)
+        )
+
+    if types:
+        query = query.filter(models.ChangeLog.resource_type.in_(types))
+
+    rows = query.order_by(models.ChangeLog.txid, models.ChangeLog.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].txid, rows[-1].id) if rows else since
+    return rows, next_cursor, has_more
+
+
+# ===================================================================
+# 清理：定期刪除超過保留期限的紀錄
+# ===================================================================
+
+_COMPACTION_ROW_ID = 1
+
+
+def compact_change_log(db: Session, retention_days: int, batch_size: int = 5000) -> int:
+    """
+    分批刪除超過保留期限的紀錄，避免單一大交易長時間鎖表。
+    依 (txid, id) 順序只刪除第一筆未過期紀錄之前的部分（並保留最新一筆），
+    已刪除的紀錄都排在剩下的紀錄之前；刪除的最後一筆與刪除在同一個交易中記錄到 change_log_compaction，
+    供 /changes 判斷 cursor 之後是否有紀錄已被刪除。
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    deleted = 0
+    while True:
+        result = db.execute(
+            text(
+                """
+                DELETE FROM change_log
+                WHERE id IN (
+                    SELECT id FROM change_log
+                    WHERE (txid, id) < (
+                        SELECT txid, id FROM (
+                            (SELECT txid, id FROM change_log
+                             WHERE changed_at >= :cutoff
+                             ORDER BY txid, id LIMIT 1)
+                            UNION ALL
+                            (SELECT txid, id FROM change_log
+                             ORDER BY txid DESC, id DESC LIMIT 1)
+                        ) AS boundary
+                        ORDER BY txid, id
+                        LIMIT 1
+                    )
+                    ORDER BY txid, id
+                    LIMIT :batch_size
+                )
+                RETURNING txid, id
+                """
+            ),
+            {"cutoff": cutoff, "batch_size": batch_size},
+        ).all()
+        if result:
+            _record_compaction(db, max((row.txid, row.id) for row in result))
+        db.commit()
+        deleted += len(result)
+        if len(result) < batch_size:
+            return deleted
+
+
+def _record_compaction(db: Session, last_deleted: Tuple[int, int]) -> None:
+    """記錄已刪除的最後一筆 (txid, id)，只會往後推進"""
+    txid, change_id = last_deleted
+    db.execute(
+        text(
+            """
+            INSERT INTO change_log_compaction (id, deleted_txid, deleted_id)
+            VALUES (:row_id, :txid, :change_id)
+            ON CONFLICT (id) DO UPDATE
+            SET deleted_txid = EXCLUDED.deleted_txid, deleted_id = EXCLUDED.deleted_id, updated_at = NOW()
+            WHERE (change_log_compaction.deleted_txid, change_log_compaction.deleted_id)
+                < (EXCLUDED.deleted_txid, EXCLUDED.deleted_id)
+            """
+        ),
+        {"row_id": _COMPACTION_ROW_ID, "txid": txid, "change_id": change_id},
+    )
+
+
+def _run_compaction() -> int:
+    db = SessionLocal()
+    try:
+        return compact_change_log(db, settings.CHANGE_LOG_RETENTION_DAYS)
+    finally:
+        db.close()
+
+
+async def compaction_loop() -> None:
+    """在 lifespan 中啟動的背景工作，每 CHANGE_LOG_COMPACT_INTERVAL_SECONDS 清理一次"""
+    while True:
+        try:
+            deleted = await asyncio.to_thread(_run_compaction)
+            if deleted:
+                logger.info(f"change_log compacted: {deleted} rows removed")
+        except Exception as e:
+            logger.error(f"change_log compaction failed: {e}")
+        await asyncio.sleep(settings.CHANGE_LOG_COMPACT_INTERVAL_SECONDS)
@@ -32,11 +32,57 @@ class Settings(BaseSettings):
     SERVER_PORT: str = "8080"
     ALLOW_MODIFY_API_KEY_LIST: str = ""
 
+    # 限流（token bucket）：格式 "METHOD /path=次數/秒數"，以逗號分隔；留空則停用
+    RATE_LIMIT_RULES: str = (
+        "POST /supplies=20/60,POST /human_resources=20/60,POST /reports=20/60,POST /shelters=10/60"
+    )
+    # 前方可信任的 proxy 層數（nginx 為 1），用來從 X-Forwarded-For 取出真實 client IP
+    RATE_LIMIT_TRUSTED_PROXY_HOPS: int = 1
+
+    # Idempotency-Key：第一次回應的保存時間，以及同一 key 並行請求的鎖逾時
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_SECONDS: int = 30
+
+    # Change feed（/changes）：異動紀錄保留天數與清理間隔
+    CHANGE_LOG_RETENTION_DAYS: int = 7
+    CHANGE_LOG_COMPACT_INTERVAL_SECONDS: int = 3600
+
+    # 即時推播（/stream）：heartbeat 間隔，以及每個連線可暫存的事件數（超過即斷線讓 client 重連）
+    STREAM_HEARTBEAT_SECONDS: int = 15
+    STREAM_QUEUE_SIZE: int = 100
+
+    # 儀表板統計（/stats）：materialized view 重新整理間隔與回應快取秒數
+    STATS_REFRESH_INTERVAL_SECONDS: int = 60
+    STATS_CACHE_SECONDS: int = 30
+
+    # 個資保留期限：pii_date 超過天數的電話 / 地址會被清除（0 表示停用背景排程）
+    PII_RETENTION_DAYS: int = 0
+    PII_PURGE_INTERVAL_SECONDS: int = 3600
+    # 分批大小與批次間隔；replication lag 或等待鎖的連線過多時暫停
+    PII_PURGE_BATCH_SIZE: int = 200
+    PII_PURGE_BATCH_PAUSE_SECONDS: float = 0.2
+    PII_PURGE_MAX_REPLICATION_LAG_SECONDS: float = 5.0
+    PII_PURGE_MAX_LOCK_WAITERS: int = 5
+
     # LINE OAuth2/OIDC
     LINE_CLIENT_ID: str
     LINE_CLIENT_SECRET: str
     LINE_REDIRECT_URI: str = ""  # DEPRECATED: redirect_uri 現在由前端在 /authorize 請求中提供
     LINE_SCOPES: str = "profile openid email"
+    # state 儲存方式：db（寫入 line_session_states）、signed（加密簽章 token，不寫 DB）
+    LINE_STATE_BACKEND: str = "db"
+    LINE_STATE_SECRET: str = ""  # signed 模式的金鑰，未設定時以 LINE_CLIENT_SECRET 衍生
+    LINE_STATE_TTL_SECONDS: int = 600
+
+    # Redis（選用）：多 worker 部署時共用的防重放 / 快取儲存，未設定則使用 in-memory
+    REDIS_URL: str = ""
+    # 連線與讀寫逾時（秒）：Redis 無法連線時盡快失敗，不拖住請求
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 1.0
+    # spam-blocker 審核事件：human_resources / supplies 新增或修改時 XADD 到此 Redis Stream（需設定 REDIS_URL，留空則停用）
+    SPAM_CHECK_STREAM: str = "spam_check_events"
+    SPAM_CHECK_STREAM_MAXLEN: int = 100000
+    # 等待背景送出的交易數上限，Redis 無法連線而堆積時超出的事件直接捨棄（spam-blocker 輪詢會補上）
+    SPAM_CHECK_PUBLISH_QUEUE_SIZE: int = 1000
 
     # Discord Webhook
     DISCORD_WEBHOOK_URL: str = ""
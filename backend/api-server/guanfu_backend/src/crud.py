@@ -1,11 +1,11 @@
-from typing import List, Optional, Type, TypeVar
+from typing import List, Optional, Sequence, Tuple, Type, TypeVar
 from urllib.parse import urlencode
 from datetime import datetime, timezone
 import json
 
 from fastapi import HTTPException, Request
 from pydantic import BaseModel
-from sqlalchemy import exists, and_, select, text
+from sqlalchemy import ARRAY, String, any_, bindparam, exists, and_, select, text
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.orm import Session
 from sqlalchemy.inspection import inspect as sa_inspect
@@ -17,6 +17,9 @@ from .schemas import SupplyCreate, SupplyItemDistribution
 from .pin_related import generate_pin
 from .enum_serializer import *
 
+# ?ids= 一次最多可查詢的筆數
+MAX_IDS_PER_REQUEST = 500
+
 ModelType = TypeVar("ModelType", bound=models.Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
@@ -47,6 +50,7 @@ def get_multi(
     skip: int = 0,
     limit: int = 100,
     order_by=None,
+    options: Sequence[Any] = (),
     **filters: Any,
 ) -> List[ModelType]:
     """
@@ -54,8 +58,9 @@ def get_multi(
     - 對 filters 做正規化（Enum -> value；移除 None）
     - 使用 filter_by（簡單等值查詢）
     - 支援 order_by（傳 ColumnElement，例如 model.created_at.desc()）
+    - 支援 options（例如 selectinload，一次載入整頁的子資源）
     """
-    query = db.query(model)
+    query = db.query(model).options(*options)
 
     if filters:
         normalized_filters = normalize_filters_dict(filters)
@@ -68,6 +73,55 @@ def get_multi(
     return query.offset(skip).limit(limit).all()
 
 
+def parse_ids(raw_ids: str) -> List[str]:
+    """
+    解析 ?ids=a,b,c：去除空白與重複（保留原順序），超過 MAX_IDS_PER_REQUEST 筆回傳 400。
+    """
+    ids = list(dict.fromkeys(i.strip() for i in raw_ids.split(",") if i.strip()))
+    if not ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must not be empty")
+    if len(ids) > MAX_IDS_PER_REQUEST:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_IDS_PER_REQUEST} ids are allowed per request",
+        )
+    return ids
+
+
+def get_multi_by_ids(
+    db: Session,
+    model: Type[ModelType],
+    ids: List[str],
+    options: Sequence[Any] = (),
+) -> Tuple[List[ModelType], List[str]]:
+    """
+    以單一 WHERE id = ANY(:ids) 查詢多筆（整個陣列只佔一個 bind 參數）。
+    回傳 (依 ids 順序排列的資料, 找不到的 id)。
+    """
+    rows = (
+        db.query(model)
+        .options(*options)
+        .filter(model.id == any_(bindparam("ids", ids, type_=ARRAY(String))))
+        .all()
+    )
+    by_id = {row.id: row for row in rows}
+    found = [by_id[i] for i in ids if i in by_id]
+    missing = [i for i in ids if i not in by_id]
+    return found, missing
+
+
+def build_ids_collection(rows: List[Any], missing: List[str]) -> dict:
+    """?ids= 的回應：沿用列表格式，不分頁，並以 missing 列出找不到的 id"""
+    return {
+        "member": rows,
+        "totalItems": len(rows),
+        "limit": len(rows) + len(missing),
+        "offset": 0,
+        "next": None,
+        "missing": missing,
+    }
+
+
 def orm_to_dict(obj: Any) -> dict:
     """
 orm -> dict"""
@@ -233,6 +287,14 @@ def create_supply_with_items(db: Session, obj_in: SupplyCreate) -> models.Supply
         raise HTTPException(status_code=500, detail=f"建立供應單時發生未預期錯誤: {str(e)}")
 
 
+def touch_supply(supply: models.Supply) -> None:
+    """
+    物資項目新增或修改時更新上層 Supply 的 updated_at（與該項目同一個交易提交），
+    列表排序與依 updated_since 增量同步的客戶端（spam-blocker）才會重新讀到整張供應單。
+    """
+    supply.updated_at = datetime.now(timezone.utc)
+
+
 def distribute_items(db: Session, supply_id: str, items_to_distribute: List[SupplyItemDistribution]) -> Optional[List[models.SupplyItem]]:
     """
     批次更新指定 supply_id 底下多筆 SupplyItem 的 received_count。
@@ -389,7 +451,7 @@ def supply_batch_increment_received(db: Session, supply_id: str, item_counts: Di
             it.received_count = current + inc
 
         # 更新父層 Supply 的 updated_at
-        supply.updated_at = datetime.now(timezone.utc)
+        touch_supply(supply)
 
         db.add_all(items)
         db.add(supply)
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+STATS_VIEW = "dashboard_stats"
+STATS_RESOURCES = ("places", "shelters", "human_resources", "supplies", "reports")
+
+# 每個資源依 (category, status) 分組的筆數；human_resources 的 need/got 為 headcount，
+# supplies 以 supply_items 的 tag 分組，need/got 為 total_number / received_count。
+# 結果只有分組數那麼多列，查詢成本與資料表大小無關。
+STATS_VIEW_SQL = f"""
+CREATE MATERIALIZED VIEW IF NOT EXISTS {STATS_VIEW} AS
+SELECT s.*, NOW() AS refreshed_at FROM (
+    SELECT 'places' AS resource, COALESCE(type, '') AS category, COALESCE(status, '') AS status,
+           count(*) AS count, NULL::bigint AS need, NULL::bigint AS got
+    FROM places GROUP BY 2, 3
+    UNION ALL
+    SELECT 'shelters', '', COALESCE(status, ''), count(*), NULL, NULL
+    FROM shelters GROUP BY 3
+    UNION ALL
+    SELECT 'human_resources', COALESCE(role_type, ''), COALESCE(status, ''),
+           count(*), sum(headcount_need), sum(headcount_got)
+    FROM human_resources GROUP BY 2, 3
+    UNION ALL
+    SELECT 'supplies', COALESCE(tag, ''),
+           CASE WHEN COALESCE(received_count, 0) >= total_number THEN 'completed' ELSE 'pending' END,
+           count(*), sum(total_number), sum(COALESCE(received_count, 0))
+    FROM supply_items GROUP BY 2, 3
+    UNION ALL
+    SELECT 'reports', COALESCE(location_type, ''), COALESCE(status, ''), count(*), NULL, NULL
+    FROM reports GROUP BY 2, 3
+) s
+"""
+# REFRESH ... CONCURRENTLY 需要 unique index
+STATS_INDEX_SQL = f"""
+CREATE UNIQUE INDEX IF NOT EXISTS idx_{STATS_VIEW}_key ON {STATS_VIEW} (resource, category, status)
+"""
+
+# 多個 worker 同時啟動排程時，只讓一個執行 refresh
+_REFRESH_LOCK_KEY = 0x6766_7374  # "gfst"
+
+
+def ensure_view(db: Session) -> None:
+    """places 等資料表由 init_db 在啟動時建立，view 同樣在啟動時建立（IF NOT EXISTS）"""
+    db.execute(text(STATS_VIEW_SQL))
+    db.execute(text(STATS_INDEX_SQL))
+    db.commit()
+
+
+def refresh_view(db: Session) -> bool:
+    """CONCURRENTLY 重新整理，期間讀取 /stats 不受影響；其他 worker 正在整理時直接跳過"""
+    acquired = db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _REFRESH_LOCK_KEY}).scalar()
+    if not acquired:
+        db.rollback()
+        return False
+    db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {STATS_VIEW}"))
+    db.commit()
+    return True
+
+
+def load_stats(db: Session) -> Dict[str, Any]:
+    rows = db.execute(
+        text(f"SELECT resource, category, status, count, need, got, refreshed_at FROM {STATS_VIEW}")
+    ).all()
+    result: Dict[str, Any] = {
+        resource: {"total": 0, "need": None, "got": None, "groups": []} for resource in STATS_RESOURCES
+    }
+    refreshed_at = None
+    for row in rows:
+        summary = result[row.resource]
+        summary["total"] += row.count
+        if row.need is not None:
+            summary["need"] = (summary["need"] or 0) + row.need
+            summary["got"] = (summary["got"] or 0) + row.got
+        summary["groups"].append(
+            {"category": row.category, "status": row.status, "count": row.count, "need": row.need, "got": row.got}
+        )
+        refreshed_at = row.refreshed_at
+    result["refreshed_at"] = int(refreshed_at.timestamp()) if refreshed_at else None
+    return result
+
+
+_cache: Optional[tuple] = None
+
+
+def get_cached_stats(db: Session) -> Dict[str, Any]:
+    """materialized view 本身只會每 STATS_REFRESH_INTERVAL_SECONDS 更新，回應在 process 內快取"""
+    global _cache
+    now = time.monotonic()
+    if _cache is not None and _cache[0] > now:
+        return _cache[1]
+    stats = load_stats(db)
+    _cache = (now + settings.STATS_CACHE_SECONDS, stats)
+    return stats
+
+
+def _run_refresh() -> bool:
+    db = SessionLocal()
+    try:
+        return refresh_view(db)
+    finally:
+        db.close()
+
+
+def _run_ensure_view() -> None:
+    db = SessionLocal()
+    try:
+        ensure_view(db)
+    finally:
+        db.close()
+
+
+async def refresh_loop() -> None:
+    """在 lifespan 中啟動的背景工作，每 STATS_REFRESH_INTERVAL_SECONDS 重新整理一次"""
+    try:
+        await asyncio.to_thread(_run_ensure_view)
+    except Exception as e:
+        logger.error(f"{STATS_VIEW} create failed: {e}")
+    while True:
+        try:
+            await asyncio.to_thread(_run_refresh)
+        except Exception as e:
+            logger.error(f"{STATS_VIEW} refresh failed: {e}")
+        await asyncio.sleep(settings.STATS_REFRESH_INTERVAL_SECONDS)
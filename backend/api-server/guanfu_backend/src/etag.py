@@ -0,0 +1,141 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+from pydantic import BaseModel
+from sqlalchemy import func, literal_column, select, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+
+from . import crud, models
+
+# 詳細內容包含子資源的類型：子資源異動時 ETag 也要跟著改變
+CHILD_RESOURCES = {
+    models.Supply: ((models.SupplyItem, models.SupplyItem.supply_id),),
+}
+# 以 embed 參數帶出子資源時，ETag 也要涵蓋這些子資源
+EMBED_CHILD_RESOURCES = {
+    (models.Place, "requirements"): (
+        (models.RequirementsHr, models.RequirementsHr.place_id),
+        (models.RequirementsSupplies, models.RequirementsSupplies.place_id),
+    ),
+}
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _has_updated_at(model) -> bool:
+    return "updated_at" in model.__table__.c
+
+
+def _row_hash(model):
+    # 沒有 updated_at 的資料表（如 supply_items）以整列內容的 md5 作為版本
+    return func.md5(literal_column(f"{model.__tablename__}::text"))
+
+
+def _row_version(db: Session, model, id: str):
+    """只查詢版本欄位；回傳 (版本,) 或 None（資料不存在）"""
+    column = model.updated_at if _has_updated_at(model) else _row_hash(model)
+    return db.execute(select(column).where(model.id == id)).first()
+
+
+def _child_version(db: Session, model, id: str, embed: Optional[str] = None) -> Optional[str]:
+    children = CHILD_RESOURCES.get(model, ()) + EMBED_CHILD_RESOURCES.get((model, embed), ())
+    if not children:
+        return None
+    hashes = []
+    for child_model, parent_column in children:
+        rows = func.string_agg(literal_column(f"{child_model.__tablename__}::text"), aggregate_order_by(",", child_model.id))
+        hashes.append(db.scalar(select(func.md5(func.coalesce(rows, ""))).where(parent_column == id)))
+    return hashes[0] if len(hashes) == 1 else hashlib.md5("".join(hashes).encode()).hexdigest()
+
+
+def _format_etag(version, child_version: Optional[str]) -> str:
+    if isinstance(version, datetime):
+        if version.tzinfo is None:
+            version = version.replace(tzinfo=timezone.utc)
+        version = format((version - _EPOCH) // _MICROSECOND, "x")
+    elif version is None:
+        version = "0"
+    if child_version:
+        version = f"{version}-{child_version[:16]}"
+    return f'W/"{version}"'
+
+
+def current_etag(db: Session, model, id: str, embed: Optional[str] = None) -> Optional[str]:
+    """以 updated_at（及子資源）產生 weak ETag，不載入整筆資料；資料不存在時回傳 None"""
+    row = _row_version(db, model, id)
+    if row is None:
+        return None
+    return _format_etag(row[0], _child_version(db, model, id, embed))
+
+
+def _matches(header: str, etag: str) -> bool:
+    """比對 If-None-Match / If-Match，一律使用 weak comparison（忽略 W/ 前綴）"""
+    opaque = etag.removeprefix("W/")
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def not_modified(
+        request: Request, response: Response, db: Session, model, id: str, embed: Optional[str] = None
+) -> Optional[Response]:
+    """
+    GET 詳細資料用：在 response 加上 ETag；若 If-None-Match 相符則回傳 304 Response，
+    呼叫端直接 return，省去完整查詢與序列化。資料不存在時回傳 None，由呼叫端處理 404。
+    """
+    etag = current_etag(db, model, id, embed)
+    if etag is None:
+        return None
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
+
+
+def _etag_variants(db: Session, model, id: str, version) -> list:
+    """If-Match 可能來自帶 embed 的 GET：不帶 embed 與各 embed 參數產生的 ETag 都視為目前版本"""
+    embeds = [None] + [embed for embed_model, embed in EMBED_CHILD_RESOURCES if embed_model is model]
+    return [_format_etag(version, _child_version(db, model, id, embed)) for embed in embeds]
+
+
+def update_if_match(
+        request: Request, response: Response, db: Session, db_obj: models.Base, obj_in: BaseModel
+) -> models.Base:
+    """
+    PATCH 用：帶 If-Match 時先比對目前版本，不符回傳 412；
+    相符則以 UPDATE ... WHERE 版本未變 的條件式寫入搶下這筆資料（樂觀鎖，不需事先 SELECT FOR UPDATE），
+    同時到達的另一個請求會因版本已變而得到 412，避免覆寫彼此的修改。
+    """
+    model = type(db_obj)
+    if_match = request.headers.get("if-match")
+    if if_match:
+        row = _row_version(db, model, db_obj.id)
+        version = row[0] if row else None
+        if row is None or not any(_matches(if_match, tag) for tag in _etag_variants(db, model, db_obj.id, version)):
+            raise HTTPException(status_code=412, detail="Resource has been modified, please reload and retry.")
+        if if_match.strip() != "*" and not _claim(db, model, db_obj.id, version):
+            db.rollback()
+            raise HTTPException(status_code=412, detail="Resource has been modified, please reload and retry.")
+
+    updated = crud.update(db, db_obj=db_obj, obj_in=obj_in)
+    response.headers["ETag"] = current_etag(db, model, updated.id)
+    return updated
+
+
+def _claim(db: Session, model, id: str, version) -> bool:
+    if _has_updated_at(model):
+        stmt = (
+            update(model)
+            .where(model.id == id, model.updated_at == version)
+            .values(updated_at=datetime.now(timezone.utc))
+        )
+    else:
+        stmt = update(model).where(model.id == id, _row_hash(model) == version).values(id=model.id)
+    return db.execute(stmt.execution_options(synchronize_session=False)).rowcount == 1
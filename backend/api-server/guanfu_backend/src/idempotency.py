@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import json
+import secrets
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from .config import settings
+from .services.redis_client import get_async_redis
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+REDIS_KEY_PREFIX = "idempotency:"
+
+# 只有持有者（token 相符）才能釋放鎖
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def fingerprint(request: Request, key: str) -> str:
+    """route + Idempotency-Key 的雜湊；body 不列入，同一個 key 只能對應一個請求內容"""
+    raw = f"{request.method} {request.url.path}\n{key}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def body_hash(payload: BaseModel) -> str:
+    """正規化後 body 的雜湊，與回應一起儲存，用來偵測同一個 key 搭配不同內容"""
+    return hashlib.sha256(payload.model_dump_json().encode("utf-8")).hexdigest()
+
+
+class MemoryIdempotencyStore:
+    """單一 process 的回應快取，鎖為 per-fingerprint 的 asyncio.Lock"""
+
+    def __init__(self):
+        self._responses: Dict[str, Tuple[float, str, int, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # 持有或等待各鎖的請求數，歸零才移除，避免等待中的鎖被新請求另建一把取代
+        self._lock_users: Dict[str, int] = {}
+
+    async def get(self, fp: str) -> Optional[Tuple[str, int, Any]]:
+        entry = self._responses.get(fp)
+        if entry is None:
+            return None
+        expires_at, stored_hash, status_code, content = entry
+        if expires_at <= time.time():
+            del self._responses[fp]
+            return None
+        return stored_hash, status_code, content
+
+    async def put(self, fp: str, stored_hash: str, status_code: int, content: Any) -> None:
+        now = time.time()
+        expired = [k for k, (exp, _, _, _) in self._responses.items() if exp <= now]
+        for k in expired:
+            del self._responses[k]
+        self._responses[fp] = (now + settings.IDEMPOTENCY_TTL_SECONDS, stored_hash, status_code, content)
+
+    @asynccontextmanager
+    async def lock(self, fp: str):
+        lock = self._locks.setdefault(fp, asyncio.Lock())
+        self._lock_users[fp] = self._lock_users.get(fp, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[fp] -= 1
+            if self._lock_users[fp] == 0:
+                del self._lock_users[fp]
+                del self._locks[fp]
+
+
+class RedisIdempotencyStore:
+    """多 worker 共用：回應存於 Redis（含 TTL），鎖為 SET NX PX，等待者輪詢直到鎖釋放"""
+
+    poll_interval = 0.1
+
+    def __init__(self, redis_client):
+        self._redis = redis_client
+        self._release = redis_client.register_script(_RELEASE_LOCK_LUA)
+
+    async def get(self, fp: str) -> Optional[Tuple[str, int, Any]]:
+        raw = await self._redis.get(f"{REDIS_KEY_PREFIX}resp:{fp}")
+        if raw is None:
+            return None
+        stored = json.loads(raw)
+        return stored["body_hash"], stored["status_code"], stored["content"]
+
+    async def put(self, fp: str, stored_hash: str, status_code: int, content: Any) -> None:
+        await self._redis.set(
+            f"{REDIS_KEY_PREFIX}resp:{fp}",
+            json.dumps(
+                {"body_hash": stored_hash, "status_code": status_code, "content": content}, ensure_ascii=False
+            ),
+            ex=settings.IDEMPOTENCY_TTL_SECONDS,
+        )
+
+    @asynccontextmanager
+    async def lock(self, fp: str):
+        lock_key = f"{REDIS_KEY_PREFIX}lock:{fp}"
+        token = secrets.token_hex(16)
+        lock_ms = settings.IDEMPOTENCY_LOCK_SECONDS * 1000
+        deadline = time.monotonic() + settings.IDEMPOTENCY_LOCK_SECONDS
+        while not await self._redis.set(lock_key, token, nx=True, px=lock_ms):
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still being processed.",
+                )
+            await asyncio.sleep(self.poll_interval)
+        try:
+            yield
+        finally:
+            await self._release(keys=[lock_key], args=[token])
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        redis_client = get_async_redis()
+        _store = RedisIdempotencyStore(redis_client) if redis_client is not None else MemoryIdempotencyStore()
+    return _store
+
+
+async def run_once(
+    request: Request,
+    payload: BaseModel,
+    create: Callable[[], Awaitable[Any]],
+    status_code: int = 201,
+):
+    """
+    依 Idempotency-Key header 保證建立動作只執行一次：
+    - 沒有 header：直接執行 create()
+    - 已有相同 key + route 的回應：body 相同則直接重放（加上 Idempotent-Replayed header），不同則回傳 422
+    - 同時到達的重複請求：以鎖序列化，僅第一個會真正寫入，其餘等待後重放結果
+    create() 丟出的例外不會被快取，之後的重試會重新執行。
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER, "").strip()
+    if not key:
+        return await create()
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters.")
+
+    store = get_store()
+    fp = fingerprint(request, key)
+    payload_hash = body_hash(payload)
+
+    cached = await store.get(fp)
+    if cached is None:
+        async with store.lock(fp):
+            cached = await store.get(fp)
+            if cached is None:
+                content = jsonable_encoder(await create())
+                await store.put(fp, payload_hash, status_code, content)
+                return JSONResponse(status_code=status_code, content=content)
+
+    cached_hash, cached_status, cached_content = cached
+    if cached_hash != payload_hash:
+        raise HTTPException(
+            status_code=422,
+            detail=f"This {IDEMPOTENCY_HEADER} was already used with a different request body.",
+        )
+    return JSONResponse(status_code=cached_status, content=cached_content, headers={REPLAYED_HEADER: "true"})
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from typing import Dict, FrozenSet, Optional
+
+from .change_feed import NOTIFY_CHANNEL
+from .config import settings
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """單一 /stream 連線的訂閱；佇列滿了代表 client 跟不上，標記後由串流端關閉連線讓 client 重連"""
+
+    def __init__(self, topics: FrozenSet[str]):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.STREAM_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, event: dict) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class ChangeBroadcaster:
+    """
+    每個 worker 只開一條 LISTEN 連線，收到 NOTIFY 後分送給本 worker 內所有符合 topic 的訂閱者。
+    LISTEN 在背景 thread 中阻塞等待，事件透過 call_soon_threadsafe 交回 event loop。
+    第一個訂閱者出現時才啟動，沒有人訂閱的 worker 不會多佔一條 DB 連線。
+    """
+
+    reconnect_delay = 3.0
+
+    def __init__(self):
+        self._subscribers: Dict[int, Subscription] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, topics: FrozenSet[str]) -> Subscription:
+        self._ensure_started()
+        sub = Subscription(topics)
+        self._subscribers[id(sub)] = sub
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subscribers.pop(id(sub), None)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen_forever, name="change-listener", daemon=True)
+        self._thread.start()
+
+    def _listen_forever(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                logger.error(f"LISTEN {NOTIFY_CHANNEL} connection lost: {e}")
+                time.sleep(self.reconnect_delay)
+
+    def _listen(self) -> None:
+        # 從 engine 取得連線後 detach，讓這條長連線不佔用 pool 的名額
+        raw = engine.raw_connection()
+        conn = raw.driver_connection
+        raw.detach()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            while not self._stop.is_set():
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    self._loop.call_soon_threadsafe(self._dispatch, notify.payload)
+        finally:
+            conn.close()
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed change notification: {payload[:200]}")
+            return
+        topics = set(event.pop("topics", ()))
+        for sub in list(self._subscribers.values()):
+            if sub.topics & topics:
+                sub.offer(event)
+
+
+broadcaster = ChangeBroadcaster()
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -9,10 +10,12 @@ from starlette.requests import Request
 from starlette.responses import JSONResponse
 from starlette.status import HTTP_422_UNPROCESSABLE_ENTITY
 
-from . import database
+from . import change_feed, dashboard_stats, database, live_events, pii_retention, spam_check_stream  # noqa: F401
 from .config import settings
+from .rate_limit import RateLimitMiddleware
 from .routers import (
     accommodations,
+    changes,
     human_resources,
     medical_stations,
     mental_health_resources,
@@ -23,6 +26,8 @@ from .routers import (
     restrooms,
     shelters,
     shower_stations,
+    stats,
+    stream,
     supplies,
     supply_items,
     supply_providers,
@@ -38,7 +43,17 @@ async def lifespan(app: FastAPI):
     # Startup:
     # Create database tables to prevent "relation does not exist" errors
     database.init_db()
+    background_tasks = [
+        asyncio.create_task(change_feed.compaction_loop()),
+        asyncio.create_task(dashboard_stats.refresh_loop()),
+    ]
+    if settings.PII_RETENTION_DAYS > 0:
+        background_tasks.append(asyncio.create_task(pii_retention.retention_loop()))
     yield
+    # Shutdown:
+    for task in background_tasks:
+        task.cancel()
+    live_events.broadcaster.stop()
 
 
 # --- 根據環境動態設定 Swagger UI 的伺服器 URL ---
@@ -75,6 +90,10 @@ app = FastAPI(
     },
 )
 
+# --- 限流：公開建立端點的 per-client token bucket ---
+if settings.RATE_LIMIT_RULES:
+    app.add_middleware(RateLimitMiddleware)
+
 
 # ===================================================================
 # 全域異常處理器 (Global Exception Handlers)
@@ -157,3 +176,6 @@ app.include_router(supplies.router)
 app.include_router(supply_items.router)
 app.include_router(supply_providers.router)
 app.include_router(line.router)
+app.include_router(changes.router)
+app.include_router(stream.router)
+app.include_router(stats.router)
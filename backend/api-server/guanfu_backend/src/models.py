@@ -1,7 +1,7 @@
 import uuid
 import time
 from sqlalchemy import (
-    Column, String, DateTime, Integer, Boolean, Text, BigInteger, ForeignKey, text, ARRAY
+    Column, String, DateTime, Integer, Boolean, Text, BigInteger, ForeignKey, Index, text, ARRAY
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
@@ -235,6 +235,10 @@ class HumanResource(Base):
     pii_date = Column(BigInteger, nullable=False, default=current_timestamp_int)
     valid_pin = Column(String)
 
+    __table_args__ = (
+        Index("idx_human_resources_pii_date_id", "pii_date", "id"),
+    )
+
 
 class Supply(Base):
     __tablename__ = "supplies"
@@ -250,6 +254,10 @@ class Supply(Base):
     valid_pin = Column(String)
     spam_warn = Column(Boolean)
 
+    __table_args__ = (
+        Index("idx_supplies_pii_date_id", "pii_date", "id"),
+    )
+
 
 class SupplyItem(Base):
     __tablename__ = "supply_items"
@@ -350,6 +358,8 @@ class Place(Base):
     notes = Column(Text, server_default="")
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"))
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"), onupdate=func.now())
+    requirements_hr = relationship("RequirementsHr", back_populates="place")
+    requirements_supplies = relationship("RequirementsSupplies", back_populates="place")
 
 
 class RequirementsHr(Base):
@@ -363,6 +373,7 @@ class RequirementsHr(Base):
     received_count = Column(Integer, nullable=False, server_default="0")
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"))
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"), onupdate=func.now())
+    place = relationship("Place", back_populates="requirements_hr")
 
 
 class RequirementsSupplies(Base):
@@ -376,3 +387,49 @@ class RequirementsSupplies(Base):
     received_count = Column(Integer, nullable=False, server_default="0")
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"))
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"), onupdate=func.now())
+    place = relationship("Place", back_populates="requirements_supplies")
+
+
+class ChangeLog(Base):
+    """
+    資源異動紀錄（change feed），由 change_feed 在 flush 時自動寫入，與異動本身同一個交易。
+    txid 為寫入交易的 id，/changes 依 (txid, id) 排序並只回傳已結束交易的紀錄，避免遺漏慢交易。
+    """
+    __tablename__ = "change_log"
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    txid = Column(BigInteger, nullable=False, server_default=text("(pg_current_xact_id()::text)::bigint"))
+    resource_type = Column(String, nullable=False)
+    resource_id = Column(String, nullable=False)
+    op = Column(String, nullable=False)  # created / updated / deleted
+    changed_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"))
+
+    __table_args__ = (
+        Index("idx_change_log_txid_id", "txid", "id"),
+        Index("idx_change_log_changed_at", "changed_at"),
+    )
+
+
+class ChangeLogCompaction(Base):
+    """
+    change_log 清理的進度，只有 id=1 一列。
+    deleted_txid / deleted_id 為已刪除紀錄中 (txid, id) 最大的一筆，比它舊的 cursor 之後有紀錄已被刪除。
+    """
+    __tablename__ = "change_log_compaction"
+    id = Column(Integer, primary_key=True)
+    deleted_txid = Column(BigInteger, nullable=False)
+    deleted_id = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"), onupdate=func.now())
+
+
+class PiiPurgeProgress(Base):
+    """
+    個資保留期限清除（pii_retention）的進度，每個資料表一列。
+    cursor 為上一批處理到的 (pii_date, id)，中斷後可從這裡接續；整輪完成後清空並記錄完成時間。
+    """
+    __tablename__ = "pii_purge_progress"
+    table_name = Column(String, primary_key=True)
+    cursor_pii_date = Column(BigInteger)
+    cursor_id = Column(String)
+    scrubbed_count = Column(BigInteger, nullable=False, server_default="0")
+    last_completed_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=text("NOW()"), onupdate=func.now())
@@ -0,0 +1,239 @@
+"""
+個資保留期限清除：pii_date 超過 PII_RETENTION_DAYS 的電話 / 地址 / 聯絡人會被清空。
+
+- 依 (pii_date, id) keyset 分批處理，每批為獨立的短交易，以 FOR UPDATE SKIP LOCKED
+  略過正在被捐贈者更新的資料列（下一輪會再處理），不會擋住線上寫入
+- 每批開始前檢查 replication lag 與等待鎖的連線數，過高時暫停
+- 進度（cursor）與該批清除在同一個交易中寫入 pii_purge_progress，中斷後可接續
+- 每批以 SKIP LOCKED 取得該表的進度列，多個 worker 同時執行時，沒取得的直接略過該表，不等待也不記錄錯誤
+
+CLI：
+    python -m src.pii_retention --days 180 [--dry-run] [--batch-size 200]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy import insert, or_, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PiiTarget:
+    model: Any
+    # 欄位 -> 清除後的值（NOT NULL 欄位以空字串取代）
+    scrub: Dict[str, Any]
+
+
+TARGETS = (
+    PiiTarget(models.HumanResource, {"phone": "", "address": ""}),
+    PiiTarget(models.Supply, {"name": None, "phone": None, "address": None}),
+)
+
+
+@dataclass
+class PurgeResult:
+    table: str
+    scrubbed: int = 0
+    batches: int = 0
+    completed: bool = False
+    skipped: bool = False  # 其他 worker 正在處理這個資料表
+
+
+# ===================================================================
+# 節流
+# ===================================================================
+
+def _replication_lag_seconds(db: Session) -> float:
+    # 需要 pg_read_all_stats 權限才看得到 replay_lag；沒有 replica 或無權限時視為 0
+    return float(
+        db.execute(
+            text("SELECT COALESCE(MAX(EXTRACT(EPOCH FROM replay_lag)), 0) FROM pg_stat_replication")
+        ).scalar()
+    )
+
+
+def _lock_waiters(db: Session) -> int:
+    return db.execute(
+        text(
+            "SELECT count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND wait_event_type = 'Lock'"
+        )
+    ).scalar()
+
+
+def wait_until_healthy(db: Session, max_wait_seconds: float = 300) -> None:
+    """replication lag 或等待鎖的連線數超過門檻時，以指數退避暫停，最多等待 max_wait_seconds"""
+    delay = 1.0
+    deadline = time.monotonic() + max_wait_seconds
+    while time.monotonic() < deadline:
+        lag = _replication_lag_seconds(db)
+        waiters = _lock_waiters(db)
+        db.rollback()  # 結束檢查用的交易，避免長時間持有 snapshot
+        if lag <= settings.PII_PURGE_MAX_REPLICATION_LAG_SECONDS and waiters <= settings.PII_PURGE_MAX_LOCK_WAITERS:
+            return
+        logger.info(f"PII purge throttled: replication lag {lag:.1f}s, {waiters} lock waiters; sleeping {delay:.0f}s")
+        time.sleep(delay)
+        delay = min(delay * 2, 30.0)
+
+
+# ===================================================================
+# 分批清除
+# ===================================================================
+
+def _not_scrubbed(target: PiiTarget):
+    model = target.model
+    return or_(*[getattr(model, column).is_distinct_from(value) for column, value in target.scrub.items()])
+
+
+def _lock_progress(db: Session, table: str) -> Optional[models.PiiPurgeProgress]:
+    """鎖住該表的進度列；已被其他 worker 鎖住時不等待，回傳 None，由該 worker 繼續處理"""
+    db.execute(pg_insert(models.PiiPurgeProgress).values(table_name=table).on_conflict_do_nothing())
+    return db.scalars(
+        select(models.PiiPurgeProgress)
+        .where(models.PiiPurgeProgress.table_name == table)
+        .with_for_update(skip_locked=True)
+    ).one_or_none()
+
+
+def purge_batch(
+        db: Session, target: PiiTarget, cutoff: int, batch_size: int, dry_run: bool = False
+) -> Optional[int]:
+    """
+    處理一批並提交；回傳本批清除筆數，小於 batch_size 代表這一輪已掃到結尾。
+    其他 worker 正在處理同一個資料表時不做任何事，回傳 None。
+    """
+    model = target.model
+    table = model.__tablename__
+    db.execute(text("SET LOCAL lock_timeout = '2s'"))
+    progress = _lock_progress(db, table)
+    if progress is None:
+        db.rollback()
+        return None
+
+    candidates = select(model.id, model.pii_date).where(model.pii_date < cutoff, _not_scrubbed(target))
+    if progress.cursor_id is not None:
+        candidates = candidates.where(
+            tuple_(model.pii_date, model.id) > tuple_(progress.cursor_pii_date, progress.cursor_id)
+        )
+    batch = (
+        candidates.order_by(model.pii_date, model.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .cte("batch")
+    )
+
+    if dry_run:
+        rows = db.execute(select(batch.c.id, batch.c.pii_date)).all()
+    else:
+        # updated_at 有 onupdate=now()，明確帶入原值才不會被更新，
+        # 避免已清除的舊資料浮到依 updated_at 排序的列表前面、重新進入 updated_since 增量同步
+        rows = db.execute(
+            update(model)
+            .where(model.id == batch.c.id)
+            .values(**target.scrub, updated_at=model.updated_at)
+            .returning(model.id, model.pii_date)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+    if rows:
+        if not dry_run:
+            # 直接以 SQL 更新不會經過 change_feed 的 flush hook，在此補寫異動紀錄
+            db.execute(
+                insert(models.ChangeLog),
+                [{"resource_type": table, "resource_id": row.id, "op": "updated"} for row in rows],
+            )
+        last = max(rows, key=lambda row: (row.pii_date, row.id))
+        progress.cursor_pii_date, progress.cursor_id = last.pii_date, last.id
+        progress.scrubbed_count += len(rows)
+
+    if len(rows) < batch_size:
+        # 一輪結束；被 SKIP LOCKED 略過的資料列留待下一輪
+        progress.cursor_pii_date, progress.cursor_id = None, None
+        progress.last_completed_at = text("NOW()")
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+    return len(rows)
+
+
+def purge_table(
+        db: Session,
+        target: PiiTarget,
+        retention_days: int,
+        batch_size: Optional[int] = None,
+        dry_run: bool = False,
+        max_batches: Optional[int] = None,
+) -> PurgeResult:
+    batch_size = batch_size or settings.PII_PURGE_BATCH_SIZE
+    cutoff = int(time.time()) - retention_days * 86400
+    result = PurgeResult(table=target.model.__tablename__)
+    while max_batches is None or result.batches < max_batches:
+        wait_until_healthy(db)
+        count = purge_batch(db, target, cutoff, batch_size, dry_run=dry_run)
+        if count is None:
+            logger.debug(f"PII purge of {result.table} is running in another worker, skipping")
+            result.skipped = True
+            break
+        result.batches += 1
+        result.scrubbed += count
+        if count < batch_size or dry_run:
+            result.completed = True
+            break
+        time.sleep(settings.PII_PURGE_BATCH_PAUSE_SECONDS)
+    return result
+
+
+def run_purge(retention_days: int, batch_size: Optional[int] = None, dry_run: bool = False) -> list:
+    db = SessionLocal()
+    try:
+        return [purge_table(db, target, retention_days, batch_size, dry_run) for target in TARGETS]
+    finally:
+        db.close()
+
+
+async def retention_loop() -> None:
+    """在 lifespan 中啟動的背景工作，每 PII_PURGE_INTERVAL_SECONDS 執行一輪"""
+    while True:
+        try:
+            results = await asyncio.to_thread(run_purge, settings.PII_RETENTION_DAYS)
+            for r in results:
+                if r.scrubbed:
+                    logger.info(f"PII purge: {r.scrubbed} rows scrubbed in {r.table}")
+        except Exception as e:
+            logger.error(f"PII purge failed: {e}")
+        await asyncio.sleep(settings.PII_PURGE_INTERVAL_SECONDS)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="清除超過保留期限的個資（電話 / 地址 / 聯絡人）")
+    parser.add_argument("--days", type=int, default=settings.PII_RETENTION_DAYS, help="保留天數（預設 PII_RETENTION_DAYS）")
+    parser.add_argument("--batch-size", type=int, default=settings.PII_PURGE_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="只列出第一批會被清除的筆數，不寫入")
+    args = parser.parse_args()
+
+    if args.days <= 0:
+        parser.error("retention days must be positive (set PII_RETENTION_DAYS or pass --days)")
+
+    logging.basicConfig(level=logging.INFO)
+    for r in run_purge(args.days, args.batch_size, args.dry_run):
+        if r.skipped:
+            print(f"{r.table}: skipped, another worker is purging this table")
+            continue
+        print(f"{r.table}: {r.scrubbed} rows {'would be ' if args.dry_run else ''}scrubbed in {r.batches} batches")
+
+
+if __name__ == "__main__":
+    main()
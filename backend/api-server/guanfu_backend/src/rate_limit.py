@@ -0,0 +1,213 @@
+import hashlib
+import logging
+import math
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .api_key import API_KEY_HEADER, AUTHORIZATION_HEADER, BEARER_PREFIX, _allowed_keys
+from .config import settings
+from .services.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "rate_limit:"
+
+# KEYS[1] = bucket key；ARGV = capacity, refill_per_ms, now_ms, ttl_ms
+# 回傳 {allowed(0/1), 需等待的毫秒數}
+_TOKEN_BUCKET_LUA = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+  tokens = capacity
+  ts = now
+end
+tokens = math.min(capacity, tokens + (now - ts) * refill)
+local allowed = 0
+local wait_ms = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+else
+  wait_ms = math.ceil((1 - tokens) / refill)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], ARGV[4])
+return {allowed, wait_ms}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    method: str
+    path: str
+    capacity: int
+    period_seconds: int
+    pattern: re.Pattern
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period_seconds
+
+
+def parse_rules(raw_rules: str) -> List[RateLimitRule]:
+    """
+    解析 RATE_LIMIT_RULES，例如 "POST /supplies=20/60, POST /supplies/{id}=60/60"
+    表示每個 client 最多連續 20 次，之後每 60 秒補回 20 次。
+    """
+    rules: List[RateLimitRule] = []
+    for item in raw_rules.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        route, _, budget = item.partition("=")
+        method, _, path = route.strip().partition(" ")
+        capacity, _, period = budget.strip().partition("/")
+        path = path.strip().rstrip("/") or "/"
+        regex = "^" + re.sub(r"\\{[^/]+?\\}", "[^/]+", re.escape(path)) + "/?$"
+        rules.append(
+            RateLimitRule(
+                method=method.strip().upper(),
+                path=path,
+                capacity=int(capacity),
+                period_seconds=int(period),
+                pattern=re.compile(regex),
+            )
+        )
+    return rules
+
+
+def client_identity(headers: Headers, peer_host: Optional[str]) -> str:
+    """
+    決定限流對象：帶有效 API key（ALLOW_MODIFY_API_KEY_LIST 中的 key，X-Api-Key 或 Bearer 皆可）時以 key 計算，
+    其餘一律使用 client IP；未驗證的 key / token 不採用，否則每次換一個值就能取得新的額度。
+    key 只保留雜湊值，避免明文出現在 Redis。
+    """
+    api_key = headers.get(API_KEY_HEADER, "").strip()
+    if not api_key:
+        authorization = headers.get(AUTHORIZATION_HEADER, "")
+        if authorization.lower().startswith(BEARER_PREFIX):
+            api_key = authorization[len(BEARER_PREFIX):].strip()
+    if api_key and api_key in _allowed_keys():
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:32]
+
+    return "ip:" + client_ip(headers, peer_host)
+
+
+def client_ip(headers: Headers, peer_host: Optional[str]) -> str:
+    """
+    nginx 以 $proxy_add_x_forwarded_for 附加真實來源 IP，因此從右邊數
+    RATE_LIMIT_TRUSTED_PROXY_HOPS 個即為可信任的 client IP；左側可由 client 偽造，不採用。
+    """
+    hops = settings.RATE_LIMIT_TRUSTED_PROXY_HOPS
+    forwarded_for = headers.get("x-forwarded-for", "")
+    if hops > 0 and forwarded_for:
+        chain = [ip.strip() for ip in forwarded_for.split(",") if ip.strip()]
+        if chain:
+            return chain[-min(hops, len(chain))]
+    return peer_host or "unknown"
+
+
+class MemoryTokenBuckets:
+    """
+    單一 process 的 token bucket。只在 event loop 中同步操作，不需要鎖；
+    bucket 數超過上限時，清除閒置超過一個補滿週期（已與新 bucket 無異）的項目。
+    """
+
+    max_buckets = 100_000
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float, int]] = {}
+
+    async def take(self, key: str, rule: RateLimitRule) -> Tuple[bool, float]:
+        now = time.monotonic()
+        tokens, ts, _ = self._buckets.get(key, (float(rule.capacity), now, rule.period_seconds))
+        tokens = min(rule.capacity, tokens + (now - ts) * rule.refill_per_second)
+        if tokens >= 1:
+            allowed, wait = True, 0.0
+            tokens -= 1
+        else:
+            allowed, wait = False, (1 - tokens) / rule.refill_per_second
+        self._buckets[key] = (tokens, now, rule.period_seconds)
+
+        if len(self._buckets) > self.max_buckets:
+            idle = [k for k, (_, last, period) in self._buckets.items() if now - last >= period]
+            for k in idle:
+                del self._buckets[k]
+        return allowed, wait
+
+
+class RedisTokenBuckets:
+    """多 worker 共用的 token bucket，以 Lua script 保證原子性"""
+
+    def __init__(self, redis_client):
+        self._redis = redis_client
+        self._script = redis_client.register_script(_TOKEN_BUCKET_LUA)
+
+    async def take(self, key: str, rule: RateLimitRule) -> Tuple[bool, float]:
+        now_ms = int(time.time() * 1000)
+        allowed, wait_ms = await self._script(
+            keys=[REDIS_KEY_PREFIX + key],
+            args=[rule.capacity, rule.refill_per_second / 1000, now_ms, rule.period_seconds * 1000],
+        )
+        return bool(allowed), int(wait_ms) / 1000
+
+
+class RateLimitMiddleware:
+    """
+    依 RATE_LIMIT_RULES 對指定路由做 per-client token bucket 限流，超過時回傳 429 + Retry-After。
+    有設定 REDIS_URL 時使用 Redis 讓多個 worker 共用額度；Redis 異常時放行（fail open）。
+    """
+
+    def __init__(self, app: ASGIApp, rules: Optional[List[RateLimitRule]] = None):
+        self.app = app
+        self.rules = rules if rules is not None else parse_rules(settings.RATE_LIMIT_RULES)
+        redis_client = get_async_redis()
+        self.buckets = RedisTokenBuckets(redis_client) if redis_client is not None else MemoryTokenBuckets()
+
+    def _match(self, method: str, path: str) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if rule.method == method and rule.pattern.match(path):
+                return rule
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rule = self._match(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        peer = scope.get("client")
+        identity = client_identity(headers, peer[0] if peer else None)
+        bucket_key = f"{rule.method}:{rule.path}:{identity}"
+
+        try:
+            allowed, wait_seconds = await self.buckets.take(bucket_key, rule)
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+            allowed, wait_seconds = True, 0.0
+
+        if not allowed:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests, please retry later."},
+                headers={"Retry-After": str(max(1, math.ceil(wait_seconds)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
+from .. import crud, etag, models, schemas
 from ..database import get_db
 from ..api_key import require_modify_api_key
 from ..enum_serializer import AccommodationVacancyEnum, AccommodationStatusEnum
@@ -19,6 +19,7 @@ def list_accommodations(
         status: Optional[AccommodationStatusEnum] = Query(None),
         township: Optional[str] = Query(None),
         has_vacancy: Optional[AccommodationVacancyEnum] = Query(None),
+        ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db)
@@ -26,6 +27,10 @@ def list_accommodations(
     """
     取得住宿資源清單 (分頁)
     """
+    if ids:
+        rows, missing = crud.get_multi_by_ids(db, models.Accommodation, crud.parse_ids(ids))
+        return crud.build_ids_collection(rows, missing)
+
     filters = {
         "status": status,
         "township": township,
@@ -48,10 +53,13 @@ def create_accommodation(
 
 
 @router.get("/{id}", response_model=schemas.Accommodation, summary="取得特定庇護所")
-def get_accommodation(id: str, db: Session = Depends(get_db)):
+def get_accommodation(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一住宿資源
     """
+    cached = etag.not_modified(request, response, db, models.Accommodation, id)
+    if cached is not None:
+        return cached
     db_accommodation = crud.get_by_id(db, models.Accommodation, id)
     if db_accommodation is None:
         raise HTTPException(status_code=404, detail="Accommodation not found")
@@ -65,7 +73,7 @@ def get_accommodation(id: str, db: Session = Depends(get_db)):
     dependencies=[Security(require_modify_api_key)],
 )
 def patch_accommodation(
-        id: str, accommodation_in: schemas.AccommodationPatch, db: Session = Depends(get_db)
+        id: str, accommodation_in: schemas.AccommodationPatch, request: Request, response: Response, db: Session = Depends(get_db)
 ):
     """
     更新住宿資源 (部分欄位)
@@ -73,4 +81,4 @@ def patch_accommodation(
     db_accommodation = crud.get_by_id(db, models.Accommodation, id)
     if db_accommodation is None:
         raise HTTPException(status_code=404, detail="Accommodation not found")
-    return crud.update(db, db_obj=db_accommodation, obj_in=accommodation_in)
+    return etag.update_if_match(request, response, db, db_obj=db_accommodation, obj_in=accommodation_in)
@@ -0,0 +1,46 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from .. import schemas
+from ..change_feed import TRACKED_TYPES, get_changes
+from ..database import get_db
+
+router = APIRouter(
+    prefix="/changes",
+    tags=["異動紀錄（Changes）"],
+)
+
+
+@router.get("", response_model=schemas.ChangeFeed, summary="取得資源異動紀錄")
+def list_changes(
+    since: Optional[str] = Query(None, description="上一次回應的 next cursor；不帶則從最舊的紀錄開始"),
+    types: Optional[str] = Query(None, description="以逗號分隔的資源類型，例如：supplies,human_resources"),
+    limit: int = Query(500, ge=1, le=2000),
+    db: Session = Depends(get_db),
+):
+    """
+    取得自 since 之後的資源異動（新增 / 更新 / 刪除），依發生順序排列。
+
+    - 回應僅包含資源類型、ID 與異動類型，需要內容時再查詢對應資源
+    - 刪除以 op=deleted 的 tombstone 表示
+    - 紀錄保留 CHANGE_LOG_RETENTION_DAYS 天；cursor 之後有紀錄已被清除時回傳 410，需重新全量同步
+    """
+    type_list = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    if type_list:
+        unknown = set(type_list) - TRACKED_TYPES
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown types: {', '.join(sorted(unknown))}")
+
+    rows, next_cursor, has_more = get_changes(db, since=since, types=type_list, limit=limit)
+    member = [
+        {
+            "type": row.resource_type,
+            "id": row.resource_id,
+            "op": row.op,
+            "changed_at": int(row.changed_at.timestamp()),
+        }
+        for row in rows
+    ]
+    return {"member": member, "limit": limit, "next": next_cursor, "has_more": has_more}
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from typing import Optional, Literal
 import asyncio
 
-from .. import crud, models, schemas
+from .. import crud, etag, idempotency, models, schemas
 from ..database import get_db
 from ..enum_serializer import (
     HumanResourceRoleStatusEnum,
@@ -31,6 +32,10 @@ def list_human_resources(
     q_role: Optional[str] = Query(None),
     role_status: Optional[HumanResourceRoleStatusEnum] = Query(None),
     role_type: Optional[HumanResourceRoleTypeEnum] = Query(None),
+    ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
+    updated_since: Optional[int] = Query(
+        None, ge=0, description="只回傳 updated_at 大於等於此時間（epoch 秒）的資料，並改為依 updated_at 由舊到新排序，供增量同步使用"
+    ),
     limit: int = Query(20, ge=1, le=200),
     offset: int = Query(0, ge=0),
     order_by_time: Optional[Literal["asc", "desc"]] = Query(
@@ -42,7 +47,17 @@ def list_human_resources(
     取得人力需求清單 (分頁)
 
     - order_by: 指定時間排序方式，可選 "asc" (由舊到新) 或 "desc" (由新到舊)
+    - updated_since: 增量同步用，指定時忽略 order_by_time，依 (updated_at, id) 由舊到新排序
+    - ids: 已完成（status=completed）的資料不回傳，列在 missing 中
     """
+    if ids:
+        requested = crud.parse_ids(ids)
+        rows, _ = crud.get_multi_by_ids(db, models.HumanResource, requested)
+        # 列表中已完成的資料會遮蔽 id；以 ids 查詢時不回傳，改列入 missing，讓 member 與 missing 涵蓋所有 id
+        rows = [row for row in rows if row.status != HumanResourceStatusEnum.completed.value]
+        found = {row.id for row in rows}
+        return crud.build_ids_collection(rows, [i for i in requested if i not in found])
+
     filters = {
         "status": status,
         "role_status": role_status,
@@ -69,7 +84,11 @@ def list_human_resources(
                 )
             query = query.filter(or_(*keyword_clauses))
 
-    if order_by_time == "asc":
+    if updated_since is not None:
+        query = query.filter(
+            models.HumanResource.updated_at >= datetime.fromtimestamp(updated_since, tz=timezone.utc)
+        ).order_by(models.HumanResource.updated_at.asc(), models.HumanResource.id.asc())
+    elif order_by_time == "asc":
         query = query.order_by(models.HumanResource.created_at.asc())
     elif order_by_time == "desc":
         query = query.order_by(models.HumanResource.created_at.desc())
@@ -94,10 +113,12 @@ def list_human_resources(
     summary="建立人力需求",
 )
 async def create_human_resource(
-    resource_in: schemas.HumanResourceCreate, db: Session = Depends(get_db)
+    request: Request, resource_in: schemas.HumanResourceCreate, db: Session = Depends(get_db)
 ):
     """
     建立人力需求/角色
+
+    支援 Idempotency-Key header：重試相同請求時直接回傳第一次的結果，不會重複建立或通知。
     """
     if resource_in.headcount_got > resource_in.headcount_need:
         raise HTTPException(
@@ -105,25 +126,31 @@ async def create_human_resource(
             detail="headcount_got must be less than or equal to headcount_need.",
         )
 
-    created_resource = crud.create_with_input(
-        db, models.HumanResource, obj_in=resource_in, valid_pin=generate_pin()
-    )
+    async def _create():
+        created_resource = crud.create_with_input(
+            db, models.HumanResource, obj_in=resource_in, valid_pin=generate_pin()
+        )
+
+        # Send notification to Discord in the background
+        message_content = "新的志工人力需求已建立 ✨"
+        embed_data = resource_in.model_dump(mode="json")
+        asyncio.create_task(
+            send_discord_message(content=message_content, embed_data=embed_data)
+        )
 
-    # Send notification to Discord in the background
-    message_content = "新的志工人力需求已建立 ✨"
-    embed_data = resource_in.model_dump(mode="json")
-    asyncio.create_task(
-        send_discord_message(content=message_content, embed_data=embed_data)
-    )
+        return schemas.HumanResourceWithPin.model_validate(created_resource)
 
-    return created_resource
+    return await idempotency.run_once(request, resource_in, _create)
 
 
 @router.get("/{id}", response_model=schemas.HumanResource, summary="取得特定人力需求")
-def get_human_resource(id: str, db: Session = Depends(get_db)):
+def get_human_resource(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一人力需求/角色
     """
+    cached = etag.not_modified(request, response, db, models.HumanResource, id)
+    if cached is not None:
+        return cached
     db_resource = crud.get_by_id(db, models.HumanResource, id)
     if db_resource is None:
         raise HTTPException(status_code=404, detail="Human Resource not found")
@@ -137,7 +164,7 @@ def get_human_resource(id: str, db: Session = Depends(get_db)):
     # dependencies=[Security(require_modify_api_key)],
 )
 def patch_human_resource(
-    id: str, resource_in: schemas.HumanResourcePatch, db: Session = Depends(get_db)
+    id: str, resource_in: schemas.HumanResourcePatch, request: Request, response: Response, db: Session = Depends(get_db)
 ):
     """
     更新人力需求/角色 (部分欄位)
@@ -175,4 +202,4 @@ def patch_human_resource(
                 status_code=400,
                 detail="headcount_got must be less than or equal to headcount_need.",
             )
-    return crud.update(db, db_obj=db_resource, obj_in=resource_in)
+    return etag.update_if_match(request, response, db, db_obj=db_resource, obj_in=resource_in)
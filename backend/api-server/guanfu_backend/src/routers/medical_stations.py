@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
+from .. import crud, etag, models, schemas
 from ..database import get_db
 from ..api_key import require_modify_api_key
 from ..enum_serializer import MedicalStationTypeEnum, MedicalStationStatusEnum
@@ -18,6 +18,7 @@ def list_medical_stations(
         request: Request,
         status: Optional[MedicalStationStatusEnum] = Query(None),
         station_type: Optional[MedicalStationTypeEnum] = Query(None),
+        ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db)
@@ -25,6 +26,10 @@ def list_medical_stations(
     """
     取得醫療站清單 (分頁)
     """
+    if ids:
+        rows, missing = crud.get_multi_by_ids(db, models.MedicalStation, crud.parse_ids(ids))
+        return crud.build_ids_collection(rows, missing)
+
     filters = {"status": status, "station_type": station_type}
     stations = crud.get_multi(db, models.MedicalStation, skip=offset, limit=limit, **filters)
     total = crud.count(db, models.MedicalStation, **filters)
@@ -43,10 +48,13 @@ def create_medical_station(
 
 
 @router.get("/{id}", response_model=schemas.MedicalStation, summary="取得特定醫療站")
-def get_medical_station(id: str, db: Session = Depends(get_db)):
+def get_medical_station(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一醫療站
     """
+    cached = etag.not_modified(request, response, db, models.MedicalStation, id)
+    if cached is not None:
+        return cached
     db_station = crud.get_by_id(db, models.MedicalStation, id)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Medical Station not found")
@@ -60,7 +68,7 @@ def get_medical_station(id: str, db: Session = Depends(get_db)):
     dependencies=[Security(require_modify_api_key)],
 )
 def patch_medical_station(
-        id: str, station_in: schemas.MedicalStationPatch, db: Session = Depends(get_db)
+        id: str, station_in: schemas.MedicalStationPatch, request: Request, response: Response, db: Session = Depends(get_db)
 ):
     """
     更新醫療站 (部分欄位)
@@ -68,4 +76,4 @@ def patch_medical_station(
     db_station = crud.get_by_id(db, models.MedicalStation, id)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Medical Station not found")
-    return crud.update(db, db_obj=db_station, obj_in=station_in)
+    return etag.update_if_match(request, response, db, db_obj=db_station, obj_in=station_in)
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
+from .. import crud, etag, models, schemas
 from ..database import get_db
 from ..api_key import require_modify_api_key
 from ..enum_serializer import MentalHealthDurationEnum, MentalHealthFormatEnum, MentalHealthResourceStatusEnum
@@ -19,6 +19,7 @@ def list_mental_health_resources(
         status: Optional[MentalHealthResourceStatusEnum] = Query(None),
         duration_type: Optional[MentalHealthDurationEnum] = Query(None),
         service_format: Optional[MentalHealthFormatEnum] = Query(None),
+        ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db)
@@ -26,6 +27,10 @@ def list_mental_health_resources(
     """
     取得心理健康資源清單 (分頁)
     """
+    if ids:
+        rows, missing = crud.get_multi_by_ids(db, models.MentalHealthResource, crud.parse_ids(ids))
+        return crud.build_ids_collection(rows, missing)
+
     filters = {
         "status": status,
         "duration_type": duration_type,
@@ -48,10 +53,13 @@ def create_mental_health_resource(
 
 
 @router.get("/{id}", response_model=schemas.MentalHealthResource, summary="取得特定心理健康資源")
-def get_mental_health_resource(id: str, db: Session = Depends(get_db)):
+def get_mental_health_resource(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一心理健康資源
     """
+    cached = etag.not_modified(request, response, db, models.MentalHealthResource, id)
+    if cached is not None:
+        return cached
     db_resource = crud.get_by_id(db, models.MentalHealthResource, id)
     if db_resource is None:
         raise HTTPException(status_code=404, detail="Mental Health Resource not found")
@@ -65,7 +73,7 @@ def get_mental_health_resource(id: str, db: Session = Depends(get_db)):
     dependencies=[Security(require_modify_api_key)],
 )
 def patch_mental_health_resource(
-        id: str, resource_in: schemas.MentalHealthResourcePatch, db: Session = Depends(get_db)
+        id: str, resource_in: schemas.MentalHealthResourcePatch, request: Request, response: Response, db: Session = Depends(get_db)
 ):
     """
     更新心理健康資源 (部分欄位)
@@ -73,4 +81,4 @@ def patch_mental_health_resource(
     db_resource = crud.get_by_id(db, models.MentalHealthResource, id)
     if db_resource is None:
         raise HTTPException(status_code=404, detail="Mental Health Resource not found")
-    return crud.update(db, db_obj=db_resource, obj_in=resource_in)
+    return etag.update_if_match(request, response, db, db_obj=db_resource, obj_in=resource_in)
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from sqlalchemy.orm import Session, selectinload
 from typing import Optional
-from .. import crud, models, schemas
+from .. import crud, etag, models, schemas
 from ..database import get_db
 from ..api_key import require_modify_api_key
 from ..schemas import PlaceStatusEnum, PlaceTypeEnum
@@ -13,11 +13,20 @@ router = APIRouter(
 )
 
 
+def _embed_options(embed: Optional[str]) -> list:
+    # 以 selectinload 載入：每種需求對整頁場所只發一次 IN 查詢，不會每個場所各查一次
+    if embed == "requirements":
+        return [selectinload(models.Place.requirements_hr), selectinload(models.Place.requirements_supplies)]
+    return []
+
+
 @router.get("", response_model=schemas.PlaceCollection, summary="取得場所清單")
 def list_places(
         request: Request,
         status: Optional[PlaceStatusEnum] = Query(None),
         type: Optional[PlaceTypeEnum] = Query(None),
+        embed: Optional[str] = Query(None, enum=["requirements"], description="requirements：一併帶出人力與物資需求"),
+        ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db)
@@ -28,9 +37,18 @@ def list_places(
     支援過濾條件：
     - status: 場所狀態 (開放/暫停/關閉)
     - type: 場所類型 (醫療/加水/廁所/洗澡/避難/住宿/物資/心理援助)
+
+    embed=requirements 時，每個場所會帶出 requirements_hr 與 requirements_supplies
     """
+    options = _embed_options(embed)
+    if ids:
+        rows, missing = crud.get_multi_by_ids(db, models.Place, crud.parse_ids(ids), options=options)
+        return crud.build_ids_collection(rows, missing)
+
     filters = {"status": status, "type": type}
-    places = crud.get_multi(db, models.Place, skip=offset, limit=limit, order_by=models.Place.updated_at.desc(), **filters)
+    places = crud.get_multi(
+        db, models.Place, skip=offset, limit=limit, order_by=models.Place.updated_at.desc(), options=options, **filters
+    )
     total = crud.count(db, models.Place, **filters)
     next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
     return {"member": places, "totalItems": total, "limit": limit, "offset": offset, "next": next_link}
@@ -64,11 +82,20 @@ def create_place(
 
 
 @router.get("/{id}", response_model=schemas.Place, summary="取得特定場所")
-def get_place(id: str, db: Session = Depends(get_db)):
+def get_place(
+        id: str,
+        request: Request,
+        response: Response,
+        embed: Optional[str] = Query(None, enum=["requirements"], description="requirements：一併帶出人力與物資需求"),
+        db: Session = Depends(get_db),
+):
     """
     取得單一場所詳細資訊
     """
-    db_place = crud.get_by_id(db, models.Place, id)
+    cached = etag.not_modified(request, response, db, models.Place, id, embed=embed)
+    if cached is not None:
+        return cached
+    db_place = db.query(models.Place).options(*_embed_options(embed)).filter(models.Place.id == id).first()
     if db_place is None:
         raise HTTPException(status_code=404, detail="Place not found")
     return db_place
@@ -81,7 +108,7 @@ def get_place(id: str, db: Session = Depends(get_db)):
     dependencies=[Security(require_modify_api_key)],
 )
 def patch_place(
-        id: str, place_in: schemas.PlacePatch, db: Session = Depends(get_db)
+        id: str, place_in: schemas.PlacePatch, request: Request, response: Response, db: Session = Depends(get_db)
 ):
     """
     更新場所資訊 (部分欄位)
@@ -91,4 +118,4 @@ def patch_place(
     db_place = crud.get_by_id(db, models.Place, id)
     if db_place is None:
         raise HTTPException(status_code=404, detail="Place not found")
-    return crud.update(db, db_obj=db_place, obj_in=place_in)
+    return etag.update_if_match(request, response, db, db_obj=db_place, obj_in=place_in)
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
+from .. import crud, etag, models, schemas
 from ..database import get_db
 from ..api_key import require_modify_api_key
 
@@ -16,6 +16,7 @@ router = APIRouter(
 def list_reports(
         request: Request,
         status: Optional[str] = Query(None),
+        ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db)
@@ -23,6 +24,10 @@ def list_reports(
     """
     取得回報事件清單 (分頁)
     """
+    if ids:
+        rows, missing = crud.get_multi_by_ids(db, models.Report, crud.parse_ids(ids))
+        return crud.build_ids_collection(rows, missing)
+
     filters = {"status": status}
     reports = crud.get_multi(db, models.Report, skip=offset, limit=limit, **filters)
     total = crud.count(db, models.Report, **filters)
@@ -41,10 +46,13 @@ def create_report(
 
 
 @router.get("/{id}", response_model=schemas.Report, summary="取得特定回報事件")
-def get_report(id: str, db: Session = Depends(get_db)):
+def get_report(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一回報事件
     """
+    cached = etag.not_modified(request, response, db, models.Report, id)
+    if cached is not None:
+        return cached
     db_report = crud.get_by_id(db, models.Report, id)
     if db_report is None:
         raise HTTPException(status_code=404, detail="Report not found")
@@ -58,7 +66,7 @@ def get_report(id: str, db: Session = Depends(get_db)):
     dependencies=[Security(require_modify_api_key)],
 )
 def patch_report(
-        id: str, report_in: schemas.ReportPatch, db: Session = Depends(get_db)
+        id: str, report_in: schemas.ReportPatch, request: Request, response: Response, db: Session = Depends(get_db)
 ):
     """
     更新回報事件 (部分欄位)
@@ -66,4 +74,4 @@ def patch_report(
     db_report = crud.get_by_id(db, models.Report, id)
     if db_report is None:
         raise HTTPException(status_code=404, detail="Report not found")
-    return crud.update(db, db_obj=db_report, obj_in=report_in)
+    return etag.update_if_match(request, response, db, db_obj=db_report, obj_in=report_in)
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
+from .. import crud, etag, models, schemas
 from ..database import get_db
 from ..api_key import require_modify_api_key
 from ..schemas import RequirementsSuppliesTypeEnum
@@ -18,6 +18,7 @@ def list_requirements_supplies(
         request: Request,
         place_id: Optional[str] = Query(None, description="篩選特定場所的物資需求"),
         required_type: Optional[RequirementsSuppliesTypeEnum] = Query(None, description="篩選特定類型的物資需求"),
+        ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db)
@@ -29,6 +30,10 @@ def list_requirements_supplies(
     - place_id: 場所 ID
     - required_type: 需求類型
     """
+    if ids:
+        rows, missing = crud.get_multi_by_ids(db, models.RequirementsSupplies, crud.parse_ids(ids))
+        return crud.build_ids_collection(rows, missing)
+
     filters = {"place_id": place_id, "required_type": required_type}
     requirements = crud.get_multi(
         db,
@@ -77,10 +82,13 @@ def create_requirement_supply(
 
 
 @router.get("/{id}", response_model=schemas.RequirementsSupplies, summary="取得特定物資需求")
-def get_requirement_supply(id: str, db: Session = Depends(get_db)):
+def get_requirement_supply(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一物資需求詳細資訊
     """
+    cached = etag.not_modified(request, response, db, models.RequirementsSupplies, id)
+    if cached is not None:
+        return cached
     db_requirement = crud.get_by_id(db, models.RequirementsSupplies, id)
     if db_requirement is None:
         raise HTTPException(status_code=404, detail="Requirement Supply not found")
@@ -94,7 +102,7 @@ def get_requirement_supply(id: str, db: Session = Depends(get_db)):
     dependencies=[Security(require_modify_api_key)],
 )
 def patch_requirement_supply(
-        id: str, requirement_in: schemas.RequirementsSuppliesPatch, db: Session = Depends(get_db)
+        id: str, requirement_in: schemas.RequirementsSuppliesPatch, request: Request, response: Response, db: Session = Depends(get_db)
 ):
     """
     更新物資需求資訊 (部分欄位)
@@ -111,7 +119,7 @@ def patch_requirement_supply(
         if not place:
             raise HTTPException(status_code=404, detail=f"Place with id {requirement_in.place_id} not found")
 
-    return crud.update(db, db_obj=db_requirement, obj_in=requirement_in)
+    return etag.update_if_match(request, response, db, db_obj=db_requirement, obj_in=requirement_in)
 
 
 @router.delete(
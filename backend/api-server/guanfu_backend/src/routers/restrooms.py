@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
+from .. import crud, etag, models, schemas
 from ..database import get_db
 from ..api_key import require_modify_api_key
 from ..enum_serializer import RestroomFacilityTypeEnum, RestroomStatusEnum
@@ -21,6 +21,7 @@ def list_restrooms(
         is_free: Optional[bool] = Query(None),
         has_water: Optional[bool] = Query(None),
         has_lighting: Optional[bool] = Query(None),
+        ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db)
@@ -28,6 +29,10 @@ def list_restrooms(
     """
     取得廁所點清單 (分頁)
     """
+    if ids:
+        rows, missing = crud.get_multi_by_ids(db, models.Restroom, crud.parse_ids(ids))
+        return crud.build_ids_collection(rows, missing)
+
     filters = {
         "status": status,
         "facility_type": facility_type,
@@ -52,10 +57,13 @@ def create_restroom(
 
 
 @router.get("/{id}", response_model=schemas.Restroom, summary="取得特定廁所點")
-def get_restroom(id: str, db: Session = Depends(get_db)):
+def get_restroom(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一廁所點
     """
+    cached = etag.not_modified(request, response, db, models.Restroom, id)
+    if cached is not None:
+        return cached
     db_restroom = crud.get_by_id(db, models.Restroom, id)
     if db_restroom is None:
         raise HTTPException(status_code=404, detail="Restroom not found")
@@ -69,7 +77,7 @@ def get_restroom(id: str, db: Session = Depends(get_db)):
     dependencies=[Security(require_modify_api_key)],
 )
 def patch_restroom(
-        id: str, restroom_in: schemas.RestroomPatch, db: Session = Depends(get_db)
+        id: str, restroom_in: schemas.RestroomPatch, request: Request, response: Response, db: Session = Depends(get_db)
 ):
     """
     更新廁所點 (部分欄位)
@@ -77,4 +85,4 @@ def patch_restroom(
     db_restroom = crud.get_by_id(db, models.Restroom, id)
     if db_restroom is None:
         raise HTTPException(status_code=404, detail="Restroom not found")
-    return crud.update(db, db_obj=db_restroom, obj_in=restroom_in)
+    return etag.update_if_match(request, response, db, db_obj=db_restroom, obj_in=restroom_in)
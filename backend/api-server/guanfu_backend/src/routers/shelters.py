@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional
-from .. import crud, models, schemas
+from .. import crud, etag, models, schemas
 from ..database import get_db
 from ..api_key import require_modify_api_key
 from ..schemas import ShelterStatusEnum
@@ -16,6 +16,7 @@ router = APIRouter(
 def list_shelters(
         request: Request,
         status: Optional[ShelterStatusEnum] = Query(None),
+        ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db)
@@ -23,6 +24,10 @@ def list_shelters(
     """
     取得庇護所清單 (分頁)
     """
+    if ids:
+        rows, missing = crud.get_multi_by_ids(db, models.Shelter, crud.parse_ids(ids))
+        return crud.build_ids_collection(rows, missing)
+
     filters = {"status": status}
     shelters = crud.get_multi(db, models.Shelter, skip=offset, limit=limit, **filters)
     total = crud.count(db, models.Shelter, **filters)
@@ -41,10 +46,13 @@ def create_shelter(
 
 
 @router.get("/{id}", response_model=schemas.Shelter, summary="取得特定庇護所")
-def get_shelter(id: str, db: Session = Depends(get_db)):
+def get_shelter(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一庇護所
     """
+    cached = etag.not_modified(request, response, db, models.Shelter, id)
+    if cached is not None:
+        return cached
     db_shelter = crud.get_by_id(db, models.Shelter, id)
     if db_shelter is None:
         raise HTTPException(status_code=404, detail="Shelter not found")
@@ -58,7 +66,7 @@ def get_shelter(id: str, db: Session = Depends(get_db)):
     dependencies=[Security(require_modify_api_key)],
 )
 def patch_shelter(
-        id: str, shelter_in: schemas.ShelterPatch, db: Session = Depends(get_db)
+        id: str, shelter_in: schemas.ShelterPatch, request: Request, response: Response, db: Session = Depends(get_db)
 ):
     """
     更新庇護所 (部分欄位)
@@ -66,4 +74,4 @@ def patch_shelter(
     db_shelter = crud.get_by_id(db, models.Shelter, id)
     if db_shelter is None:
         raise HTTPException(status_code=404, detail="Shelter not found")
-    return crud.update(db, db_obj=db_shelter, obj_in=shelter_in)
+    return etag.update_if_match(request, response, db, db_obj=db_shelter, obj_in=shelter_in)
@@ -1,9 +1,9 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
 from sqlalchemy.orm import Session
 
-from .. import crud, models, schemas
+from .. import crud, etag, models, schemas
 from ..database import get_db
 from ..api_key import require_modify_api_key
 from ..enum_serializer import ShowerFacilityTypeEnum, ShowerStationStatusEnum
@@ -22,6 +22,7 @@ def list_shower_stations(
         facility_type: Optional[ShowerFacilityTypeEnum] = Query(None),
         is_free: Optional[bool] = Query(None),
         requires_appointment: Optional[bool] = Query(None),
+        ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db)
@@ -29,6 +30,10 @@ def list_shower_stations(
     """
     取得洗澡點清單 (分頁)
     """
+    if ids:
+        rows, missing = crud.get_multi_by_ids(db, models.ShowerStation, crud.parse_ids(ids))
+        return crud.build_ids_collection(rows, missing)
+
     filters = {
         "status": status,
         "facility_type": facility_type,
@@ -52,10 +57,13 @@ def create_shower_station(
 
 
 @router.get("/{id}", response_model=schemas.ShowerStation, summary="取得特定洗澡點")
-def get_shower_station(id: str, db: Session = Depends(get_db)):
+def get_shower_station(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一洗澡點
     """
+    cached = etag.not_modified(request, response, db, models.ShowerStation, id)
+    if cached is not None:
+        return cached
     db_station = crud.get_by_id(db, models.ShowerStation, id)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Shower Station not found")
@@ -69,7 +77,7 @@ def get_shower_station(id: str, db: Session = Depends(get_db)):
     dependencies=[Security(require_modify_api_key)],
 )
 def patch_shower_station(
-        id: str, station_in: schemas.ShowerStationPatch, db: Session = Depends(get_db)
+        id: str, station_in: schemas.ShowerStationPatch, request: Request, response: Response, db: Session = Depends(get_db)
 ):
     """
     更新洗澡點 (部分欄位)
@@ -77,4 +85,4 @@ def patch_shower_station(
     db_station = crud.get_by_id(db, models.ShowerStation, id)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Shower Station not found")
-    return crud.update(db, db_obj=db_station, obj_in=station_in)
+    return etag.update_if_match(request, response, db, db_obj=db_station, obj_in=station_in)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.orm import Session
+
+from .. import dashboard_stats, schemas
+from ..config import settings
+from ..database import get_db
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["統計（Stats）"],
+)
+
+
+@router.get("", response_model=schemas.DashboardStats, summary="取得儀表板統計")
+def get_stats(response: Response, db: Session = Depends(get_db)):
+    """
+    各資源依類型 / 狀態分組的筆數，以及人力、物資的需求數與已到位數。
+
+    資料來自定期重新整理的 materialized view（每 STATS_REFRESH_INTERVAL_SECONDS 秒），
+    不會即時反映最新寫入；refreshed_at 為統計產生時間。
+    """
+    response.headers["Cache-Control"] = f"public, max-age={settings.STATS_CACHE_SECONDS}"
+    return dashboard_stats.get_cached_stats(db)
@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ..change_feed import TRACKED_TYPES
+from ..config import settings
+from ..live_events import broadcaster
+
+router = APIRouter(
+    prefix="/stream",
+    tags=["即時推播（Stream）"],
+)
+
+MAX_TOPICS = 50
+
+
+def _parse_topics(raw: str) -> frozenset:
+    topics = [t.strip() for t in raw.split(",") if t.strip()]
+    if not topics:
+        raise HTTPException(status_code=400, detail="At least one topic is required")
+    if len(topics) > MAX_TOPICS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TOPICS} topics are allowed")
+    unknown = sorted({t for t in topics if t.split(":", 1)[0] not in TRACKED_TYPES})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(unknown)}")
+    return frozenset(topics)
+
+
+@router.get("", summary="訂閱資源即時異動（Server-Sent Events）")
+async def stream_changes(
+        request: Request,
+        topics: str = Query(..., description="以逗號分隔的 topic，例如：supplies:{id},places"),
+):
+    """
+    以 SSE 推播資源異動，取代對 GET /supplies/{id} 等端點的輪詢。
+
+    - topic 為資源類型（如 places）或「資源類型:ID」（如 supplies:{id}）
+    - supply_items 的異動也會推播到 supplies:{supply_id}；需求單則推播到 places:{place_id}
+    - 每筆事件為 `event: change`，data 含 type、id、op，以及 received_count 等進度欄位（若有）
+    - 斷線期間的異動不會補送，重連後可用 GET /changes 補齊
+    """
+    topic_set = _parse_topics(topics)
+    sub = broadcaster.subscribe(topic_set)
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not sub.overflowed:
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=settings.STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # 註解行作為 heartbeat，避免 proxy 因閒置而切斷連線
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: change\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            broadcaster.unsubscribe(sub)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # 關閉 nginx 緩衝，事件才會即時送出
+        },
+    )
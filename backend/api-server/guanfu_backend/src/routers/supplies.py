@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
+from datetime import datetime, timezone
 from sqlalchemy import desc
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import Optional, List, Literal
 import asyncio
 
-from .. import crud, models, schemas
+from .. import crud, etag, idempotency, models, schemas
 from ..crud import (
     get_full_supply,
     supply_merge_item_counts,
@@ -25,6 +26,10 @@ router = APIRouter(
 def list_supplies(
     request: Request,
     embed: Optional[str] = Query(None, enum=["all"]),
+    ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
+    updated_since: Optional[int] = Query(
+        None, ge=0, description="只回傳 updated_at 大於等於此時間（epoch 秒）的資料，並改為依 updated_at 由舊到新排序，供增量同步使用"
+    ),
     limit: int = Query(50, ge=1, le=500),
     offset: int = Query(0, ge=0),
     db: Session = Depends(get_db),
@@ -33,7 +38,36 @@ def list_supplies(
     取得供應單清單 (分頁)
 
     - order_by: 指定時間排序方式，可選 "asc" (由舊到新) 或 "desc" (由新到舊)，預設為 desc (最新的在前)
+    - updated_since: 增量同步用；物資項目異動時會一併更新供應單的 updated_at
     """
+    if ids:
+        options = [joinedload(models.Supply.supplies)] if embed == "all" else []
+        rows, missing = crud.get_multi_by_ids(db, models.Supply, crud.parse_ids(ids), options=options)
+        return crud.build_ids_collection(rows, missing)
+
+    if updated_since is not None:
+        # (updated_at, id) 排序固定，同一秒內的多筆資料也能以 offset 接續分頁
+        query = db.query(models.Supply).filter(
+            models.Supply.updated_at >= datetime.fromtimestamp(updated_since, tz=timezone.utc)
+        )
+        if embed == "all":
+            query = query.options(selectinload(models.Supply.supplies))
+        total = query.count()
+        supplies = (
+            query.order_by(models.Supply.updated_at.asc(), models.Supply.id.asc())
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+        next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
+        return {
+            "member": supplies,
+            "totalItems": total,
+            "limit": limit,
+            "offset": offset,
+            "next": next_link,
+        }
+
     order_by = desc(models.Supply.updated_at)
 
     supplies = crud.get_multi(
@@ -63,21 +97,29 @@ def list_supplies(
 @router.post(
     "", response_model=schemas.SupplyWithPin, status_code=201, summary="建立供應單"
 )
-async def create_supply(supply_in: schemas.SupplyCreate, db: Session = Depends(get_db)):
+async def create_supply(
+    request: Request, supply_in: schemas.SupplyCreate, db: Session = Depends(get_db)
+):
     """
     建立供應單 (注意：同時建立 supply_items 的邏輯需在 crud 中客製化)
+
+    支援 Idempotency-Key header：重試相同請求時直接回傳第一次的結果，不會重複建立或通知。
     """
-    # This requires custom logic in crud.py to handle the nested `supplies` object
-    created_supply = crud.create_supply_with_items(db, obj_in=supply_in)
-
-    # Send Discord notification in background
-    message_content = "新的物資供應已建立 📦"
-    embed_data = supply_in.model_dump(mode="json")
-    asyncio.create_task(
-        send_discord_message(content=message_content, embed_data=embed_data)
-    )
 
-    return created_supply
+    async def _create():
+        # This requires custom logic in crud.py to handle the nested `supplies` object
+        created_supply = crud.create_supply_with_items(db, obj_in=supply_in)
+
+        # Send Discord notification in background
+        message_content = "新的物資供應已建立 📦"
+        embed_data = supply_in.model_dump(mode="json")
+        asyncio.create_task(
+            send_discord_message(content=message_content, embed_data=embed_data)
+        )
+
+        return schemas.SupplyWithPin.model_validate(created_supply)
+
+    return await idempotency.run_once(request, supply_in, _create)
 
 
 # 在 patch_supply 禁止更新已全部到貨的供應單
@@ -88,7 +130,9 @@ async def create_supply(supply_in: schemas.SupplyCreate, db: Session = Depends(g
     summary="更新供應單",
     # dependencies=[Security(require_modify_api_key)],
 )
-def patch_supply(id: str, supply_in: schemas.SupplyPatch, db: Session = Depends(get_db)):
+def patch_supply(
+    id: str, supply_in: schemas.SupplyPatch, request: Request, response: Response, db: Session = Depends(get_db)
+):
     db_supply = crud.get_by_id(db, models.Supply, id)
     if db_supply is None:
         raise HTTPException(status_code=404, detail="Supply not found")
@@ -102,14 +146,17 @@ def patch_supply(id: str, supply_in: schemas.SupplyPatch, db: Session = Depends(
     # if db_supply.valid_pin and db_supply.valid_pin != supply_in.valid_pin:
     #     raise HTTPException(status_code=400, detail="The PIN you entered is incorrect.")
 
-    return crud.update(db, db_obj=db_supply, obj_in=supply_in)
+    return etag.update_if_match(request, response, db, db_obj=db_supply, obj_in=supply_in)
 
 
 @router.get("/{id}", response_model=schemas.Supply, summary="取得特定供應單")
-def get_supply(id: str, db: Session = Depends(get_db)):
+def get_supply(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一供應單 (包含其所有物資項目)
     """
+    cached = etag.not_modified(request, response, db, models.Supply, id)
+    if cached is not None:
+        return cached
     db_supply = (
         db.query(models.Supply)
         .options(joinedload(models.Supply.supplies))
@@ -1,9 +1,9 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
 from sqlalchemy.orm import Session
 
-from .. import crud, models, schemas
+from .. import crud, etag, models, schemas
 from ..database import get_db
 from ..api_key import require_modify_api_key
 from ..enum_serializer import SupplyItemTypeEnum
@@ -20,6 +20,7 @@ def list_supply_items(
         request: Request,
         supply_id: Optional[str] = Query(None),
         tag: Optional[SupplyItemTypeEnum] = Query(None),
+        ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
         limit: int = Query(100, ge=1, le=500),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db)
@@ -27,6 +28,10 @@ def list_supply_items(
     """
     取得物資項目清單 (分頁)
     """
+    if ids:
+        rows, missing = crud.get_multi_by_ids(db, models.SupplyItem, crud.parse_ids(ids))
+        return crud.build_ids_collection(rows, missing)
+
     filters = {"supply_id": supply_id, "tag": tag.value if tag else None, }
     items = crud.get_multi(db, models.SupplyItem, skip=offset, limit=limit, **filters)
     total = crud.count(db, models.SupplyItem, **filters)
@@ -52,6 +57,7 @@ def create_supply_item(
     # remove unused columns
     supply_item = item_in.model_dump()
     del supply_item["valid_pin"]
+    crud.touch_supply(parent_supply)
     return crud.create(db, models.SupplyItem, obj_in=schemas.SupplyItemCreate(**supply_item))
 
 
@@ -63,7 +69,7 @@ def create_supply_item(
     dependencies=[Security(require_modify_api_key)],
 )
 def patch_supply_item(
-        id: str, item_in: schemas.SupplyItemPatch, db: Session = Depends(get_db)
+        id: str, item_in: schemas.SupplyItemPatch, request: Request, response: Response, db: Session = Depends(get_db)
 ):
     """
     更新物資項目
@@ -82,14 +88,18 @@ def patch_supply_item(
         received_count = item_in.received_count if item_in.received_count is not None else db_supply_item.received_count
         if received_count > total_number:
             raise HTTPException(status_code=400, detail="Received_count must be less than or equal to total_number.")
-    return crud.update(db, db_obj=db_supply_item, obj_in=item_in)
+    crud.touch_supply(db_supply_item.supply)
+    return etag.update_if_match(request, response, db, db_obj=db_supply_item, obj_in=item_in)
 
 
 @router.get("/{id}", response_model=schemas.SupplyItem, summary="取得特定物資項目")
-def get_supply_item(id: str, db: Session = Depends(get_db)):
+def get_supply_item(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一物資項目
     """
+    cached = etag.not_modified(request, response, db, models.SupplyItem, id)
+    if cached is not None:
+        return cached
     db_item = crud.get_by_id(db, models.SupplyItem, id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Supply Item not found")
@@ -1,9 +1,9 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
 from sqlalchemy.orm import Session
 
-from .. import crud, models, schemas
+from .. import crud, etag, models, schemas
 from ..database import get_db
 from ..services.line_auth import verify_user_token
 
@@ -18,6 +18,7 @@ router = APIRouter(
 def list_supply_providers(
         request: Request,
         supply_item_id: Optional[str] = Query(None),
+        ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db)
@@ -25,6 +26,10 @@ def list_supply_providers(
     """
     取得物資供應提供者清單 (分頁)
     """
+    if ids:
+        rows, missing = crud.get_multi_by_ids(db, models.SupplyProvider, crud.parse_ids(ids))
+        return crud.build_ids_collection(rows, missing)
+
     filters = {"supply_item_id": supply_item_id}
     providers = crud.get_multi(
         db,
@@ -70,6 +75,8 @@ def create_supply_provider(
 def patch_supply_provider(
     id: str,
     provider_in: schemas.SupplyProviderPatch,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
 ):
     """
@@ -88,14 +95,17 @@ def patch_supply_provider(
         if not crud.get_by_id(db, models.SupplyItem, new_supply_item_id):
             raise HTTPException(status_code=404, detail="Supply Item not found")
 
-    return crud.update(db, db_obj=db_provider, obj_in=provider_in)
+    return etag.update_if_match(request, response, db, db_obj=db_provider, obj_in=provider_in)
 
 
 @router.get("/{id}", response_model=schemas.SupplyProvider, summary="取得特定物資供應提供者")
-def get_supply_provider(id: str, db: Session = Depends(get_db)):
+def get_supply_provider(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一物資供應提供者
     """
+    cached = etag.not_modified(request, response, db, models.SupplyProvider, id)
+    if cached is not None:
+        return cached
     db_provider = crud.get_by_id(db, models.SupplyProvider, id)
     if db_provider is None:
         raise HTTPException(status_code=404, detail="Supply Provider not found")
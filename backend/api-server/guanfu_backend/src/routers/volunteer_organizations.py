@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
 from sqlalchemy.orm import Session
 
-from .. import crud, models, schemas
+from .. import crud, etag, models, schemas
 from ..database import get_db
 from ..api_key import require_modify_api_key
 
@@ -15,6 +17,7 @@ router = APIRouter(
 @router.get("", response_model=schemas.VolunteerOrgCollection, summary="取得志工招募單位清單")
 def list_volunteer_orgs(
         request: Request,
+        ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
         limit: int = Query(20, ge=1, le=200),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db)
@@ -22,6 +25,10 @@ def list_volunteer_orgs(
     """
     取得志工招募單位清單 (分頁)
     """
+    if ids:
+        rows, missing = crud.get_multi_by_ids(db, models.VolunteerOrganization, crud.parse_ids(ids))
+        return crud.build_ids_collection(rows, missing)
+
     orgs = crud.get_multi(db, models.VolunteerOrganization, skip=offset, limit=limit)
     total = crud.count(db, models.VolunteerOrganization)
     next_link = crud.build_next_link(request, limit=limit, offset=offset, total=total)
@@ -39,10 +46,13 @@ def create_volunteer_org(
 
 
 @router.get("/{id}", response_model=schemas.VolunteerOrganization, summary="取得特定志工招募單位")
-def get_volunteer_org(id: str, db: Session = Depends(get_db)):
+def get_volunteer_org(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一志工招募單位
     """
+    cached = etag.not_modified(request, response, db, models.VolunteerOrganization, id)
+    if cached is not None:
+        return cached
     db_org = crud.get_by_id(db, models.VolunteerOrganization, id)
     if db_org is None:
         raise HTTPException(status_code=404, detail="Volunteer Organization not found")
@@ -56,7 +66,7 @@ def get_volunteer_org(id: str, db: Session = Depends(get_db)):
     dependencies=[Security(require_modify_api_key)],
 )
 def patch_volunteer_org(
-        id: str, org_in: schemas.VolunteerOrgPatch, db: Session = Depends(get_db)
+        id: str, org_in: schemas.VolunteerOrgPatch, request: Request, response: Response, db: Session = Depends(get_db)
 ):
     """
     更新志工招募單位 (部分欄位)
@@ -64,4 +74,4 @@ def patch_volunteer_org(
     db_org = crud.get_by_id(db, models.VolunteerOrganization, id)
     if db_org is None:
         raise HTTPException(status_code=404, detail="Volunteer Organization not found")
-    return crud.update(db, db_obj=db_org, obj_in=org_in)
+    return etag.update_if_match(request, response, db, db_obj=db_org, obj_in=org_in)
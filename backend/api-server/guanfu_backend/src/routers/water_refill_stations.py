@@ -1,9 +1,9 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, Request, Response
 from sqlalchemy.orm import Session
 
-from .. import crud, models, schemas
+from .. import crud, etag, models, schemas
 from ..database import get_db
 from ..api_key import require_modify_api_key
 
@@ -21,6 +21,7 @@ def list_water_refill_stations(
         water_type: Optional[str] = Query(None),
         is_free: Optional[bool] = Query(None),
         accessibility: Optional[bool] = Query(None),
+        ids: Optional[str] = Query(None, description="以逗號分隔的 ID，一次取回多筆（最多 500 筆；指定時忽略其他篩選與分頁）"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
         db: Session = Depends(get_db)
@@ -28,6 +29,10 @@ def list_water_refill_stations(
     """
     取得飲用水補給站清單 (分頁)
     """
+    if ids:
+        rows, missing = crud.get_multi_by_ids(db, models.WaterRefillStation, crud.parse_ids(ids))
+        return crud.build_ids_collection(rows, missing)
+
     filters = {
         "status": status,
         "water_type": water_type,
@@ -51,10 +56,13 @@ def create_water_refill_station(
 
 
 @router.get("/{id}", response_model=schemas.WaterRefillStation, summary="取得特定飲用水補給站")
-def get_water_refill_station(id: str, db: Session = Depends(get_db)):
+def get_water_refill_station(id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     取得單一飲用水補給站
     """
+    cached = etag.not_modified(request, response, db, models.WaterRefillStation, id)
+    if cached is not None:
+        return cached
     db_station = crud.get_by_id(db, models.WaterRefillStation, id)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Water Refill Station not found")
@@ -68,7 +76,7 @@ def get_water_refill_station(id: str, db: Session = Depends(get_db)):
     dependencies=[Security(require_modify_api_key)],
 )
 def patch_water_refill_station(
-        id: str, station_in: schemas.WaterRefillStationPatch, db: Session = Depends(get_db)
+        id: str, station_in: schemas.WaterRefillStationPatch, request: Request, response: Response, db: Session = Depends(get_db)
 ):
     """
     更新飲用水補給站 (部分欄位)
@@ -76,4 +84,4 @@ def patch_water_refill_station(
     db_station = crud.get_by_id(db, models.WaterRefillStation, id)
     if db_station is None:
         raise HTTPException(status_code=404, detail="Water Refill Station not found")
-    return crud.update(db, db_obj=db_station, obj_in=station_in)
+    return etag.update_if_match(request, response, db, db_obj=db_station, obj_in=station_in)
@@ -1,7 +1,8 @@
 from datetime import timezone, datetime, timedelta
 from typing import List, Optional, Annotated, Union, Literal, Tuple
 
-from pydantic import BaseModel, constr, field_validator, NonNegativeInt, Field, conint
+from pydantic import BaseModel, constr, field_validator, model_validator, NonNegativeInt, Field, conint
+from sqlalchemy import inspect as sa_inspect
 
 from .enum_serializer import *
 
@@ -38,6 +39,7 @@ class CollectionBase(BaseModel):
     offset: int
     next: Optional[str] = None
     member: List[Any]
+    missing: Optional[List[str]] = None  # 僅 ?ids= 查詢時提供：找不到的 id
 
 
 # ===================================================================
@@ -1055,7 +1057,35 @@ class PlacePatch(BaseModel):
     notes: Optional[str] = None
 
 
+class _LoadedAttributes:
+    """
+    from_attributes 讀取用的包裝：尚未載入的 relationship 視為不存在（欄位維持預設值），
+    避免序列化時逐筆觸發 lazy load。
+    """
+
+    def __init__(self, obj):
+        state = sa_inspect(obj)
+        self._obj = obj
+        self._unloaded = {rel.key for rel in state.mapper.relationships} & state.unloaded
+
+    def __getattr__(self, name):
+        if name in self._unloaded:
+            raise AttributeError(name)
+        return getattr(self._obj, name)
+
+
 class Place(PlaceBase, BaseColumn):
+    # 僅在 embed=requirements 時提供
+    requirements_hr: Optional[List["RequirementsHr"]] = None
+    requirements_supplies: Optional[List["RequirementsSupplies"]] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _skip_unloaded_relationships(cls, data):
+        if hasattr(data, "_sa_instance_state"):
+            return _LoadedAttributes(data)
+        return data
+
     class Config:
         from_attributes = True
 
@@ -1137,3 +1167,55 @@ class RequirementsSupplies(RequirementsSuppliesBase, BaseColumn):
 class RequirementsSuppliesCollection(CollectionBase):
     member: List[RequirementsSupplies]
 
+
+Place.model_rebuild()
+PlaceCollection.model_rebuild()
+
+
+
+# ===================================================================
+# 異動紀錄 (Change Feed)
+# ===================================================================
+
+
+class ChangeEvent(BaseModel):
+    type: str = Field(..., description="資源類型（即 API 路徑），例如：supplies、requirements_hr")
+    id: str = Field(..., description="資源 ID")
+    op: Literal["created", "updated", "deleted"] = Field(..., description="異動類型；deleted 為 tombstone")
+    changed_at: int = Field(..., description="異動時間（Unix timestamp）")
+
+
+class ChangeFeed(BaseModel):
+    member: List[ChangeEvent]
+    limit: int
+    next: Optional[str] = Field(None, description="下一次請求要帶入的 since cursor")
+    has_more: bool = Field(..., description="是否還有尚未取回的異動，為 true 時應立即以 next 繼續取")
+
+
+# ===================================================================
+# 統計 (Dashboard Stats)
+# ===================================================================
+
+
+class StatsGroup(BaseModel):
+    category: str = Field(..., description="分組類型，例如場所 type、人力 role_type、物資 tag")
+    status: str
+    count: int
+    need: Optional[int] = Field(None, description="需求數（人力 headcount_need / 物資 total_number）")
+    got: Optional[int] = Field(None, description="已到位數（人力 headcount_got / 物資 received_count）")
+
+
+class ResourceStats(BaseModel):
+    total: int
+    need: Optional[int] = None
+    got: Optional[int] = None
+    groups: List[StatsGroup]
+
+
+class DashboardStats(BaseModel):
+    places: ResourceStats
+    shelters: ResourceStats
+    human_resources: ResourceStats
+    supplies: ResourceStats = Field(..., description="以 supply_items 統計，status 為 completed / pending")
+    reports: ResourceStats
+    refreshed_at: Optional[int] = Field(None, description="統計資料的產生時間（Unix timestamp）")
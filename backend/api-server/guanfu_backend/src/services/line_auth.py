@@ -16,6 +16,7 @@ from starlette import status
 from ..config import settings
 from ..database import get_db
 from ..models import LineUser, LineSessionState
+from .line_state import LineAuthState, claim_state_once, open_state, seal_state
 
 # LINE OAuth2 / OIDC endpoints
 AUTH_URL = "https://access.line.me/oauth2/v2.1/authorize"
@@ -58,21 +59,26 @@ def build_authorize_url(
 ) -> str:
     """
     產生 LINE Login 授權頁 URL（PKCE + OIDC）
+
+    LINE_STATE_BACKEND=signed 時 state 本身即為加密簽章 token，不需寫入資料庫。
     """
-    state = _generate_state()
     nonce = _generate_nonce()
     code_verifier = _generate_code_verifier()
     code_challenge = _code_challenge_s256(code_verifier)
 
-    sess = LineSessionState(
-        state=state,
-        nonce=nonce,
-        code_verifier=code_verifier,
-        redirect_uri=redirect_uri,
-        expires_at=datetime.utcnow() + timedelta(minutes=10),
-    )
-    db.add(sess)
-    db.commit()
+    if settings.LINE_STATE_BACKEND == "signed":
+        state = seal_state(LineAuthState(nonce=nonce, code_verifier=code_verifier, redirect_uri=redirect_uri))
+    else:
+        state = _generate_state()
+        sess = LineSessionState(
+            state=state,
+            nonce=nonce,
+            code_verifier=code_verifier,
+            redirect_uri=redirect_uri,
+            expires_at=datetime.utcnow() + timedelta(seconds=settings.LINE_STATE_TTL_SECONDS),
+        )
+        db.add(sess)
+        db.commit()
 
     params = {
         "response_type": "code",
@@ -97,24 +103,39 @@ def build_authorize_url(
 
 # ====== Exchange Token ======
 
-async def exchange_token_authorization_code(db: Session, code: str, state: str) -> Dict:
+async def _load_auth_state(db: Session, state: str) -> tuple[LineAuthState, Optional[LineSessionState]]:
     """
-    授權碼換取 access_token / id_token，並驗證 ID Token + 更新使用者資料
+    依 LINE_STATE_BACKEND 取回 authorize 時保存的資料。
+    signed 模式在這裡就標記為已使用；db 模式回傳 session row，交換成功後才標記 consumed。
     """
+    if settings.LINE_STATE_BACKEND == "signed":
+        auth_state = open_state(state)
+        await claim_state_once(auth_state)
+        return auth_state, None
+
     sess: Optional[LineSessionState] = db.query(LineSessionState).filter(LineSessionState.state == state).first()
     if not sess or sess.consumed:
         raise HTTPException(status_code=400, detail="state 無效或已使用")
     if sess.expires_at and sess.expires_at < datetime.utcnow():
         raise HTTPException(status_code=400, detail="state 已過期")
+    auth_state = LineAuthState(nonce=sess.nonce, code_verifier=sess.code_verifier, redirect_uri=sess.redirect_uri)
+    return auth_state, sess
+
+
+async def exchange_token_authorization_code(db: Session, code: str, state: str) -> Dict:
+    """
+    授權碼換取 access_token / id_token，並驗證 ID Token + 更新使用者資料
+    """
+    auth_state, sess = await _load_auth_state(db, state)
 
     async with httpx.AsyncClient(timeout=15) as client:
         data = {
             "grant_type": "authorization_code",
             "code": code,
-            "redirect_uri": sess.redirect_uri,
+            "redirect_uri": auth_state.redirect_uri,
             "client_id": settings.LINE_CLIENT_ID,
             "client_secret": settings.LINE_CLIENT_SECRET,
-            "code_verifier": sess.code_verifier,
+            "code_verifier": auth_state.code_verifier,
         }
         token_resp = await client.post(TOKEN_URL, data=data)
         if token_resp.status_code != 200:
@@ -145,7 +166,7 @@ async def exchange_token_authorization_code(db: Session, code: str, state: str)
         logger.info(f"ID Token 驗證成功: {decoded}")
 
     # 驗證 nonce
-    if decoded.get("nonce") != sess.nonce:
+    if decoded.get("nonce") != auth_state.nonce:
         raise HTTPException(status_code=400, detail="nonce 驗證失敗")
 
     line_user_id = decoded.get("sub")
@@ -194,7 +215,8 @@ async def exchange_token_authorization_code(db: Session, code: str, state: str)
         user.id_token = id_token
         user.token_expires_at = expires_at
 
-    sess.consumed = True
+    if sess is not None:
+        sess.consumed = True
     db.commit()
     db.refresh(user)
 
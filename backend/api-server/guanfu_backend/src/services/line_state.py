@@ -0,0 +1,106 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict
+
+from cryptography.fernet import Fernet, InvalidToken
+from fastapi import HTTPException
+
+from ..config import settings
+from .redis_client import get_async_redis
+
+REPLAY_KEY_PREFIX = "line_state:used:"
+
+
+@dataclass
+class LineAuthState:
+    """OAuth 流程在 authorize 與 token 交換之間需要保留的資料"""
+
+    nonce: str
+    code_verifier: str
+    redirect_uri: str
+
+
+# ====== 加密簽章 state token ======
+
+def _fernet() -> Fernet:
+    secret = settings.LINE_STATE_SECRET or settings.LINE_CLIENT_SECRET
+    key = base64.urlsafe_b64encode(hashlib.sha256(secret.encode("utf-8")).digest())
+    return Fernet(key)
+
+
+def seal_state(auth_state: LineAuthState) -> str:
+    """
+    將 nonce / code_verifier / redirect_uri / exp 以 Fernet（AES-CBC + HMAC-SHA256）加密簽章，
+    產生可直接作為 OAuth state 參數的字串（去除 base64 padding）。
+    """
+    payload = {
+        "n": auth_state.nonce,
+        "v": auth_state.code_verifier,
+        "r": auth_state.redirect_uri,
+        "exp": int(time.time()) + settings.LINE_STATE_TTL_SECONDS,
+    }
+    token = _fernet().encrypt(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    return token.decode("ascii").rstrip("=")
+
+
+def open_state(state: str) -> LineAuthState:
+    """
+    解密並驗證 state token；簽章錯誤、格式錯誤或過期時丟出 400。
+    """
+    padded = state + "=" * (-len(state) % 4)
+    try:
+        raw = _fernet().decrypt(padded.encode("ascii"), ttl=settings.LINE_STATE_TTL_SECONDS)
+        payload = json.loads(raw)
+    except (InvalidToken, ValueError):
+        raise HTTPException(status_code=400, detail="state 無效或已使用")
+
+    if payload.get("exp", 0) < time.time():
+        raise HTTPException(status_code=400, detail="state 已過期")
+
+    return LineAuthState(nonce=payload["n"], code_verifier=payload["v"], redirect_uri=payload["r"])
+
+
+# ====== 防重放 ======
+
+class _MemoryReplayGuard:
+    """單一 process 內的已使用 state 集合，過期項目在寫入時順便清除"""
+
+    def __init__(self):
+        self._used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key: str, ttl: int) -> bool:
+        now = time.time()
+        with self._lock:
+            expired = [k for k, exp in self._used.items() if exp <= now]
+            for k in expired:
+                del self._used[k]
+            if key in self._used:
+                return False
+            self._used[key] = now + ttl
+            return True
+
+
+_memory_guard = _MemoryReplayGuard()
+
+
+async def claim_state_once(auth_state: LineAuthState) -> None:
+    """
+    以 nonce 作為唯一鍵標記 state 已使用；同一個 state 第二次使用時丟出 400。
+    有設定 REDIS_URL 時使用 SET NX EX（async client，不阻塞 event loop），讓多個 worker 共用同一份紀錄。
+    """
+    ttl = settings.LINE_STATE_TTL_SECONDS
+    key = f"{REPLAY_KEY_PREFIX}{auth_state.nonce}"
+
+    redis_client = get_async_redis()
+    if redis_client is not None:
+        claimed = bool(await redis_client.set(key, "1", nx=True, ex=ttl))
+    else:
+        claimed = _memory_guard.claim(key, ttl)
+
+    if not claimed:
+        raise HTTPException(status_code=400, detail="state 無效或已使用")
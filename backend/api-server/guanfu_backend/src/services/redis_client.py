@@ -0,0 +1,37 @@
+from functools import lru_cache
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from ..config import settings
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> Optional[redis.Redis]:
+    """
+    取得共用的 Redis client；未設定 REDIS_URL 時回傳 None，呼叫端應退回 in-memory 實作。
+    """
+    if not settings.REDIS_URL:
+        return None
+    return redis.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_async_redis() -> Optional[aioredis.Redis]:
+    """
+    async 版本，供 middleware 等在 event loop 內執行的程式使用，避免阻塞。
+    """
+    if not settings.REDIS_URL:
+        return None
+    return aioredis.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+    )
@@ -0,0 +1,124 @@
+import logging
+import queue
+import threading
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+from .services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 送到 spam-blocker 審核的資源；子資源的異動以上層資源送出（物資項目修改後整張供應單重新審核）
+# model -> (送出的 type, 取得 id 的欄位, 審核會看到的欄位)
+# 修改時只有審核欄位有變動才送出，到貨數量、人數等進度更新不會觸發重新審核
+REVIEWED_MODELS = {
+    models.HumanResource: ("human_resources", "id", ("org", "address", "role_name", "assignment_notes")),
+    models.Supply: ("supplies", "id", ("name", "address")),
+    models.SupplyItem: ("supplies", "supply_id", ("name", "unit")),
+}
+
+_SESSION_KEY = "spam_check_events"
+
+# commit 後的事件交給背景 thread 以 XADD 送出，Redis 緩慢或無法連線時不會阻塞請求（包含 async 路由的 event loop）
+_publish_queue: "queue.Queue[Dict[Tuple[str, str], str]]" = queue.Queue(maxsize=settings.SPAM_CHECK_PUBLISH_QUEUE_SIZE)
+_publisher: Optional[threading.Thread] = None
+_publisher_lock = threading.Lock()
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_events(session: Session, flush_context) -> None:
+    """
+    收集本次 flush 新增 / 修改的資源，建立與 patch 的所有路徑都會經過這裡；同一個交易中同一筆資源只送出一次。
+    after_flush 時主鍵已產生，session.new / dirty 仍是 flush 前的狀態。
+    """
+    if not (settings.REDIS_URL and settings.SPAM_CHECK_STREAM):
+        return
+    pending = session.info.setdefault(_SESSION_KEY, {})
+    for objs, op in ((session.new, "created"), (session.dirty, "updated")):
+        for obj in objs:
+            target = REVIEWED_MODELS.get(type(obj))
+            if target is None:
+                continue
+            resource_type, id_field, fields = target
+            if op == "updated" and not _reviewed_fields_changed(obj, fields):
+                continue
+            resource_id = getattr(obj, id_field)
+            if resource_id is None:
+                continue
+            key = (resource_type, str(resource_id))
+            # 同一交易中建立的資源（含同時建立的物資項目）送出 created，其餘為 updated
+            if op == "created" and id_field == "id":
+                pending[key] = "created"
+            else:
+                pending.setdefault(key, "updated")
+
+
+def _reviewed_fields_changed(obj, fields) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_events(session: Session) -> None:
+    """
+    commit 後交給背景 thread 送出，rollback 的異動不會送出。
+    送出失敗或佇列已滿只記錄錯誤、不影響請求：spam-blocker 仍會定期以 updated_at 輪詢補上漏掉的記錄。
+    """
+    pending = session.info.pop(_SESSION_KEY, None)
+    if not pending or get_redis() is None:
+        return
+    _ensure_publisher()
+    try:
+        _publish_queue.put_nowait(pending)
+    except queue.Full:
+        logger.error(f"Spam check publish queue is full, dropping {len(pending)} events")
+
+
+def _ensure_publisher() -> None:
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None or not _publisher.is_alive():
+            _publisher = threading.Thread(target=_publish_loop, name="spam-check-publisher", daemon=True)
+            _publisher.start()
+
+
+def _publish_loop() -> None:
+    """取出等待中的事件，合併成一次 pipeline 送出"""
+    while True:
+        batch = [_publish_queue.get()]
+        while True:
+            try:
+                batch.append(_publish_queue.get_nowait())
+            except queue.Empty:
+                break
+        events: Dict[Tuple[str, str], str] = {}
+        for pending in batch:
+            for key, op in pending.items():
+                # 同一筆資源先送出的 created 優先
+                events.setdefault(key, op)
+        try:
+            _xadd_events(events)
+        except Exception as e:
+            logger.error(f"Failed to publish {len(events)} spam check events: {e}")
+
+
+def _xadd_events(events: Dict[Tuple[str, str], str]) -> None:
+    pipe = get_redis().pipeline(transaction=False)
+    for (resource_type, resource_id), op in events.items():
+        pipe.xadd(
+            settings.SPAM_CHECK_STREAM,
+            {"type": resource_type, "id": resource_id, "op": op},
+            maxlen=settings.SPAM_CHECK_STREAM_MAXLEN,
+            approximate=True,
+        )
+    pipe.execute()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_events(session: Session) -> None:
+    session.info.pop(_SESSION_KEY, None)
@@ -0,0 +1,72 @@
+"""
+批次 LLM 驗證效能比較：以本機 stub model 量測不同批次大小 K 的 records/sec。
+
+stub 的延遲 = request_latency（每次請求）+ record_latency × 筆數，
+可調整成接近實際 Ollama 主機量測到的數值（例如 system prompt prefill 與每筆輸出的時間）。
+
+使用方式（在 spam-blocker 目錄下）：
+    python scripts/bench_llm_batch.py --records 64 --batch-sizes 1,4,8,16
+    python scripts/bench_llm_batch.py --malformed-rate 0.2     # 驗證格式錯誤時的逐筆 fallback
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 與 Docker 相同：專案根目錄（PYTHONPATH=/app）與 src/ 都要在 import path 中
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "src"), os.path.dirname(__file__)]
+
+from stub_ollama import StubOllama, judge, serve  # noqa: E402
+
+from lib import HumanResource, OllamaClient  # noqa: E402
+
+
+def make_records(count: int) -> list[HumanResource]:
+    records = []
+    for i in range(count):
+        notes = "加賴私訊賺錢 https://spam.example" if i % 5 == 0 else "需要清淤人力，自備雨鞋"
+        records.append(
+            HumanResource(
+                id=f"hr-{i:04d}",
+                org="光復鄉公所",
+                address=f"光復鄉中正路 {i} 號",
+                role_name="清淤志工",
+                assignment_notes=notes,
+            )
+        )
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=64)
+    parser.add_argument("--batch-sizes", default="1,2,4,8,16")
+    parser.add_argument("--request-latency", type=float, default=0.3)
+    parser.add_argument("--record-latency", type=float, default=0.05)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    expected = {record.id: judge(record.model_dump())[0] for record in records}
+
+    print(f"{'K':>4} {'records/s':>10} {'requests':>9} {'agree':>7}")
+    for batch_size in [int(k) for k in args.batch_sizes.split(",")]:
+        stub = StubOllama(args.request_latency, args.record_latency, malformed_rate=args.malformed_rate)
+        server = serve(stub)
+        client = OllamaClient(base_url=f"http://127.0.0.1:{server.server_address[1]}", model="stub")
+
+        results = {}
+        started = time.perf_counter()
+        for start in range(0, len(records), batch_size):
+            results.update(client.get_validation_results(records[start : start + batch_size], "human_resource"))
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+
+        agree = sum(1 for record_id, result in results.items() if result.valid == expected[record_id])
+        print(f"{batch_size:>4} {len(records) / elapsed:>10.2f} {stub.requests:>9} {agree:>4}/{len(records)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Queue 去重效能比較：舊做法（LRANGE 整個 queue 並逐筆 JSON 解析）vs ID 索引（SISMEMBER / SMISMEMBER）
+
+使用方式（在 spam-blocker 目錄下）：
+    python scripts/bench_queue_dedupe.py --redis-url redis://localhost:6379/15 --size 10000
+    python scripts/bench_queue_dedupe.py --fake          # 使用 fakeredis，不需要 Redis 服務
+
+會使用獨立的 bench: 前綴 key，結束後刪除。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# 與 Docker 相同：專案根目錄（PYTHONPATH=/app）與 src/ 都要在 import path 中
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "src")]
+
+import redis  # noqa: E402
+
+from lib import HumanResource  # noqa: E402
+from message_queue import MessageQueueProcessor  # noqa: E402
+
+QUEUE_NAME = "bench:human_resource_validation_queue"
+
+
+def make_records(count: int, prefix: str = "rec") -> list[HumanResource]:
+    return [
+        HumanResource(
+            id=f"{prefix}-{i:06d}",
+            org="光復鄉公所",
+            address=f"花蓮縣光復鄉中正路 {i} 號",
+            role_name="清淤志工",
+            assignment_notes="自備雨鞋、手套",
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_is_in_queue(client: redis.Redis, record_id: str) -> tuple[bool, int]:
+    """舊版 _is_record_in_queue：回傳 (是否存在, 傳輸位元組數)"""
+    items = client.lrange(QUEUE_NAME, 0, -1)
+    transferred = sum(len(item) for item in items)
+    for item in items:
+        if json.loads(item).get("id") == record_id:
+            return True, transferred
+    return False, transferred
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL"))
+    parser.add_argument("--fake", action="store_true", help="使用 fakeredis（需另外安裝）")
+    parser.add_argument("--size", type=int, default=10000, help="queue 中的記錄數")
+    parser.add_argument("--checks", type=int, default=50, help="舊做法抽樣檢查次數（每次都掃描整個 queue）")
+    parser.add_argument("--page", type=int, default=50, help="一次抓取的頁面大小（FETCH_LIMIT）")
+    args = parser.parse_args()
+
+    if args.fake:
+        import fakeredis
+
+        client = fakeredis.FakeRedis()
+    elif args.redis_url:
+        client = redis.from_url(args.redis_url, decode_responses=False)
+    else:
+        parser.error("需要 --redis-url、REDIS_URL 或 --fake")
+
+    processor = MessageQueueProcessor(record_processor=None, queue_name=QUEUE_NAME, redis_client=client)
+    processor.clear_queue()
+    try:
+        records = make_records(args.size)
+        enqueue_seconds = timed(lambda: processor.add_to_queue(records))
+        print(f"queue size: {processor.get_queue_size()}  (enqueue {args.size} records: {enqueue_seconds:.2f}s)")
+
+        # 一半存在、一半不存在的 ID
+        probe_ids = [records[i * (args.size // args.checks)].id for i in range(args.checks // 2)]
+        probe_ids += [f"missing-{i}" for i in range(args.checks - len(probe_ids))]
+
+        transferred = 0
+
+        def run_legacy():
+            nonlocal transferred
+            for record_id in probe_ids:
+                transferred += legacy_is_in_queue(client, record_id)[1]
+
+        legacy = timed(run_legacy) / len(probe_ids)
+        indexed = timed(lambda: [processor._is_record_in_queue(record_id) for record_id in probe_ids]) / len(probe_ids)
+
+        page_ids = [record.id for record in records[: args.page]]
+        smismember = timed(lambda: processor.get_queued_ids(page_ids))
+
+        print(
+            f"legacy LRANGE scan : {legacy * 1000:9.3f} ms/check, {transferred / len(probe_ids) / 1024:9.1f} KiB/check"
+        )
+        print(f"SISMEMBER          : {indexed * 1000:9.3f} ms/check")
+        print(f"SMISMEMBER page={args.page:<3}: {smismember * 1000:9.3f} ms/page")
+        print(
+            f"full load of {args.size} records (one check each): "
+            f"legacy ~{legacy * args.size:.1f}s vs indexed ~{indexed * args.size:.2f}s "
+            f"({legacy / indexed:.0f}x)"
+        )
+    finally:
+        processor.clear_queue()
+
+
+if __name__ == "__main__":
+    main()
@@ -52,10 +52,10 @@ show_menu() {
 show_basic_stats() {
     echo -e "${GREEN}=== 基本統計 ===${NC}"
     
-    PROCESSED_COUNT=$(redis_cmd SCARD processed_records | tr -d '\r')
+    PROCESSED_COUNT=$(redis_cmd ZCARD processed_records | tr -d '\r')
     LAST_ID=$(redis_cmd GET last_processed_id | tr -d '\r')
-    VALID_COUNT=$(redis_cmd SCARD valid_records | tr -d '\r')
-    INVALID_COUNT=$(redis_cmd SCARD invalid_records | tr -d '\r')
+    VALID_COUNT=$(redis_cmd ZCARD valid_records | tr -d '\r')
+    INVALID_COUNT=$(redis_cmd ZCARD invalid_records | tr -d '\r')
     
     echo -e "已處理記錄總數: ${YELLOW}${PROCESSED_COUNT}${NC}"
     echo -e "最後處理的 ID: ${YELLOW}${LAST_ID}${NC}"
@@ -97,7 +97,7 @@ list_all_processed() {
     echo -e "${GREEN}=== 所有已處理記錄 ===${NC}"
     echo -e "${YELLOW}警告: 如果記錄很多，這可能需要一些時間...${NC}"
     
-    redis_cmd SMEMBERS processed_records
+    redis_cmd ZRANGE processed_records 0 -1
     echo ""
 }
 
@@ -105,9 +105,9 @@ check_specific_record() {
     echo -e "${GREEN}=== 檢查特定記錄 ===${NC}"
     read -p "請輸入記錄 ID: " RECORD_ID
     
-    RESULT=$(redis_cmd SISMEMBER processed_records "$RECORD_ID" | tr -d '\r')
+    RESULT=$(redis_cmd ZSCORE processed_records "$RECORD_ID" | tr -d '\r')
     
-    if [ "$RESULT" == "1" ]; then
+    if [ -n "$RESULT" ]; then
         echo -e "${GREEN}✓ 記錄 ${RECORD_ID} 已處理${NC}"
     else
         echo -e "${RED}✗ 記錄 ${RECORD_ID} 未處理${NC}"
@@ -120,7 +120,7 @@ export_processed_records() {
     
     OUTPUT_FILE="processed_records_$(date +%Y%m%d_%H%M%S).txt"
     
-    redis_cmd SMEMBERS processed_records > "$OUTPUT_FILE"
+    redis_cmd ZRANGE processed_records 0 -1 > "$OUTPUT_FILE"
     
     COUNT=$(wc -l < "$OUTPUT_FILE")
     echo -e "${GREEN}✓ 已導出 ${COUNT} 筆記錄到: ${OUTPUT_FILE}${NC}"
@@ -132,7 +132,7 @@ check_duplicates() {
     echo "正在檢查..."
     
     TEMP_FILE="/tmp/processed_records_temp.txt"
-    redis_cmd SMEMBERS processed_records > "$TEMP_FILE"
+    redis_cmd ZRANGE processed_records 0 -1 > "$TEMP_FILE"
     
     DUPLICATES=$(sort "$TEMP_FILE" | uniq -d)
     
@@ -155,7 +155,7 @@ delete_specific_record() {
     read -p "確定要刪除 ${RECORD_ID} 嗎? (yes/no): " CONFIRM
     
     if [ "$CONFIRM" == "yes" ]; then
-        redis_cmd SREM processed_records "$RECORD_ID"
+        redis_cmd ZREM processed_records "$RECORD_ID"
         echo -e "${GREEN}✓ 記錄 ${RECORD_ID} 已刪除${NC}"
     else
         echo -e "${YELLOW}已取消${NC}"
@@ -30,10 +30,10 @@ redis_cmd() {
 
 # 基本統計
 echo -e "${GREEN}【基本統計】${NC}"
-PROCESSED_COUNT=$(redis_cmd SCARD processed_records)
+PROCESSED_COUNT=$(redis_cmd ZCARD processed_records)
 LAST_ID=$(redis_cmd GET last_processed_id)
-VALID_COUNT=$(redis_cmd SCARD valid_records)
-INVALID_COUNT=$(redis_cmd SCARD invalid_records)
+VALID_COUNT=$(redis_cmd ZCARD valid_records)
+INVALID_COUNT=$(redis_cmd ZCARD invalid_records)
 
 echo "  已處理記錄總數: $PROCESSED_COUNT"
 echo "  最後處理的 ID: $LAST_ID"
@@ -75,8 +75,8 @@ echo "  使用記憶體: $MEMORY_INFO"
 echo ""
 
 # 檢查最近 5 筆處理記錄
-echo -e "${GREEN}【最近記錄 ID（隨機取樣 5 筆）】${NC}"
-redis_cmd SRANDMEMBER processed_records 5 | head -5
+echo -e "${GREEN}【最近處理的 5 筆記錄 ID】${NC}"
+redis_cmd ZRANGE processed_records 0 4 REV
 echo ""
 
 echo -e "${BLUE}================================${NC}"
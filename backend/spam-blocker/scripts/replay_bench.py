@@ -0,0 +1,494 @@
+"""
+離線重播測試：把一份有標註的記錄語料送進完整的處理流程，量測效能與判斷品質。
+
+流程與正式環境相同，由 Runtime 執行：Scheduler 從 GF API 抓取 -> RecordFetcher 過濾 -> MessageQueueProcessor worker
+-> RecordProcessor（初篩 / verdict cache / LLM）-> BufferedSheetWriter -> 標記已處理並 ack。
+外部服務以本機替身取代：
+- Ollama：stub_ollama.py 的 HTTP stub（延遲可調），由真正的 OllamaClient 連線
+- GF API：記憶體中的資料表，替換 GfApiClient.base_request，支援 updated_since / offset / ids 分頁與 spam_results
+- Google Sheets：不需要憑證的 GoogleSheetHandler，append_sheet 只記錄寫入的列（延遲可調）
+- Redis：fakeredis，或以 --redis-url 指定本機 redis-server（會清空該 db）
+- --event-stream：記錄出現時同時送出 api-server 的異動事件，由 StreamConsumer 加入 queue，定時抓取只作為補漏
+
+輸出：
+- records/sec：第一筆記錄出現在 API 到最後一筆 ack 的吞吐量
+- 端到端延遲 p50 / p95：記錄出現在 API 到寫入 Sheet 並 ack 的時間
+- 與標註的一致率（以寫入 valid_* / invalid_* 分頁的結果比對）
+- 每筆記錄的 Redis round trip 數（實際送出的封包數；pipeline 與 Lua script 各算一次）
+
+語料格式（JSONL，每行一筆）：
+    {"type": "human_resource", "valid": true, "record": {"id": "...", "org": "...", ...}}
+    {"type": "supplies", "valid": false, "record": {"id": "...", "name": "...", "supplies": [...]}}
+未指定 --corpus 時產生合成語料（含廣告、內容重複與規則抓不到的垃圾訊息）。
+
+使用方式（在 spam-blocker 目錄下）：
+    python scripts/replay_bench.py --records 500 --workers 2 --batch-size 8
+    python scripts/replay_bench.py --corpus corpus.jsonl --rate 20            # 每秒出現 20 筆新記錄
+    python scripts/replay_bench.py --records 200 --write-corpus corpus.jsonl  # 保存合成語料
+    python scripts/replay_bench.py --rate 20 --event-stream --sync-interval 60  # 事件驅動，與輪詢比較延遲
+    python scripts/replay_bench.py --save-baseline baseline.json              # 記錄基準
+    python scripts/replay_bench.py --baseline baseline.json --tolerance 0.1   # 退步超過 10% 時 exit 1
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# 與 Docker 相同：專案根目錄（PYTHONPATH=/app）與 src/ 都要在 import path 中
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "src"), os.path.dirname(__file__)]
+
+import redis  # noqa: E402
+from stub_ollama import StubOllama, serve  # noqa: E402
+
+from lib import (  # noqa: E402
+    BufferedSheetWriter,
+    GfApiClient,
+    GoogleSheetHandler,
+    OllamaClient,
+    RuleBasedPreFilter,
+)
+from lib.GoogleSheetHandler import SheetName  # noqa: E402
+from message_queue import (  # noqa: E402
+    RESOURCE_PIPELINES,
+    MessageQueueProcessor,
+    PipelineComponents,
+    ProcessedRecordTracker,
+    Runtime,
+    Scheduler,
+    StreamConsumer,
+    VerdictCache,
+)
+from wokers import RecordFetcher, RecordProcessor  # noqa: E402
+
+ENDPOINTS = {pipeline.resource_type: pipeline.endpoint for pipeline in RESOURCE_PIPELINES}
+
+# 與基準比較時，數值越大越好 / 越小越好的指標
+HIGHER_IS_BETTER = ("records_per_second", "agreement")
+LOWER_IS_BETTER = ("p95_latency_seconds", "redis_round_trips_per_record")
+
+
+def make_corpus(count: int, seed: int = 0) -> list[dict]:
+    """產生有標註的合成語料：約 70% 正常、15% 明顯廣告、5% 規則抓不到的垃圾訊息、10% 與先前內容相同"""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        roll = rng.random()
+        if corpus and roll < 0.1:
+            previous = rng.choice(corpus)
+            corpus.append({**previous, "record": {**previous["record"], "id": f"{previous['type']}-{i:06d}"}})
+            continue
+
+        resource_type = "human_resource" if rng.random() < 0.6 else "supplies"
+        valid = roll >= 0.3
+        if valid:
+            notes = rng.choice(["自備雨鞋、手套", "需要清淤人力", "協助搬運沙包", "提供午餐"])
+        elif roll < 0.25:
+            notes = rng.choice(["加賴私訊賺錢 https://spam.example", "博弈娛樂城 www.example.com", "好好好好好好好好"])
+        else:
+            notes = rng.choice(["asdf qwer zxcv", "測試測試", "123"])
+
+        record_id = f"{resource_type}-{i:06d}"
+        address = f"花蓮縣光復鄉中正路 {rng.randint(1, 300)} 號"
+        if resource_type == "human_resource":
+            record = {
+                "id": record_id,
+                "org": rng.choice(["光復鄉公所", "花蓮縣政府", "慈濟志工"]),
+                "address": address,
+                "role_name": rng.choice(["清淤志工", "物資搬運", "醫療支援"]),
+                "assignment_notes": notes,
+            }
+        else:
+            record = {
+                "id": record_id,
+                "name": notes if not valid else rng.choice(["光復國小物資站", "大進社區活動中心"]),
+                "address": address,
+                "supplies": [
+                    {"name": rng.choice(["礦泉水", "便當", "雨鞋", "手套"]), "unit": rng.choice(["箱", "份", "雙"])}
+                    for _ in range(rng.randint(1, 3))
+                ],
+            }
+        corpus.append({"type": resource_type, "valid": valid, "record": record})
+    return corpus
+
+
+def load_corpus(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class FakeGfApi:
+    """記憶體中的 GF API：記錄「出現」時才能被查到，updated_at 為出現的時間"""
+
+    def __init__(self, latency: float = 0.0, on_publish=None):
+        """
+        Args:
+            on_publish: 記錄出現後以 (endpoint, 記錄 ID 列表) 呼叫，模擬 api-server 送出異動事件
+        """
+        self.latency = latency
+        self.on_publish = on_publish
+        self.rows: dict[str, dict[str, dict]] = {endpoint: {} for endpoint in ENDPOINTS.values()}
+        self.published_at: dict[str, float] = {}
+        self.judgments = 0
+        self._lock = threading.Lock()
+
+    def publish(self, entries: list[dict]):
+        now = time.monotonic()
+        updated_at = int(time.time())
+        with self._lock:
+            for entry in entries:
+                endpoint = ENDPOINTS[entry["type"]]
+                self.rows[endpoint][entry["record"]["id"]] = {**entry["record"], "updated_at": updated_at}
+                self.published_at[entry["record"]["id"]] = now
+        if self.on_publish:
+            for endpoint in ENDPOINTS.values():
+                ids = [entry["record"]["id"] for entry in entries if ENDPOINTS[entry["type"]] == endpoint]
+                if ids:
+                    self.on_publish(endpoint, ids)
+
+    def request(self, method: str, url: str, headers: dict = None, params: dict = None, body: dict = None, **kwargs):
+        """取代 GfApiClient.base_request"""
+        if self.latency:
+            time.sleep(self.latency)
+        if method == "POST":
+            with self._lock:
+                self.judgments += 1
+            return {}
+
+        params = params or {}
+        with self._lock:
+            rows = list(self.rows[url.rsplit("/", 1)[-1]].values())
+        if "ids" in params:
+            ids = set(params["ids"].split(","))
+            members = [row for row in rows if row["id"] in ids]
+            return {"member": members, "totalItems": len(members)}
+
+        rows = sorted(
+            (row for row in rows if row["updated_at"] >= int(params.get("updated_since", 0))),
+            key=lambda row: (row["updated_at"], row["id"]),
+        )
+        offset, limit = int(params.get("offset", 0)), int(params.get("limit", 50))
+        return {"member": rows[offset : offset + limit], "totalItems": len(rows)}
+
+
+class FakeSheetHandler(GoogleSheetHandler):
+    """不需要憑證的 Google Sheet 替身，只記錄寫入的列"""
+
+    def __init__(self, latency: float = 0.0):
+        self.spreadsheet_id = "replay"
+        self.latency = latency
+        self.rows: dict[SheetName, list[list[str]]] = {sheet: [] for sheet in SheetName}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def append_sheet(self, sheet_name: SheetName, values: list[list[str]], max_retries: int = 3) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            self.rows[sheet_name].extend(values)
+        return {}
+
+    def verdicts(self) -> dict[str, bool]:
+        """依寫入的分頁取得各記錄的判斷結果"""
+        with self._lock:
+            return {row[0]: sheet.value.startswith("valid") for sheet, rows in self.rows.items() for row in rows}
+
+
+@contextmanager
+def count_round_trips():
+    """計算期間內送往 Redis 的封包數（fakeredis 與 redis-py 都經過 send_packed_command）"""
+    counter = {"round_trips": 0}
+    lock = threading.Lock()
+    original = redis.connection.AbstractConnection.send_packed_command
+
+    def send_packed_command(self, *args, **kwargs):
+        with lock:
+            counter["round_trips"] += 1
+        return original(self, *args, **kwargs)
+
+    redis.connection.AbstractConnection.send_packed_command = send_packed_command
+    try:
+        yield counter
+    finally:
+        redis.connection.AbstractConnection.send_packed_command = original
+
+
+def percentile(values: list[float], ratio: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * ratio), len(ordered) - 1)]
+
+
+def build_components(
+    args, redis_client, validator, gf_api_client, sheet_handler, sheet_writer
+) -> list[PipelineComponents]:
+    """與 build_pipeline_components 相同的組裝方式，另外套用命令列指定的設定"""
+    tracker = ProcessedRecordTracker(redis_client)
+    components = []
+    for pipeline in RESOURCE_PIPELINES:
+        record_processor = RecordProcessor(
+            validator=validator,
+            gf_api_client=gf_api_client,
+            google_sheet_handler=sheet_handler,
+            tracker=tracker,
+            resource_type=pipeline.resource_type,
+            verdict_cache=(
+                None
+                if args.no_cache
+                else VerdictCache(
+                    redis_client,
+                    resource_type=pipeline.resource_type,
+                    model=validator.ollama_model,
+                    system_prompt=validator.get_system_prompt(pipeline.resource_type),
+                )
+            ),
+            pre_filter=RuleBasedPreFilter(),
+            pre_filter_mode=args.prefilter,
+            sheet_writer=sheet_writer,
+        )
+        queue_processor = MessageQueueProcessor(
+            record_processor=record_processor,
+            queue_name=pipeline.queue_name,
+            redis_client=redis_client,
+            worker_id="replay",
+            worker_count=args.workers,
+            batch_size=args.batch_size,
+            retry_base_delay=1,
+            model_class=pipeline.model_class,
+        )
+        fetcher = RecordFetcher(
+            tracker=tracker, queue_checker=queue_processor.get_queued_ids, resource_type=pipeline.resource_type
+        )
+        scheduler = Scheduler(
+            fetcher=fetcher,
+            gf_api_client=gf_api_client,
+            redis_client=redis_client,
+            add_to_queue_func=queue_processor.add_to_queue,
+            pipeline=pipeline,
+        )
+        components.append(PipelineComponents(pipeline, queue_processor, scheduler))
+    return components
+
+
+def replay(args, corpus: list[dict], redis_client: redis.Redis) -> dict:
+    stub = StubOllama(args.request_latency, args.record_latency, args.parallel, args.malformed_rate, args.seed)
+    ollama_server = serve(stub)
+    validator = OllamaClient(
+        base_url=f"http://127.0.0.1:{ollama_server.server_address[1]}",
+        model="stub",
+        max_concurrency=args.ollama_concurrency,
+    )
+
+    stream_key = "replay:spam_check_events"
+
+    def publish_events(endpoint: str, record_ids: list[str]):
+        pipe = redis_client.pipeline(transaction=False)
+        for record_id in record_ids:
+            pipe.xadd(stream_key, {"type": endpoint, "id": record_id, "op": "created"})
+        pipe.execute()
+
+    api = FakeGfApi(args.api_latency, on_publish=publish_events if args.event_stream else None)
+    gf_api_client = GfApiClient()
+    gf_api_client.gf_api_baseurl = "http://gf-api.replay"
+    gf_api_client.base_request = api.request
+
+    sheet_handler = FakeSheetHandler(args.sheets_latency)
+    sheet_writer = BufferedSheetWriter(
+        sheet_handler,
+        batch_size=args.sheets_batch_size,
+        flush_interval=args.sheets_flush_interval,
+        requests_per_minute=args.sheets_requests_per_minute,
+    )
+
+    components = build_components(args, redis_client, validator, gf_api_client, sheet_handler, sheet_writer)
+    stream_consumer = None
+    if args.event_stream:
+        stream_consumer = StreamConsumer(
+            redis_client,
+            {c.pipeline.endpoint: c.scheduler for c in components},
+            stream_key=stream_key,
+            group="replay",
+            consumer="replay",
+            block_ms=500,
+        )
+        stream_consumer.ensure_group()
+    runtime = Runtime(
+        components,
+        sheet_writer,
+        fetch_interval=args.sync_interval,
+        fetch_limit=args.fetch_limit,
+        drain_timeout=10,
+        stream_consumer=stream_consumer,
+    )
+
+    acked_at: dict[str, float] = {}
+    acked = threading.Condition()
+    for queue_processor in runtime.queue_processors:
+        original_ack = queue_processor._ack
+
+        def ack(worker_id, record_id, record_json, original_ack=original_ack):
+            original_ack(worker_id, record_id, record_json)
+            with acked:
+                acked_at.setdefault(record_id, time.monotonic())
+                acked.notify_all()
+
+        queue_processor._ack = ack
+
+    expected = {entry["record"]["id"] for entry in corpus}
+    stop = threading.Event()
+
+    def feed():
+        """依 --rate 讓記錄陸續出現在 API；rate 為 0 時一次全部出現"""
+        if not args.rate:
+            api.publish(corpus)
+            return
+        started = time.monotonic()
+        for i in range(0, len(corpus), max(int(args.rate), 1)):
+            api.publish(corpus[i : i + max(int(args.rate), 1)])
+            if stop.wait(max(started + (i // max(int(args.rate), 1) + 1) - time.monotonic(), 0)):
+                return
+
+    with count_round_trips() as counter:
+        started = time.monotonic()
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        runtime.start()
+
+        deadline = started + args.timeout
+        with acked:
+            while not expected <= acked_at.keys() and time.monotonic() < deadline:
+                acked.wait(timeout=0.5)
+        finished = time.monotonic()
+
+        stop.set()
+        feeder.join()
+        runtime.stop()
+        round_trips = counter["round_trips"]
+    ollama_server.shutdown()
+
+    done = [record_id for record_id in expected if record_id in acked_at]
+    latencies = [acked_at[record_id] - api.published_at[record_id] for record_id in done]
+    verdicts = sheet_handler.verdicts()
+    labels = {entry["record"]["id"]: entry["valid"] for entry in corpus if "valid" in entry}
+    judged = [record_id for record_id in labels if record_id in verdicts]
+    agreed = [record_id for record_id in judged if verdicts[record_id] == labels[record_id]]
+    elapsed = finished - started
+
+    return {
+        "records": len(expected),
+        "completed": len(done),
+        "elapsed_seconds": round(elapsed, 3),
+        "records_per_second": round(len(done) / elapsed, 2) if elapsed else None,
+        "p50_latency_seconds": round(percentile(latencies, 0.5), 3) if latencies else None,
+        "p95_latency_seconds": round(percentile(latencies, 0.95), 3) if latencies else None,
+        "agreement": round(len(agreed) / len(judged), 4) if judged else None,
+        # 標註為有效卻被判為無效（誤擋）/ 標註為無效卻被判為有效（漏放）
+        "false_spam": sum(1 for record_id in judged if labels[record_id] and not verdicts[record_id]),
+        "missed_spam": sum(1 for record_id in judged if not labels[record_id] and verdicts[record_id]),
+        "redis_round_trips": round_trips,
+        "redis_round_trips_per_record": round(round_trips / len(done), 2) if done else None,
+        "llm_requests": stub.requests,
+        "llm_records": stub.records,
+        "sheets_requests": sheet_handler.requests,
+        "spam_judgments": api.judgments,
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """回傳比基準退步超過 tolerance 的指標"""
+    regressions = []
+    for key in HIGHER_IS_BETTER:
+        if baseline.get(key) is not None and (result.get(key) or 0) < baseline[key] * (1 - tolerance):
+            regressions.append(f"{key}: {result.get(key)} < {baseline[key]}")
+    for key in LOWER_IS_BETTER:
+        if baseline.get(key) is not None and (result.get(key) is None or result[key] > baseline[key] * (1 + tolerance)):
+            regressions.append(f"{key}: {result.get(key)} > {baseline[key]}")
+    if result["completed"] < result["records"]:
+        regressions.append(f"completed: {result['completed']} < {result['records']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="有標註的 JSONL 語料；未指定時產生合成語料")
+    parser.add_argument("--records", type=int, default=300, help="合成語料筆數")
+    parser.add_argument("--write-corpus", help="將使用的語料寫入此路徑")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--redis-url", help="本機 redis-server（必須是專用的 db，會被清空）；未指定時使用 fakeredis")
+    parser.add_argument("--rate", type=float, default=0, help="每秒出現在 API 的記錄數，0 表示一次全部出現")
+    parser.add_argument(
+        "--sync-interval", type=float, default=1, help="定時抓取間隔秒數（FETCH_INTERVAL，正式環境為 60）"
+    )
+    parser.add_argument(
+        "--event-stream", action="store_true", help="記錄出現時送出異動事件，由 StreamConsumer 加入 queue"
+    )
+    parser.add_argument("--fetch-limit", type=int, default=50, help="FETCH_LIMIT")
+    parser.add_argument("--workers", type=int, default=2, help="所有 queue 共用的 worker 數（QUEUE_WORKERS）")
+    parser.add_argument("--batch-size", type=int, default=1, help="LLM_BATCH_SIZE")
+    parser.add_argument("--prefilter", choices=["on", "shadow", "off"], default="on", help="PREFILTER_MODE")
+    parser.add_argument("--no-cache", action="store_true", help="停用 verdict cache")
+    parser.add_argument("--ollama-concurrency", type=int, default=2, help="OLLAMA_MAX_CONCURRENCY")
+    parser.add_argument("--request-latency", type=float, default=0.3, help="stub 每次請求的延遲秒數")
+    parser.add_argument("--record-latency", type=float, default=0.05, help="stub 每筆記錄的延遲秒數")
+    parser.add_argument("--parallel", type=int, default=2, help="stub 同時處理的請求數（OLLAMA_NUM_PARALLEL）")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="批次回應為壞掉 JSON 的比例")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="GF API 每次請求的延遲秒數")
+    parser.add_argument("--sheets-latency", type=float, default=0.2, help="Sheets 每次寫入的延遲秒數")
+    parser.add_argument("--sheets-batch-size", type=int, default=50, help="SHEETS_BATCH_SIZE")
+    parser.add_argument("--sheets-flush-interval", type=float, default=1, help="SHEETS_FLUSH_INTERVAL")
+    parser.add_argument("--sheets-requests-per-minute", type=float, default=50, help="SHEETS_REQUESTS_PER_MINUTE")
+    parser.add_argument("--timeout", type=float, default=300, help="最多等待秒數")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出結果")
+    parser.add_argument("--save-baseline", help="將結果寫入此路徑作為基準")
+    parser.add_argument("--baseline", help="與此基準比較，任一指標退步超過 --tolerance 時 exit 1")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    corpus = load_corpus(args.corpus) if args.corpus else make_corpus(args.records, args.seed)
+    if args.write_corpus:
+        with open(args.write_corpus, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in corpus)
+
+    if args.redis_url:
+        # 已處理記錄等 key 沒有前綴，無法和其他資料共存
+        redis_client = redis.from_url(args.redis_url, decode_responses=False)
+        redis_client.flushdb()
+    else:
+        import fakeredis
+
+        redis_client = fakeredis.FakeRedis()
+
+    result = replay(args, corpus, redis_client)
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        for key, value in result.items():
+            print(f"{key:>30}: {value}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print("效能或判斷品質退步：", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+離線測試用的 Ollama /api/chat stub：不需要 GPU 或模型，以可設定的延遲模擬推論時間。
+
+- 輸入為單筆 JSON 物件時回傳 {"valid", "reason"}；輸入為 JSON 陣列（批次模式）時回傳 {"results": [...]}
+- 延遲 = request_latency（每次請求，模擬 system prompt 的 prefill）+ record_latency × 筆數
+- 判斷規則很簡單（含網址、重複字元或關鍵字即為無效），只用來產生可重現的結果
+- --malformed-rate 會讓部分批次回應輸出壞掉的 JSON，用來驗證逐筆 fallback
+
+使用方式：
+    python scripts/stub_ollama.py --port 11435 --request-latency 0.3 --record-latency 0.05
+    OLLAMA_URL=http://localhost:11435 OLLAMA_MODEL=stub ...
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SPAM_PATTERN = re.compile(r"https?://|www\.|(.)\1{5,}|加賴|私訊|賺錢|博弈|spam", re.IGNORECASE)
+
+
+def judge(record: dict) -> tuple[bool, str]:
+    text = " ".join(str(value) for value in record.values() if not isinstance(value, (list, dict)))
+    text += " ".join(str(item) for value in record.values() if isinstance(value, list) for item in value)
+    if SPAM_PATTERN.search(text):
+        return False, "疑似廣告或垃圾訊息"
+    return True, "內容合理"
+
+
+class StubOllama:
+    def __init__(
+        self,
+        request_latency: float = 0.3,
+        record_latency: float = 0.05,
+        parallel: int = 1,
+        malformed_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.request_latency = request_latency
+        self.record_latency = record_latency
+        self.malformed_rate = malformed_rate
+        # 模擬 Ollama 的 OLLAMA_NUM_PARALLEL：超過的請求需排隊
+        self.slots = threading.Semaphore(max(parallel, 1))
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.records = 0
+        self._lock = threading.Lock()
+
+    def chat(self, body: dict) -> dict:
+        user_content = next(m["content"] for m in reversed(body.get("messages", [])) if m.get("role") == "user")
+        payload = json.loads(user_content)
+        records = payload if isinstance(payload, list) else [payload]
+
+        with self._lock:
+            self.requests += 1
+            self.records += len(records)
+            malformed = isinstance(payload, list) and self.random.random() < self.malformed_rate
+
+        with self.slots:
+            time.sleep(self.request_latency + self.record_latency * len(records))
+
+        if malformed:
+            content = '{"results": [{"id": '
+        elif isinstance(payload, list):
+            results = []
+            for record in records:
+                valid, reason = judge(record)
+                results.append({"id": record.get("id"), "valid": valid, "reason": reason})
+            content = json.dumps({"results": results}, ensure_ascii=False)
+        else:
+            valid, reason = judge(payload)
+            content = json.dumps({"valid": valid, "reason": reason}, ensure_ascii=False)
+
+        return {
+            "model": body.get("model", "stub"),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": "stop",
+        }
+
+
+def make_handler(stub: StubOllama):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/api/chat":
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            data = json.dumps(stub.chat(body), ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(stub: StubOllama, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """在背景 thread 啟動 stub，回傳 server（server.server_address 取得實際 port）"""
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--request-latency", type=float, default=0.3)
+    parser.add_argument("--record-latency", type=float, default=0.05)
+    parser.add_argument("--parallel", type=int, default=1)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubOllama(args.request_latency, args.record_latency, args.parallel, args.malformed_rate)
+    server = serve(stub, args.host, args.port)
+    print(f"stub ollama listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+
+
+def env_str(name: str, default: str | None = None) -> str | None:
+    """讀取環境變數；未設定或為空字串（.env 中留空的 key）時回傳 default"""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip()
+
+
+def env_int(name: str, default: int) -> int:
+    value = env_str(name)
+    return default if value is None else int(value)
+
+
+def env_float(name: str, default: float) -> float:
+    value = env_str(name)
+    return default if value is None else float(value)
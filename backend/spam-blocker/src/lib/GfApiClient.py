@@ -1,21 +1,36 @@
 import logging
 import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 
 import dotenv
 import requests
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from .Env import env_int
 
 logger = logging.getLogger(__name__)
 
 dotenv.load_dotenv()
 
+# API 的 ?ids= 一次最多可查詢的筆數
+MAX_IDS_PER_REQUEST = 500
+
 
+# 欄位是否可為 null 與 api-server 的資料表一致（例如 PII 清除後物資需求的 name / address 為 null），
+# 任何一筆解析失敗都會讓整頁抓取失敗、watermark 無法前進
 class HumanResource(BaseModel):
     id: str
     org: str
     address: str
     role_name: str
-    assignment_notes: str
+    assignment_notes: str | None = None
+    # 僅供以 ids 查詢時在客戶端套用 status 篩選，不送進 LLM、queue 與快取 key
+    status: str | None = Field(default=None, exclude=True)
+    # 僅供增量同步推進 watermark，不送進 LLM、queue 與快取 key
+    updated_at: int | None = Field(default=None, exclude=True)
 
 
 class Supplies(BaseModel):
@@ -24,13 +39,15 @@ class Supplies(BaseModel):
     class SupplyItem(BaseModel):
         """物資項目"""
 
-        name: str
-        unit: str
+        name: str | None = None
+        unit: str | None = None
 
     id: str
-    name: str
-    address: str
+    name: str | None = None
+    address: str | None = None
     supplies: list[SupplyItem]
+    # 僅供增量同步推進 watermark，不送進 LLM、queue 與快取 key
+    updated_at: int | None = Field(default=None, exclude=True)
 
 
 class GfApiClient:
@@ -39,6 +56,9 @@ class GfApiClient:
     def __init__(self):
         self.gf_api_baseurl = os.getenv("GF_API_BASE_URL")
         self.gf_api_key = os.getenv("GF_API_KEY") or ""
+        # 分頁抓取時同時進行的請求數，以及單頁失敗時的重試次數
+        self.max_workers = env_int("GF_API_MAX_WORKERS", 4)
+        self.max_retries = env_int("GF_API_MAX_RETRIES", 3)
         self.session = requests.Session()
         self.session.headers.update({"Content-Type": "application/json"})
         self.session.request = lambda *args, **kwargs: requests.Session.request(
@@ -103,6 +123,72 @@ class GfApiClient:
 
         return all_records
 
+    def _get_page(self, endpoint: str, params: dict) -> dict:
+        """取得一頁原始回應；連線錯誤或回應不是列表格式時以指數退避重試，超過 max_retries 次則拋出例外"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.base_request("GET", f"{self.gf_api_baseurl}/{endpoint}", params=params)
+                if "member" not in response:
+                    raise ValueError(f"unexpected response: {response}")
+                return response
+            except (requests.RequestException, ValueError) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = 0.5 * 2**attempt
+                logger.warning(
+                    f"取得 {endpoint} offset={params.get('offset')} 失敗（第 {attempt + 1} 次），{delay:.1f} 秒後重試: {e}"
+                )
+                time.sleep(delay)
+
+    def iter_resource_pages(
+        self,
+        endpoint: str,
+        model_class: type[BaseModel],
+        batch_size: int = 100,
+        overlap: int = 0,
+        **kwargs,
+    ) -> Iterator[list[BaseModel]]:
+        """逐頁取得所有資源
+
+        第一頁取得 totalItems 後，其餘分頁以至多 max_workers 個請求並行抓取，並依分頁順序逐頁 yield，
+        呼叫端可以一邊處理一邊抓取，記憶體中最多只有 max_workers 頁。
+
+        Args:
+            endpoint: API 端點路徑（例如 "human_resources", "supplies"）
+            model_class: Pydantic model 類別（例如 HumanResource, Supplies）
+            batch_size: 每次請求的筆數
+            overlap: 每頁多往前讀的筆數；抓取期間有資料被移出前面的分頁時，後面的資料不會因 offset 位移而漏掉。
+                重疊的記錄會重複出現，呼叫端需自行去重
+            **kwargs: 額外的查詢參數
+
+        Yields:
+            每一頁解析後的 model 列表
+        """
+        first = self._get_page(endpoint, {"limit": batch_size, "offset": 0, **kwargs})
+        total_items = first.get("totalItems", 0)
+        yield [model_class(**item) for item in first["member"]]
+
+        def fetch(offset: int) -> list[BaseModel]:
+            start = max(offset - overlap, 0)
+            page = self._get_page(endpoint, {"limit": batch_size + offset - start, "offset": start, **kwargs})
+            return [model_class(**item) for item in page["member"]]
+
+        fetched = len(first["member"])
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"gf-api-{endpoint}") as pool:
+            pending = deque()
+            for offset in range(batch_size, total_items, batch_size):
+                pending.append(pool.submit(fetch, offset))
+                if len(pending) >= self.max_workers:
+                    page = pending.popleft().result()
+                    fetched += len(page)
+                    yield page
+            while pending:
+                page = pending.popleft().result()
+                fetched += len(page)
+                yield page
+
+        logger.info(f"Total {endpoint} fetched: {fetched}/{total_items}")
+
     def get_all_resources(
         self,
         endpoint: str,
@@ -110,51 +196,61 @@ class GfApiClient:
         batch_size: int = 100,
         **kwargs,
     ) -> list[BaseModel]:
-        """取得所有資源（分頁處理）
+        """取得所有資源（分頁並行抓取，見 iter_resource_pages）
 
         Args:
             endpoint: API 端點路徑（例如 "human_resources", "supplies"）
             model_class: Pydantic model 類別（例如 HumanResource, Supplies）
             batch_size: 每次請求的筆數
-            use_auth: 是否使用認證
             **kwargs: 額外的查詢參數
 
         Returns:
             解析後的 model 列表
         """
-        all_resources: list[BaseModel] = []
-        offset = 0
-
-        while True:
-            params = {"limit": batch_size, "offset": offset, **kwargs}
+        return [
+            record
+            for page in self.iter_resource_pages(endpoint, model_class, batch_size=batch_size, **kwargs)
+            for record in page
+        ]
+
+    def get_latest_updated_at(self, endpoint: str, **kwargs) -> int | None:
+        """取得目前最新一筆資料的 updated_at（依 updated_since 排序取最後一筆）；沒有資料時回傳 None"""
+        params = {"updated_since": 0, **kwargs}
+        total_items = self._get_page(endpoint, {"limit": 1, "offset": 0, **params}).get("totalItems", 0)
+        if not total_items:
+            return None
+        members = self._get_page(endpoint, {"limit": 1, "offset": total_items - 1, **params})["member"]
+        return members[0].get("updated_at") if members else None
+
+    def get_resources_by_ids(
+        self,
+        endpoint: str,
+        model_class: type[BaseModel],
+        ids: list[str],
+        **kwargs,
+    ) -> list[BaseModel]:
+        """
+        以 ?ids= 一次取回多筆資源，超過 MAX_IDS_PER_REQUEST 時分批查詢；找不到的 ID 直接略過
 
+        指定 ids 時 API 會忽略篩選條件，kwargs 中對應到 model 欄位的條件（例如 status）在這裡重新套用，
+        與分頁抓取得到相同範圍的記錄
+        """
+        filters = {key: value for key, value in kwargs.items() if key in model_class.model_fields}
+        records: list[BaseModel] = []
+        for start in range(0, len(ids), MAX_IDS_PER_REQUEST):
+            chunk = ids[start : start + MAX_IDS_PER_REQUEST]
             response = self.base_request(
                 "GET",
                 f"{self.gf_api_baseurl}/{endpoint}",
-                params=params,
+                params={"ids": ",".join(chunk), **kwargs},
             )
-
-            total_items = response.get("totalItems", 0)
-            if total_items == 0:
-                break
-
-            members = response.get("member", [])
-            if not members:
-                break
-
-            logger.info(f"第一筆原始資料: {members[0]}")
-            logger.info(model_class(**members[0]))
-
-            for item in members:
-                all_resources.append(model_class(**item))
-
-            offset += len(members)
-
-            if offset >= total_items:
-                break
-
-        logger.info(f"Total {endpoint} fetched: {len(all_resources)}")
-        return all_resources
+            for item in response.get("member", []):
+                record = model_class(**item)
+                # 舊版 API 會把已完成資料的 id 遮蔽成空字串，無法辨識也不該送驗
+                if not record.id or any(getattr(record, key) != value for key, value in filters.items()):
+                    continue
+                records.append(record)
+        return records
 
     def get_all_human_resources(self, **kwargs) -> list[HumanResource]:
         """取得所有人力資源"""
@@ -172,6 +268,22 @@ class GfApiClient:
         """取得物資資料"""
         return self.get_resources("supplies", Supplies, limit, offset, **kwargs)
 
+    def iter_human_resource_pages(self, **kwargs) -> Iterator[list[HumanResource]]:
+        """逐頁取得所有人力資源"""
+        return self.iter_resource_pages("human_resources", HumanResource, **kwargs)
+
+    def iter_supply_pages(self, **kwargs) -> Iterator[list[Supplies]]:
+        """逐頁取得所有物資"""
+        return self.iter_resource_pages("supplies", Supplies, **kwargs)
+
+    def get_human_resources_by_ids(self, ids: list[str], **kwargs) -> list[HumanResource]:
+        """依 ID 取得人力資源"""
+        return self.get_resources_by_ids("human_resources", HumanResource, ids, **kwargs)
+
+    def get_supplies_by_ids(self, ids: list[str], **kwargs) -> list[Supplies]:
+        """依 ID 取得物資"""
+        return self.get_resources_by_ids("supplies", Supplies, ids, **kwargs)
+
     def submit_spam_judgment(
         self, target_id: str, target_type: str, target_data: dict, is_spam: bool, judgment: str
     ) -> None:
@@ -2,6 +2,7 @@ import enum
 import logging
 import os
 import socket
+import threading
 import time
 from datetime import datetime
 from typing import Any, Dict, List
@@ -14,6 +15,7 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from .GfApiClient import HumanResource, Supplies
+from .Metrics import METRICS
 from .OllamaClient import ValidationResult
 
 dotenv.load_dotenv()
@@ -48,6 +50,8 @@ class GoogleSheetHandler:
 
     _service = None
     _credentials = None
+    # googleapiclient 底層的 httplib2 不是 thread-safe，多個 worker 共用 service 時需序列化請求
+    _request_lock = threading.Lock()
     credentials_path = "secret/cred.json"
 
     def __init__(self):
@@ -100,18 +104,28 @@ class GoogleSheetHandler:
             try:
                 body = {"values": values}
 
-                result = (
-                    self.service.spreadsheets()
-                    .values()
-                    .append(
-                        spreadsheetId=self.spreadsheet_id,
-                        range=f"{sheet_name.value}!A:A",
-                        valueInputOption="RAW",
-                        insertDataOption="INSERT_ROWS",
-                        body=body,
-                    )
-                    .execute()
-                )
+                with self._request_lock:
+                    started = time.monotonic()
+                    try:
+                        result = (
+                            self.service.spreadsheets()
+                            .values()
+                            .append(
+                                spreadsheetId=self.spreadsheet_id,
+                                range=f"{sheet_name.value}!A:A",
+                                valueInputOption="RAW",
+                                insertDataOption="INSERT_ROWS",
+                                body=body,
+                            )
+                            .execute()
+                        )
+                    except Exception:
+                        METRICS.sheets_errors.labels(sheet=sheet_name.value).inc()
+                        raise
+                    finally:
+                        METRICS.sheets_request_seconds.labels(sheet=sheet_name.value).observe(
+                            time.monotonic() - started
+                        )
 
                 logger.info(f"成功追加 {len(values)} 行資料")
                 return result
@@ -129,56 +143,60 @@ class GoogleSheetHandler:
                 logger.error(f"追加 Google Sheets 資料時發生錯誤: {error}")
                 raise
 
+    def build_row(self, record: HumanResource | Supplies, validation_result, sheet_name: str) -> List[str]:
+        """將記錄與驗證結果轉成一列資料，根據 sheet_name 判斷資料類型"""
+        if "human_resource" in sheet_name:
+            record_obj = HumanResourceRecord(
+                id=record.id,
+                org=record.org,
+                address=record.address,
+                role_name=record.role_name,
+                assignment_notes=record.assignment_notes,
+                valid=validation_result.valid,
+                reason=validation_result.reason,
+                validated_at=datetime.now(),
+            )
+            fields = ["id", "org", "address", "role_name", "assignment_notes", "valid", "reason", "validated_at"]
+        elif "supplies" in sheet_name:
+            supplies_list = record.supplies
+
+            supplies_items = []
+            for item in supplies_list:
+                supply_info = f"{item.name or ''} ({item.unit or ''})"
+                supplies_items.append(supply_info)
+
+            supplies_str = " / ".join(supplies_items)
+            logger.info(f"轉換後的 supplies 字串: {supplies_str}")
+
+            record_obj = SuppliesRecord(
+                id=record.id,
+                name=record.name,
+                address=record.address,
+                supplies=supplies_str,
+                valid=validation_result.valid,
+                reason=validation_result.reason,
+                validated_at=datetime.now(),
+            )
+            fields = ["id", "name", "address", "supplies", "valid", "reason", "validated_at"]
+        else:
+            raise ValueError(f"Unknown sheet_name: {sheet_name}")
+
+        row_data = []
+        for field in fields:
+            value = getattr(record_obj, field)
+            if isinstance(value, datetime):
+                formatted_value = value.isoformat()
+            else:
+                formatted_value = str(value) if value is not None else ""
+            row_data.append(formatted_value)
+        return row_data
+
     def append_record(self, record: HumanResource | Supplies, validation_result, sheet_name: str) -> None:
         """寫入一筆資料，根據 sheet_name 判斷資料類型"""
         try:
-            if "human_resource" in sheet_name:
-                record_obj = HumanResourceRecord(
-                    id=record.id,
-                    org=record.org,
-                    address=record.address,
-                    role_name=record.role_name,
-                    assignment_notes=record.assignment_notes,
-                    valid=validation_result.valid,
-                    reason=validation_result.reason,
-                    validated_at=datetime.now(),
-                )
-                fields = ["id", "org", "address", "role_name", "assignment_notes", "valid", "reason", "validated_at"]
-            elif "supplies" in sheet_name:
-                supplies_list = record.supplies
-
-                supplies_items = []
-                for item in supplies_list:
-                    supply_info = f"{item.name} ({item.unit})"
-                    supplies_items.append(supply_info)
-
-                supplies_str = " / ".join(supplies_items)
-                logger.info(f"轉換後的 supplies 字串: {supplies_str}")
-
-                record_obj = SuppliesRecord(
-                    id=record.id,
-                    name=record.name,
-                    address=record.address,
-                    supplies=supplies_str,
-                    valid=validation_result.valid,
-                    reason=validation_result.reason,
-                    validated_at=datetime.now(),
-                )
-                fields = ["id", "name", "address", "supplies", "valid", "reason", "validated_at"]
-            else:
-                raise ValueError(f"Unknown sheet_name: {sheet_name}")
-
-            row_data = []
-            for field in fields:
-                value = getattr(record_obj, field)
-                if isinstance(value, datetime):
-                    formatted_value = value.isoformat()
-                else:
-                    formatted_value = str(value) if value is not None else ""
-                row_data.append(formatted_value)
-
+            row_data = self.build_row(record, validation_result, sheet_name)
             self.append_sheet(SheetName[sheet_name], [row_data])
-            logger.info(f"已寫入資料到 {sheet_name}: {record_obj.id}")
+            logger.info(f"已寫入資料到 {sheet_name}: {record.id}")
 
         except Exception as e:
             logger.error(f"寫入資料時發生錯誤: {e}")
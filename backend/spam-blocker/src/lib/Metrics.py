@@ -0,0 +1,163 @@
+import logging
+import threading
+from typing import Callable, Iterable
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, start_http_server
+from prometheus_client.core import GaugeMetricFamily
+
+from .Env import env_int, env_str
+
+logger = logging.getLogger(__name__)
+
+# 延遲類 histogram 的預設 bucket（秒）；LLM 單次推論約數秒到數十秒
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# 狀態 collector 回傳的樣本：(metric 名稱, 說明, labels, 數值)
+Sample = tuple[str, str, dict[str, str], float]
+
+
+class StateCollector:
+    """
+    抓取時才呼叫的 collector，輸出 queue 長度等向 Redis 查詢的狀態（gauge）；
+    多個 queue 回傳的同名樣本合併成同一個 metric
+    """
+
+    def __init__(self):
+        self._sources: list[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, source: Callable[[], Iterable[Sample]]):
+        with self._lock:
+            self._sources.append(source)
+
+    def describe(self):
+        # 註冊時不呼叫 collect()，避免在啟動時就查詢 Redis
+        return []
+
+    def collect(self):
+        with self._lock:
+            sources = list(self._sources)
+
+        # 名稱 -> (metric, label 名稱)；label 順序以第一個樣本為準
+        families: dict[str, tuple[GaugeMetricFamily, list[str]]] = {}
+        for source in sources:
+            try:
+                samples = list(source())
+            except Exception as e:
+                logger.error(f"收集 metrics 失敗: {e}")
+                continue
+            for name, help_text, labels, value in samples:
+                if name not in families:
+                    families[name] = (GaugeMetricFamily(name, help_text, labels=list(labels)), list(labels))
+                family, label_names = families[name]
+                family.add_metric([str(labels[label]) for label in label_names], value)
+        return [family for family, _ in families.values()]
+
+
+class SpamBlockerMetrics:
+    """spam-blocker 各元件共用的 metric"""
+
+    def __init__(self, registry: CollectorRegistry):
+        self.records_processed = Counter(
+            "spam_blocker_records_processed_total",
+            "Records taken from a queue and processed",
+            ("queue", "outcome"),
+            registry=registry,
+        )
+        self.retries = Counter(
+            "spam_blocker_retries_total", "Records scheduled for a delayed retry", ("queue",), registry=registry
+        )
+        self.dead_letters = Counter(
+            "spam_blocker_dead_letters_total", "Records moved to the dead-letter list", ("queue",), registry=registry
+        )
+        self.verdicts = Counter(
+            "spam_blocker_verdicts_total",
+            "Validation verdicts by resource type, verdict and source (prefilter, cache or llm)",
+            ("resource_type", "verdict", "source"),
+            registry=registry,
+        )
+        self.ollama_request_seconds = Histogram(
+            "spam_blocker_ollama_request_seconds",
+            "Ollama chat request latency",
+            ("mode",),
+            buckets=LATENCY_BUCKETS,
+            registry=registry,
+        )
+        self.ollama_wait_seconds = Histogram(
+            "spam_blocker_ollama_wait_seconds",
+            "Time spent waiting for an OLLAMA_MAX_CONCURRENCY slot",
+            buckets=LATENCY_BUCKETS,
+            registry=registry,
+        )
+        self.ollama_errors = Counter(
+            "spam_blocker_ollama_errors_total", "Ollama chat requests that raised", ("mode",), registry=registry
+        )
+        self.sheets_request_seconds = Histogram(
+            "spam_blocker_sheets_request_seconds",
+            "Google Sheets append request latency",
+            ("sheet",),
+            buckets=LATENCY_BUCKETS,
+            registry=registry,
+        )
+        self.sheets_errors = Counter(
+            "spam_blocker_sheets_errors_total",
+            "Google Sheets append requests that failed",
+            ("sheet",),
+            registry=registry,
+        )
+        self.stream_events = Counter(
+            "spam_blocker_stream_events_total",
+            "Change events read from the api-server event stream by resource type and outcome",
+            ("resource_type", "outcome"),
+            registry=registry,
+        )
+        self.sheets_quota_wait_seconds = Counter(
+            "spam_blocker_sheets_quota_wait_seconds_total",
+            "Time spent waiting on the SHEETS_REQUESTS_PER_MINUTE token bucket",
+            registry=registry,
+        )
+
+
+class MetricsServer:
+    """在背景 thread 提供 GET /metrics"""
+
+    def __init__(
+        self,
+        registry: CollectorRegistry,
+        host: str = env_str("METRICS_HOST", "0.0.0.0"),
+        port: int = env_int("METRICS_PORT", 9108),
+    ):
+        """
+        Args:
+            registry: 要輸出的 CollectorRegistry
+            host: 監聽位址
+            port: 監聽埠號，0 表示不啟動
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def start(self):
+        if self._server is not None or not self.port:
+            return
+        self._server, _ = start_http_server(self.port, addr=self.host, registry=self.registry)
+        logger.info(f"metrics 已啟動: http://{self.host}:{self._server.server_address[1]}/metrics")
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+
+
+REGISTRY = CollectorRegistry()
+METRICS = SpamBlockerMetrics(REGISTRY)
+STATE_COLLECTOR = StateCollector()
+REGISTRY.register(STATE_COLLECTOR)
+
+
+def register_collector(source: Callable[[], Iterable[Sample]]):
+    """註冊在每次抓取時呼叫的函數，回傳 (名稱, 說明, labels, 數值) 的 gauge 樣本"""
+    STATE_COLLECTOR.register(source)
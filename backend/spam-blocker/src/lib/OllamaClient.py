@@ -1,6 +1,8 @@
 import json
 import logging
 import os
+import threading
+import time
 from typing import TYPE_CHECKING
 
 import dotenv
@@ -8,10 +10,14 @@ import ollama
 from pydantic import BaseModel
 
 from src.prompt.system_prompts import (
+    batch_validation_prompt,
     validate_humanresource_prompt,
     validate_supplies_prompt,
 )
 
+from .Env import env_int
+from .Metrics import METRICS
+
 if TYPE_CHECKING:
     from .GfApiClient import HumanResource, Supplies
 
@@ -25,15 +31,42 @@ class ValidationResult(BaseModel):
     reason: str
 
 
+class BatchValidationItem(ValidationResult):
+    id: str
+
+
+class BatchValidationResult(BaseModel):
+    """批次驗證的輸出格式，以 id 對應回各筆資料"""
+
+    results: list[BatchValidationItem]
+
+
 class OllamaClient:
     def __init__(
         self,
         base_url: str = os.getenv("OLLAMA_URL"),
         model: str = os.getenv("OLLAMA_MODEL"),
+        max_concurrency: int = env_int("OLLAMA_MAX_CONCURRENCY", 2),
     ):
         self.ollama_url = base_url
         self.ollama_model = model
         self.ollama_client = ollama.Client(host=self.ollama_url)
+        # 所有 queue 的 worker 共用同一個 client，以 semaphore 限制同時送往 Ollama 的請求數
+        self._inflight = threading.BoundedSemaphore(max(max_concurrency, 1))
+
+    def _chat(self, mode: str, **kwargs):
+        """送出 chat 請求，並記錄等待 semaphore 與請求本身的耗時"""
+        queued = time.monotonic()
+        with self._inflight:
+            started = time.monotonic()
+            METRICS.ollama_wait_seconds.observe(started - queued)
+            try:
+                return self.ollama_client.chat(model=self.ollama_model, options={"temperature": 0.0}, **kwargs)
+            except Exception:
+                METRICS.ollama_errors.labels(mode=mode).inc()
+                raise
+            finally:
+                METRICS.ollama_request_seconds.labels(mode=mode).observe(time.monotonic() - started)
 
     def get_validation_result(self, message: "HumanResource | Supplies", resource_type: str) -> ValidationResult:
         """發送請求到 Ollama"""
@@ -41,13 +74,12 @@ class OllamaClient:
 
         message_dict = message.model_dump() if hasattr(message, "model_dump") else message
 
-        response = self.ollama_client.chat(
-            model=self.ollama_model,
+        response = self._chat(
+            "single",
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": json.dumps(message_dict, ensure_ascii=False)},
             ],
-            options={"temperature": 0.0},
             format=ValidationResult.model_json_schema(),
         )
         llm_response = ValidationResult.model_validate_json(response.message.content)
@@ -55,6 +87,49 @@ class OllamaClient:
 
         return llm_response
 
+    def get_validation_results(
+        self, messages: "list[HumanResource | Supplies]", resource_type: str
+    ) -> dict[str, ValidationResult]:
+        """
+        一次請求驗證多筆資料（共用同一份 system prompt），以 id 對應回結果。
+        輸出格式錯誤或缺漏的資料會改為逐筆驗證；逐筆驗證仍失敗的資料不會出現在回傳結果中。
+        """
+        if len(messages) == 1:
+            return {messages[0].id: self.get_validation_result(messages[0], resource_type)}
+
+        system_prompt = self.get_system_prompt(resource_type) + batch_validation_prompt
+        payload = [message.model_dump() if hasattr(message, "model_dump") else message for message in messages]
+        wanted_ids = {message.id for message in messages}
+
+        results: dict[str, ValidationResult] = {}
+        try:
+            response = self._chat(
+                "batch",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+                ],
+                format=BatchValidationResult.model_json_schema(),
+            )
+            batch = BatchValidationResult.model_validate_json(response.message.content)
+            for item in batch.results:
+                if item.id in wanted_ids:
+                    results[item.id] = ValidationResult(valid=item.valid, reason=item.reason)
+        except Exception as e:
+            logger.warning(f"批次驗證失敗（{len(messages)} 筆），改為逐筆驗證: {e}")
+
+        missing = [message for message in messages if message.id not in results]
+        if missing and len(missing) < len(messages):
+            logger.warning(f"批次驗證結果缺少 {len(missing)}/{len(messages)} 筆，缺少的改為逐筆驗證")
+        for message in missing:
+            try:
+                results[message.id] = self.get_validation_result(message, resource_type)
+            except Exception as e:
+                logger.error(f"記錄 {message.id} 逐筆驗證失敗: {e}")
+
+        logger.info(f"batch validation: {len(messages)} 筆，{len(messages) - len(missing)} 筆由批次結果取得")
+        return results
+
     def get_system_prompt(self, resource_type: str) -> str:
         if resource_type == "human_resource":
             return validate_humanresource_prompt
@@ -0,0 +1,144 @@
+import enum
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from typing import NamedTuple
+
+from .Env import env_int
+from .GfApiClient import HumanResource, Supplies
+
+logger = logging.getLogger(__name__)
+
+URL_PATTERN = re.compile(r"https?://|www\.|\b[\w-]+\.(?:com|net|org|tw|cc|io|xyz|top)\b", re.IGNORECASE)
+REPEATED_PATTERN = re.compile(r"(.)\1{7,}")
+MEANINGFUL_PATTERN = re.compile(r"[^\W_]")
+ADDRESS_PATTERN = re.compile(r"[縣市鄉鎮村里路街巷弄號段]|光復|花蓮")
+
+# 常見廣告 / 詐騙用語；可用 PREFILTER_BLOCKED_PHRASES（逗號分隔）追加
+DEFAULT_BLOCKED_PHRASES = [
+    "加賴",
+    "加line",
+    "私訊領",
+    "博弈",
+    "娛樂城",
+    "百家樂",
+    "代辦貸款",
+    "借貸",
+    "日領",
+    "兼職在家",
+    "投資群",
+    "飆股",
+    "色情",
+]
+
+
+class PreFilterVerdict(enum.Enum):
+    valid = "valid"
+    invalid = "invalid"
+    uncertain = "uncertain"
+
+
+class PreFilterDecision(NamedTuple):
+    verdict: PreFilterVerdict
+    rule: str
+    reason: str
+
+
+UNCERTAIN = PreFilterDecision(PreFilterVerdict.uncertain, "none", "")
+
+
+def _env_list(name: str) -> list[str]:
+    return [item.strip() for item in os.getenv(name, "").split(",") if item.strip()]
+
+
+class RuleBasedPreFilter:
+    """
+    LLM 之前的規則式初篩：明顯有效或明顯無效的記錄直接判定，其餘（uncertain）才送給 LLM。
+
+    判定無效的規則（任一成立）：全部欄位空白、沒有任何文字或數字、含網址、含廣告關鍵字、同一字元連續重複 8 次以上
+    判定有效的規則（全部成立）：組織 / 名稱在信任清單中、地址看起來是地址、所有文字欄位都不超過 max_text_length
+    """
+
+    def __init__(
+        self,
+        trusted_orgs: list[str] | None = None,
+        blocked_phrases: list[str] | None = None,
+        max_text_length: int = env_int("PREFILTER_MAX_TEXT_LENGTH", 50),
+    ):
+        """
+        Args:
+            trusted_orgs: 信任的組織 / 名稱（完全相符），預設讀取 PREFILTER_TRUSTED_ORGS
+            blocked_phrases: 廣告關鍵字，預設為 DEFAULT_BLOCKED_PHRASES 加上 PREFILTER_BLOCKED_PHRASES
+            max_text_length: 判定有效時，每個文字欄位的長度上限
+        """
+        self.trusted_orgs = {
+            org.strip().lower()
+            for org in (trusted_orgs if trusted_orgs is not None else _env_list("PREFILTER_TRUSTED_ORGS"))
+        }
+        phrases = (
+            blocked_phrases
+            if blocked_phrases is not None
+            else DEFAULT_BLOCKED_PHRASES + _env_list("PREFILTER_BLOCKED_PHRASES")
+        )
+        self.blocked_pattern = (
+            re.compile("|".join(re.escape(phrase) for phrase in phrases), re.IGNORECASE) if phrases else None
+        )
+        self.max_text_length = max_text_length
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fields(record: HumanResource | Supplies) -> tuple[str, str, list[str]]:
+        """回傳 (組織或名稱, 地址, 其他文字欄位)；null 欄位視為空字串"""
+        if isinstance(record, Supplies):
+            items = [text or "" for item in record.supplies for text in (item.name, item.unit)]
+            return record.name or "", record.address or "", items
+        return record.org, record.address, [record.role_name, record.assignment_notes or ""]
+
+    def _classify(self, record: HumanResource | Supplies) -> PreFilterDecision:
+        org, address, others = self._fields(record)
+        texts = [org, address, *others]
+        combined = " ".join(texts)
+
+        if not combined.strip():
+            return PreFilterDecision(PreFilterVerdict.invalid, "empty", "內容空白")
+        if not MEANINGFUL_PATTERN.search(combined):
+            return PreFilterDecision(PreFilterVerdict.invalid, "no_text", "無有效文字")
+        if URL_PATTERN.search(combined):
+            return PreFilterDecision(PreFilterVerdict.invalid, "url", "含網址")
+        if self.blocked_pattern and self.blocked_pattern.search(combined):
+            return PreFilterDecision(PreFilterVerdict.invalid, "blocked_phrase", "含廣告關鍵字")
+        if REPEATED_PATTERN.search(combined):
+            return PreFilterDecision(PreFilterVerdict.invalid, "repeated_chars", "重複字元")
+
+        if (
+            org.strip().lower() in self.trusted_orgs
+            and ADDRESS_PATTERN.search(address)
+            and all(len(text) <= self.max_text_length for text in texts)
+        ):
+            return PreFilterDecision(PreFilterVerdict.valid, "trusted_org", "已知單位")
+
+        return UNCERTAIN
+
+    def classify(self, record: HumanResource | Supplies) -> PreFilterDecision:
+        """判定一筆記錄，並記錄各規則的判定次數"""
+        decision = self._classify(record)
+        with self._lock:
+            self._counts[f"{decision.verdict.value}:{decision.rule}"] += 1
+        if decision.verdict is not PreFilterVerdict.uncertain:
+            logger.info(f"pre-filter {decision.verdict.value} rule={decision.rule} id={record.id}")
+        return decision
+
+    def record_agreement(self, decision: PreFilterDecision, llm_valid: bool):
+        """shadow 模式下記錄規則判定與 LLM 是否一致，供離線調整規則"""
+        agree = (decision.verdict is PreFilterVerdict.valid) == llm_valid
+        with self._lock:
+            self._counts[f"{'agree' if agree else 'disagree'}:{decision.rule}"] += 1
+        if not agree:
+            logger.info(f"pre-filter 與 LLM 不一致 rule={decision.rule} llm_valid={llm_valid}")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,199 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from .Env import env_float, env_int
+from .GfApiClient import HumanResource, Supplies
+from .GoogleSheetHandler import GoogleSheetHandler, SheetName
+from .Metrics import METRICS
+from .OllamaClient import ValidationResult
+
+logger = logging.getLogger(__name__)
+
+# 單一分頁寫入失敗後的重試間隔上限
+MAX_RETRY_DELAY_SECONDS = 60
+
+
+class TokenBucket:
+    """Sheets API 每分鐘寫入配額的 token bucket；acquire() 回傳等待的秒數"""
+
+    def __init__(self, requests_per_minute: float, burst: int = 5):
+        self.rate = requests_per_minute / 60
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+
+    def acquire(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        wait = (1 - self.tokens) / self.rate
+        time.sleep(wait)
+        self.tokens = 0.0
+        self.updated_at = time.monotonic()
+        return wait
+
+
+class _PendingRow:
+    __slots__ = ("row", "on_flushed", "queued_at")
+
+    def __init__(self, row: list[str], on_flushed: Callable[[], None] | None):
+        self.row = row
+        self.on_flushed = on_flushed
+        self.queued_at = time.monotonic()
+
+
+class BufferedSheetWriter:
+    """
+    背景批次寫入 Google Sheets：每個分頁累積 batch_size 列或等待 flush_interval 秒後，
+    以一次 values.append 寫入；寫入頻率受 token bucket 限制，失敗的批次留在 buffer 中稍後重試，
+    不會阻塞驗證 worker。每一列寫入成功後才呼叫其 on_flushed（例如標記為已處理）。
+    """
+
+    def __init__(
+        self,
+        sheet_handler: GoogleSheetHandler,
+        batch_size: int = env_int("SHEETS_BATCH_SIZE", 50),
+        flush_interval: float = env_float("SHEETS_FLUSH_INTERVAL", 5),
+        requests_per_minute: float = env_float("SHEETS_REQUESTS_PER_MINUTE", 50),
+        max_buffered_rows: int = env_int("SHEETS_MAX_BUFFERED_ROWS", 5000),
+    ):
+        """
+        Args:
+            sheet_handler: Google Sheet 處理器
+            batch_size: 每次寫入的最大列數
+            flush_interval: 未滿 batch_size 時最多等待的秒數
+            requests_per_minute: 每分鐘最多送出的寫入請求數（Sheets 預設配額為每分鐘 60 次）
+            max_buffered_rows: buffer 上限；超過時 append() 會等待，讓 worker 放慢而不是無限累積
+        """
+        self.sheet_handler = sheet_handler
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.max_buffered_rows = max_buffered_rows
+        self.bucket = TokenBucket(requests_per_minute)
+        self.buffers: dict[SheetName, deque[_PendingRow]] = {sheet: deque() for sheet in SheetName}
+        self._retry_at: dict[SheetName, float] = {}
+        self._failures: dict[SheetName, int] = {}
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self.stats = {"flushed_rows": 0, "flushed_batches": 0, "failed_batches": 0, "quota_wait_seconds": 0.0}
+
+    def append(
+        self,
+        record: HumanResource | Supplies,
+        validation_result: ValidationResult,
+        sheet_name: str,
+        on_flushed: Callable[[], None] | None = None,
+    ):
+        """將一列加入 buffer；buffer 已滿時等待"""
+        row = self.sheet_handler.build_row(record, validation_result, sheet_name)
+        with self._condition:
+            while self._buffered_rows() >= self.max_buffered_rows and not self._stopping:
+                self._condition.wait(timeout=1)
+            self.buffers[SheetName[sheet_name]].append(_PendingRow(row, on_flushed))
+            self._condition.notify_all()
+
+    def _buffered_rows(self) -> int:
+        return sum(len(buffer) for buffer in self.buffers.values())
+
+    def _next_ready(self) -> SheetName | None:
+        """找出可以寫入的分頁：滿 batch_size、最舊的列已等待超過 flush_interval，或正在停止"""
+        now = time.monotonic()
+        for sheet, buffer in self.buffers.items():
+            if not buffer or self._retry_at.get(sheet, 0) > now:
+                continue
+            if self._stopping or len(buffer) >= self.batch_size or now - buffer[0].queued_at >= self.flush_interval:
+                return sheet
+        return None
+
+    def _flush(self, sheet: SheetName):
+        with self._condition:
+            buffer = self.buffers[sheet]
+            batch = [buffer.popleft() for _ in range(min(self.batch_size, len(buffer)))]
+
+        waited = self.bucket.acquire()
+        self.stats["quota_wait_seconds"] += waited
+        METRICS.sheets_quota_wait_seconds.inc(waited)
+        try:
+            self.sheet_handler.append_sheet(sheet, [pending.row for pending in batch])
+        except Exception as e:
+            failures = self._failures.get(sheet, 0) + 1
+            delay = min(2**failures, MAX_RETRY_DELAY_SECONDS)
+            logger.error(f"寫入 {sheet.value} 失敗（{len(batch)} 列，第 {failures} 次），{delay} 秒後重試: {e}")
+            with self._condition:
+                # 放回 buffer 前端，保持原本順序
+                self.buffers[sheet].extendleft(reversed(batch))
+                self._failures[sheet] = failures
+                self._retry_at[sheet] = time.monotonic() + delay
+            self.stats["failed_batches"] += 1
+            return
+
+        with self._condition:
+            self._failures.pop(sheet, None)
+            self._retry_at.pop(sheet, None)
+            self._condition.notify_all()
+        self.stats["flushed_rows"] += len(batch)
+        self.stats["flushed_batches"] += 1
+        logger.info(f"已寫入 {len(batch)} 列到 {sheet.value}")
+
+        for pending in batch:
+            if pending.on_flushed is None:
+                continue
+            try:
+                pending.on_flushed()
+            except Exception as e:
+                logger.error(f"寫入後的處理失敗: {e}")
+
+    def _run(self):
+        while True:
+            with self._condition:
+                sheet = self._next_ready()
+                while sheet is None:
+                    if self._stopping and not self._buffered_rows():
+                        return
+                    self._condition.wait(timeout=0.5)
+                    sheet = self._next_ready()
+            self._flush(sheet)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+        self._thread.start()
+        logger.info("Google Sheets 批次寫入已啟動")
+
+    def stop(self, timeout: float = 60):
+        """寫入 buffer 中剩餘的資料後停止（最多等待 timeout 秒）"""
+        if self._thread is None:
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Google Sheets 批次寫入未在 {timeout} 秒內完成，尚有 {self._buffered_rows()} 列未寫入")
+        self._thread = None
+
+    def collect_metrics(self):
+        """給 register_collector 的 gauge 來源：各分頁 buffer 中等待寫入的列數"""
+        with self._condition:
+            buffered = {sheet.value: len(buffer) for sheet, buffer in self.buffers.items()}
+        for sheet, rows in buffered.items():
+            yield (
+                "spam_blocker_sheets_buffered_rows",
+                "Rows waiting in the Sheets write buffer",
+                {"sheet": sheet},
+                rows,
+            )
+
+    def get_stats(self) -> dict:
+        with self._condition:
+            buffered = {sheet.value: len(buffer) for sheet, buffer in self.buffers.items() if buffer}
+        return {**self.stats, "quota_wait_seconds": round(self.stats["quota_wait_seconds"], 2), "buffered": buffered}
@@ -1,12 +1,27 @@
+from .Env import env_float, env_int, env_str
 from .GfApiClient import GfApiClient, HumanResource, Supplies
 from .GoogleSheetHandler import GoogleSheetHandler
+from .Metrics import METRICS, REGISTRY, MetricsServer, register_collector
 from .OllamaClient import OllamaClient, ValidationResult
+from .PreFilter import PreFilterDecision, PreFilterVerdict, RuleBasedPreFilter
+from .SheetWriter import BufferedSheetWriter
 
 __all__ = [
+    "env_float",
+    "env_int",
+    "env_str",
     "GfApiClient",
     "GoogleSheetHandler",
+    "BufferedSheetWriter",
+    "METRICS",
+    "REGISTRY",
+    "MetricsServer",
+    "register_collector",
     "OllamaClient",
     "ValidationResult",
+    "PreFilterDecision",
+    "PreFilterVerdict",
+    "RuleBasedPreFilter",
     "HumanResource",
     "Supplies",
 ]
@@ -1,19 +1,27 @@
 import logging
 import os
-import time
 from logging.handlers import RotatingFileHandler
 
 import dotenv
-import redis
-import schedule
 
-from lib import GfApiClient, GoogleSheetHandler, OllamaClient
+from lib import (
+    REGISTRY,
+    BufferedSheetWriter,
+    GfApiClient,
+    GoogleSheetHandler,
+    MetricsServer,
+    OllamaClient,
+    env_float,
+    register_collector,
+)
 from message_queue import (
-    MessageQueueProcessor,
+    RESOURCE_PIPELINES,
     ProcessedRecordTracker,
-    Scheduler,
+    Runtime,
+    StreamConsumer,
+    build_pipeline_components,
+    create_redis_client,
 )
-from wokers import RecordFetcher, RecordProcessor
 
 logger = logging.getLogger(__name__)
 
@@ -28,108 +36,58 @@ logging.basicConfig(
 )
 
 
-def create_processor_components(
-    validator: OllamaClient,
-    gf_api_client: GfApiClient,
-    google_sheet_handler: GoogleSheetHandler,
-    redis_url: str,
-    queue_name: str,
-    resource_type: str,
-) -> tuple[MessageQueueProcessor, Scheduler]:
-    """
-    創建處理器組件
-
-    Returns:
-        (MessageQueueProcessor, Scheduler)
-    """
-    redis_client = redis.from_url(redis_url, decode_responses=False)
-    tracker = ProcessedRecordTracker(redis_client)
-
-    record_processor = RecordProcessor(
-        validator=validator,
-        gf_api_client=gf_api_client,
-        google_sheet_handler=google_sheet_handler,
-        tracker=tracker,
-        resource_type=resource_type,
-    )
-
-    queue_processor = MessageQueueProcessor(
-        record_processor=record_processor,
-        redis_url=redis_url,
-        queue_name=queue_name,
-    )
-
-    fetcher = RecordFetcher(
-        tracker=tracker,
-        queue_checker=queue_processor._is_record_in_queue,
-    )
-
-    scheduler = Scheduler(
-        fetcher=fetcher,
-        gf_api_client=gf_api_client,
-        redis_client=redis_client,
-        add_to_queue_func=queue_processor.add_to_queue,
-        resource_type=resource_type,
-    )
-
-    return queue_processor, scheduler
-
-
 if __name__ == "__main__":
     """主程式 - 使用 Message Queue"""
 
     validator = OllamaClient()
     gf_api_client = GfApiClient()
     google_sheet_handler = GoogleSheetHandler()
+    sheet_writer = BufferedSheetWriter(google_sheet_handler)
 
-    redis_url = os.getenv("REDIS_URL")
-    fetch_limit = int(os.getenv("FETCH_LIMIT", 50))
-    offset = int(os.getenv("OFFSET", 0))
-
-    hr_queue_processor, hr_scheduler = create_processor_components(
-        validator=validator,
-        gf_api_client=gf_api_client,
-        google_sheet_handler=google_sheet_handler,
-        redis_url=redis_url,
-        queue_name="human_resource_validation_queue",
-        resource_type="human_resource",
-    )
-
-    supplies_queue_processor, supplies_scheduler = create_processor_components(
-        validator=validator,
-        gf_api_client=gf_api_client,
-        google_sheet_handler=google_sheet_handler,
-        redis_url=redis_url,
-        queue_name="supplies_validation_queue",
-        resource_type="supplies",
-    )
+    # 所有 pipeline、worker 與背景寫入共用同一個連線池
+    redis_client = create_redis_client(os.getenv("REDIS_URL"))
+    tracker = ProcessedRecordTracker(redis_client)
+    tracker.migrate_legacy_sets()
+
+    components = [
+        build_pipeline_components(
+            pipeline,
+            redis_client=redis_client,
+            tracker=tracker,
+            validator=validator,
+            gf_api_client=gf_api_client,
+            google_sheet_handler=google_sheet_handler,
+            sheet_writer=sheet_writer,
+        )
+        for pipeline in RESOURCE_PIPELINES
+    ]
+
+    # 設定 EVENT_STREAM_REDIS_URL 時讀取 api-server 的異動事件，定時抓取改為 RECONCILE_INTERVAL 秒一次的補漏
+    event_stream_url = os.getenv("EVENT_STREAM_REDIS_URL")
+    stream_redis_client = None
+    stream_consumer = None
+    fetch_interval = env_float("FETCH_INTERVAL", 60)
+    if event_stream_url:
+        stream_redis_client = create_redis_client(event_stream_url, max_connections=4)
+        stream_consumer = StreamConsumer(
+            stream_redis_client,
+            schedulers={c.pipeline.endpoint: c.scheduler for c in components},
+        )
+        fetch_interval = env_float("RECONCILE_INTERVAL", 600)
+
+    runtime = Runtime(components, sheet_writer, fetch_interval=fetch_interval, stream_consumer=stream_consumer)
+
+    for queue_processor in runtime.queue_processors:
+        register_collector(queue_processor.collect_metrics)
+    register_collector(sheet_writer.collect_metrics)
+    metrics_server = MetricsServer(REGISTRY)
 
     try:
-        import threading
-
-        hr_queue_processor.start()
-        supplies_queue_processor.start()
-
-        schedule.every(1).minutes.do(hr_scheduler.scheduled_fetch, limit=fetch_limit, offset=offset)
-        schedule.every(1).minutes.do(supplies_scheduler.scheduled_fetch, limit=fetch_limit, offset=offset)
-
-        hr_scheduler.scheduled_fetch(limit=fetch_limit)
-        supplies_scheduler.scheduled_fetch(limit=fetch_limit)
-
-        hr_thread = threading.Thread(target=hr_queue_processor.process_queue, daemon=True)
-        supplies_thread = threading.Thread(target=supplies_queue_processor.process_queue, daemon=True)
-
-        hr_thread.start()
-        supplies_thread.start()
-
-        logger.info("所有處理器已啟動")
-
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
-
-    except KeyboardInterrupt:
-        logger.info("收到中斷信號")
+        metrics_server.start()
+        # 收到 SIGTERM / SIGINT 後等處理中的記錄完成才返回
+        runtime.run_forever()
     finally:
-        hr_queue_processor.stop()
-        supplies_queue_processor.stop()
+        metrics_server.stop()
+        redis_client.connection_pool.disconnect()
+        if stream_redis_client is not None:
+            stream_redis_client.connection_pool.disconnect()
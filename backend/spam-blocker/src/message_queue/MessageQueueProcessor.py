@@ -1,16 +1,142 @@
 import json
 import logging
 import os
+import socket
+import threading
 import time
 from typing import Union
 
 import redis
+from pydantic import BaseModel
 
-from lib import HumanResource, Supplies
+from lib import METRICS, HumanResource, Supplies, env_float, env_int
 from wokers import RecordProcessor
 
 logger = logging.getLogger(__name__)
 
+# queue（list）與其 ID 索引（set）必須同時更新，以 Lua script 保證原子性
+# KEYS[1]: queue, KEYS[2]: ID set；ARGV: id1, json1, id2, json2, ...
+# 回傳每筆是否新加入（1/0）
+ENQUEUE_SCRIPT = """
+local added = {}
+for i = 1, #ARGV, 2 do
+    if redis.call("SADD", KEYS[2], ARGV[i]) == 1 then
+        redis.call("LPUSH", KEYS[1], ARGV[i + 1])
+        added[#added + 1] = 1
+    else
+        added[#added + 1] = 0
+    end
+end
+return added
+"""
+
+# 單次 script 處理的筆數上限，避免一次大量載入時長時間佔住 Redis
+ENQUEUE_CHUNK_SIZE = 500
+
+# 取出一筆記錄：先把到期的延遲重試移回 queue，再以 LMOVE 移到本 worker 的 processing list，
+# 並更新本 worker 的租約（lease）。記錄在 ack 前一直留在 processing list 與 ID 索引中。
+# KEYS[1]: queue, KEYS[2]: delayed zset, KEYS[3]: processing list, KEYS[4]: leases zset
+# ARGV[1]: now, ARGV[2]: lease 到期時間, ARGV[3]: worker id, ARGV[4]: 一次最多移回的延遲筆數,
+# ARGV[5]: 最多取出幾筆
+CLAIM_SCRIPT = """
+local due = redis.call("ZRANGEBYSCORE", KEYS[2], "-inf", ARGV[1], "LIMIT", 0, tonumber(ARGV[4]))
+for _, item in ipairs(due) do
+    redis.call("ZREM", KEYS[2], item)
+    redis.call("LPUSH", KEYS[1], item)
+end
+redis.call("ZADD", KEYS[4], ARGV[2], ARGV[3])
+local claimed = {}
+for i = 1, tonumber(ARGV[5]) do
+    local item = redis.call("LMOVE", KEYS[1], KEYS[3], "RIGHT", "LEFT")
+    if not item then
+        break
+    end
+    claimed[#claimed + 1] = item
+end
+return claimed
+"""
+
+# 將 worker 的 processing list 全部放回 queue 尾端（下一個被取出）
+# ARGV[2] 為 "0" 時只在租約已過期時處理（避免回收剛續約的 worker）
+# KEYS[1]: processing list, KEYS[2]: queue, KEYS[3]: leases zset
+# ARGV[1]: worker id, ARGV[2]: now（"0" 表示強制回收）
+RECOVER_SCRIPT = """
+if ARGV[2] ~= "0" then
+    local score = redis.call("ZSCORE", KEYS[3], ARGV[1])
+    if score and tonumber(score) > tonumber(ARGV[2]) then
+        return 0
+    end
+end
+local moved = 0
+while redis.call("LMOVE", KEYS[1], KEYS[2], "LEFT", "RIGHT") do
+    moved = moved + 1
+end
+redis.call("ZREM", KEYS[3], ARGV[1])
+return moved
+"""
+
+# 將 processing list 中指定的記錄放回 queue 尾端（下一個被取出）；已不在 processing list 的記錄（已 ack）不會放回
+# KEYS[1]: processing list, KEYS[2]: queue；ARGV: record json
+RELEASE_SCRIPT = """
+local moved = 0
+for i = 1, #ARGV do
+    if redis.call("LREM", KEYS[1], 1, ARGV[i]) == 1 then
+        redis.call("RPUSH", KEYS[2], ARGV[i])
+        moved = moved + 1
+    end
+end
+return moved
+"""
+
+# 將 dead-letter list 中的記錄全部移回 queue
+REQUEUE_DEAD_SCRIPT = """
+local moved = 0
+while redis.call("LMOVE", KEYS[1], KEYS[2], "RIGHT", "LEFT") do
+    moved = moved + 1
+end
+return moved
+"""
+
+# 一次從延遲 zset 移回 queue 的筆數上限
+PROMOTE_LIMIT = 100
+# 多久檢查一次其他 worker 的租約
+REAP_INTERVAL_SECONDS = 30
+# 延遲重試的上限
+RETRY_MAX_DELAY_SECONDS = 3600
+# 每個 queue 的 worker 數（Runtime 的 worker thread 輪流處理所有 queue）
+DEFAULT_WORKER_COUNT = env_int("QUEUE_WORKERS", 2)
+
+
+class WorkerStats:
+    """單一 worker 的處理統計，用來決定 worker 數量與 Ollama 主機容量是否相符"""
+
+    def __init__(self, worker_id: str):
+        self.worker_id = worker_id
+        self.started_at = time.monotonic()
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, success: bool, seconds: float):
+        with self._lock:
+            self.processed += 1
+            self.failed += 0 if success else 1
+            self.busy_seconds += seconds
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            uptime = max(time.monotonic() - self.started_at, 1e-9)
+            return {
+                "worker_id": self.worker_id,
+                "processed": self.processed,
+                "failed": self.failed,
+                "records_per_minute": round(self.processed * 60 / uptime, 2),
+                "avg_seconds_per_record": round(self.busy_seconds / self.processed, 3) if self.processed else None,
+                # 處理記錄的時間佔比；接近 1 代表 worker 一直在忙，可再增加 worker
+                "utilization": round(self.busy_seconds / uptime, 3),
+            }
+
 
 class MessageQueueProcessor:
     """基於 Redis Message Queue 的處理器 - 純 Queue 管理"""
@@ -20,128 +146,358 @@ class MessageQueueProcessor:
         record_processor: RecordProcessor,
         redis_url: str = os.getenv("REDIS_URL"),
         queue_name: str = "",
+        redis_client: redis.Redis | None = None,
+        worker_id: str | None = None,
+        worker_count: int = DEFAULT_WORKER_COUNT,
+        batch_size: int = env_int("LLM_BATCH_SIZE", 1),
+        max_retries: int = env_int("QUEUE_MAX_RETRIES", 5),
+        retry_base_delay: float = env_float("QUEUE_RETRY_BASE_DELAY", 30),
+        visibility_timeout: float = env_float("QUEUE_VISIBILITY_TIMEOUT", 600),
+        model_class: type[BaseModel] | None = None,
     ):
         """
         Args:
             record_processor: 記錄處理器
             redis_url: Redis 連線 URL
             queue_name: Queue 名稱
+            redis_client: 已建立的 Redis 客戶端（指定時忽略 redis_url）
+            worker_id: worker 識別名稱前綴，決定 processing list 的 key（預設 hostname-pid）
+            worker_count: 此 queue 的 worker 數，決定 worker_ids
+            batch_size: 每個 worker 一次取出、以同一個 LLM 請求驗證的筆數
+            max_retries: 失敗超過此次數即移入 dead-letter list
+            retry_base_delay: 第一次重試的延遲秒數，之後每次加倍
+            visibility_timeout: worker 超過此秒數沒有續約，其 processing list 會被放回 queue
+            model_class: queue 中記錄的 model；未指定時依 queue_name 判斷
         """
         self.record_processor = record_processor
-        self.redis = redis.from_url(redis_url, decode_responses=False)
+        self.redis = redis_client or redis.from_url(redis_url, decode_responses=False)
         self.queue_name = queue_name
-        self.is_running = False
+        self.queue_ids_key = f"{queue_name}:ids"
+        self.delayed_key = f"{queue_name}:delayed"
+        self.dead_letter_key = f"{queue_name}:dead"
+        self.leases_key = f"{queue_name}:leases"
+        base_worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.worker_ids = [f"{base_worker_id}-{i}" for i in range(max(worker_count, 1))]
+        self.batch_size = max(batch_size, 1)
+        self.worker_stats = {worker_id: WorkerStats(worker_id) for worker_id in self.worker_ids}
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.visibility_timeout = visibility_timeout
+        self.model_class = model_class
+        self._last_reap = 0.0
+        self._enqueue = self.redis.register_script(ENQUEUE_SCRIPT)
+        self._claim = self.redis.register_script(CLAIM_SCRIPT)
+        self._recover = self.redis.register_script(RECOVER_SCRIPT)
+        self._release = self.redis.register_script(RELEASE_SCRIPT)
+        self._requeue_dead = self.redis.register_script(REQUEUE_DEAD_SCRIPT)
 
-    def _is_record_in_queue(self, record_id: str) -> bool:
-        """檢查記錄是否已在 Redis queue 中"""
-        try:
-            queue_items = self.redis.lrange(self.queue_name, 0, -1)
+    def _processing_key(self, worker_id: str) -> str:
+        return f"{self.queue_name}:processing:{worker_id}"
+
+    def prepare(self):
+        """開始處理前呼叫一次"""
+        self._rebuild_queue_ids()
 
-            for item in queue_items:
+    def _rebuild_queue_ids(self, chunk_size: int = 1000):
+        """ID 索引不存在但 queue 有資料時（例如升級前留下的 queue），掃描一次 queue 重建索引"""
+        if self.redis.exists(self.queue_ids_key) or not self.redis.llen(self.queue_name):
+            return
+
+        rebuilt = 0
+        start = 0
+        while True:
+            items = self.redis.lrange(self.queue_name, start, start + chunk_size - 1)
+            if not items:
+                break
+            ids = []
+            for item in items:
                 try:
-                    record = json.loads(item)
-                    if record.get("id") == record_id:
-                        return True
+                    record_id = json.loads(item).get("id")
                 except json.JSONDecodeError:
                     continue
+                if record_id:
+                    ids.append(record_id)
+            if ids:
+                rebuilt += self.redis.sadd(self.queue_ids_key, *ids)
+            start += chunk_size
 
-            return False
+        logger.info(f"已重建 {self.queue_name} 的 ID 索引：{rebuilt} 筆")
+
+    def _is_record_in_queue(self, record_id: str) -> bool:
+        """檢查記錄是否已在 Redis queue 中"""
+        try:
+            return bool(self.redis.sismember(self.queue_ids_key, record_id))
         except Exception as e:
             logger.error(f"檢查 queue 中的記錄時發生錯誤: {e}")
             return False
 
-    def add_to_queue(self, records: list[Union[HumanResource, Supplies]]):
-        """將資料加入 Redis message queue，避免重複"""
-        added_count = 0
-        skipped_count = 0
+    def get_queued_ids(self, record_ids: list[str]) -> set[str]:
+        """以一次 SMISMEMBER 找出 record_ids 中已在 queue 內的 ID"""
+        if not record_ids:
+            return set()
+        flags = self.redis.smismember(self.queue_ids_key, record_ids)
+        return {record_id for record_id, flag in zip(record_ids, flags) if flag}
 
+    def add_to_queue(self, records: list[Union[HumanResource, Supplies]]) -> set[str]:
+        """將資料加入 Redis message queue，避免重複；整批透過同一個 pipeline 送出，回傳實際加入的 ID"""
+        entries = []
         for record in records:
             try:
-                record_id = record.id
-
-                if self._is_record_in_queue(record_id):
-                    skipped_count += 1
-                    logger.debug(f"記錄 {record_id} 已在 queue 中，跳過加入")
-                    continue
-
                 record_dict = record.model_dump() if hasattr(record, "dict") else record
-                record_json = json.dumps(record_dict, ensure_ascii=False)
-                self.redis.lpush(self.queue_name, record_json)
-                added_count += 1
-                logger.info(f"資料 {record.id} 已加入 Redis queue")
-
+                entries.append((record_dict["id"], json.dumps(record_dict, ensure_ascii=False)))
             except Exception as e:
-                logger.error(f"加入 Redis queue 失敗: {e}")
+                logger.error(f"序列化記錄失敗: {e}")
 
-        logger.info(f"Queue 更新完成：新增 {added_count} 筆，跳過 {skipped_count} 筆")
+        if not entries:
+            return set()
 
-    def process_queue(self):
-        """處理 Redis message queue 中的資料"""
-        logger.info("開始處理 Redis queue 中的資料...")
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for start in range(0, len(entries), ENQUEUE_CHUNK_SIZE):
+                chunk = entries[start : start + ENQUEUE_CHUNK_SIZE]
+                args = [value for entry in chunk for value in entry]
+                self._enqueue(keys=[self.queue_name, self.queue_ids_key], args=args, client=pipe)
+            flags = [flag for chunk_flags in pipe.execute() for flag in chunk_flags]
+        except Exception as e:
+            logger.error(f"加入 Redis queue 失敗: {e}")
+            return set()
 
-        while self.is_running:
-            try:
-                result = self.redis.brpop(self.queue_name, timeout=1)
+        added_ids = set()
+        for (record_id, _), added in zip(entries, flags):
+            if added:
+                added_ids.add(record_id)
+                logger.info(f"資料 {record_id} 已加入 Redis queue")
+            else:
+                logger.debug(f"記錄 {record_id} 已在 queue 中，跳過加入")
 
-                if result:
-                    _, record_json = result
-                    record_dict = json.loads(record_json)
+        logger.info(f"Queue 更新完成：新增 {len(added_ids)} 筆，跳過 {len(entries) - len(added_ids)} 筆")
+        return added_ids
 
-                    if "human_resource" in self.queue_name:
-                        record = HumanResource(**record_dict)
-                    elif "supplies" in self.queue_name:
-                        record = Supplies(**record_dict)
-                    else:
-                        logger.error(f"未知的 queue_name: {self.queue_name}")
-                        continue
+    def _claim_next(self, worker_id: str) -> list[bytes]:
+        """取出至多 batch_size 筆記錄並移到該 worker 的 processing list"""
+        now = time.time()
+        return self._claim(
+            keys=[self.queue_name, self.delayed_key, self._processing_key(worker_id), self.leases_key],
+            args=[now, now + self.visibility_timeout, worker_id, PROMOTE_LIMIT, self.batch_size],
+        )
 
-                    record_id = record.id
+    def _ack(self, worker_id: str, record_id: str, record_json: bytes):
+        """處理完成：移出 processing list 與 ID 索引"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.lrem(self._processing_key(worker_id), 1, record_json)
+        pipe.srem(self.queue_ids_key, record_id)
+        pipe.execute()
 
-                    logger.info(f"從 queue 取出記錄: {record_id}")
+    def _retry_later(self, worker_id: str, record_id: str, record_json: bytes):
+        """處理失敗：依重試次數以指數退避放入延遲 zset，超過上限則移入 dead-letter list"""
+        tracker = self.record_processor.tracker
+        retries = tracker.increment_retry_count(record_id)
 
-                    success = self.record_processor.process_record(record)
+        if retries > self.max_retries:
+            self._dead_letter(worker_id, record_json)
+            tracker.clear_retry_count(record_id)
+            logger.error(f"記錄 {record_id} 已失敗 {retries} 次，移入 dead-letter list: {self.dead_letter_key}")
+            return
 
-                    if not success:
-                        self.redis.rpush(self.queue_name, record_json)
-                        logger.info(f"記錄 {record_id} 處理失敗，已放回 queue 等待重試")
-                        time.sleep(1)
+        delay = min(self.retry_base_delay * 2 ** (retries - 1), RETRY_MAX_DELAY_SECONDS)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.lrem(self._processing_key(worker_id), 1, record_json)
+        pipe.zadd(self.delayed_key, {record_json: time.time() + delay})
+        pipe.execute()
+        METRICS.retries.labels(queue=self.queue_name).inc()
+        logger.info(f"記錄 {record_id} 處理失敗（第 {retries} 次），{delay:.0f} 秒後重試")
 
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON 解析錯誤: {e}")
-            except Exception as e:
-                if "timeout" not in str(e).lower():
-                    logger.error(f"處理錯誤: {e}")
-                time.sleep(0.5)
+    def _dead_letter(self, worker_id: str, record_json: bytes):
+        """
+        移入 dead-letter list；ID 仍保留在索引中，避免定時抓取又把同一筆放回 queue，
+        需以 requeue_dead_letters() 手動放回
+        """
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.lrem(self._processing_key(worker_id), 1, record_json)
+        pipe.lpush(self.dead_letter_key, record_json)
+        pipe.execute()
+        METRICS.dead_letters.labels(queue=self.queue_name).inc()
 
-    def clear_queue(self):
-        """清空 Redis queue"""
-        self.redis.delete(self.queue_name)
-        logger.info(f"已清空 queue: {self.queue_name}")
+    def _reap_stale_workers(self):
+        """把租約過期（worker 當機或卡住）的 processing list 放回 queue"""
+        now = time.time()
+        if now - self._last_reap < REAP_INTERVAL_SECONDS:
+            return
+        self._last_reap = now
+
+        for worker_id in self.redis.zrangebyscore(self.leases_key, "-inf", now):
+            worker_id = worker_id.decode("utf-8") if isinstance(worker_id, bytes) else worker_id
+            moved = self._recover(
+                keys=[self._processing_key(worker_id), self.queue_name, self.leases_key],
+                args=[worker_id, now],
+            )
+            if moved:
+                logger.warning(f"worker {worker_id} 租約過期，已將 {moved} 筆處理中的記錄放回 {self.queue_name}")
 
-    def start(self):
-        """啟動處理器"""
-        if self.is_running:
-            logger.warning("處理器已在運行中")
+    def _recover_own(self, worker_id: str):
+        """把該 worker 先前未完成（例如上次中斷）的記錄放回 queue"""
+        moved = self._recover(
+            keys=[self._processing_key(worker_id), self.queue_name, self.leases_key], args=[worker_id, 0]
+        )
+        if moved:
+            logger.info(f"已將 {moved} 筆未完成的記錄放回 {self.queue_name}")
+
+    def _release_unsettled(self, worker_id: str, record_jsons: list[bytes]):
+        """
+        處理一批時發生錯誤：只把這一批中尚未交給 Sheet 寫入、也尚未排入重試的記錄放回 queue。
+        processing list 中其他等待背景寫入的記錄寫入後仍會 ack，放回 queue 會造成重複寫入與重複提交判定。
+        """
+        if not record_jsons:
             return
+        moved = self._release(keys=[self._processing_key(worker_id), self.queue_name], args=record_jsons)
+        if moved:
+            logger.info(f"已將 {moved} 筆未完成的記錄放回 {self.queue_name}")
+
+    def _parse_record(self, record_json: bytes) -> HumanResource | Supplies:
+        record_dict = json.loads(record_json)
+        if self.model_class is not None:
+            return self.model_class(**record_dict)
+        if "human_resource" in self.queue_name:
+            return HumanResource(**record_dict)
+        elif "supplies" in self.queue_name:
+            return Supplies(**record_dict)
+        raise ValueError(f"未知的 queue_name: {self.queue_name}")
+
+    def prepare_worker(self, worker_id: str):
+        """worker 開始處理前呼叫：把該 worker 上次中斷時未完成的記錄放回 queue"""
+        self._recover_own(worker_id)
+
+    def release_worker(self, worker_id: str):
+        """worker 停止後呼叫：仍有等待背景寫入的記錄時保留租約，若最後沒有寫入成功，租約過期後會被放回 queue"""
+        if not self.redis.llen(self._processing_key(worker_id)):
+            self.redis.zrem(self.leases_key, worker_id)
+
+    def process_next(self, worker_id: str) -> bool:
+        """
+        取出並處理一批記錄
+
+        Returns:
+            bool: 是否有取到記錄；queue 為空或發生錯誤時回傳 False，由呼叫端決定等待多久再取
+        """
+        stats = self.worker_stats[worker_id]
+        # 本批還沒有交給 Sheet 寫入、排入重試或移入 dead-letter 的記錄，發生錯誤時只放回這些
+        unsettled: list[bytes] = []
+        try:
+            self._reap_stale_workers()
+            claimed = self._claim_next(worker_id)
+            if not claimed:
+                return False
+            unsettled = list(claimed)
+
+            batch = []
+            for record_json in claimed:
+                try:
+                    batch.append((self._parse_record(record_json), record_json))
+                except ValueError as e:
+                    # 無法解析的記錄重試也不會成功，直接移入 dead-letter list
+                    logger.error(f"無法解析的記錄，移入 dead-letter list: {e}")
+                    self._dead_letter(worker_id, record_json)
+                    unsettled.remove(record_json)
+
+            if not batch:
+                return True
+
+            logger.info(f"[{worker_id}] 從 queue 取出記錄: {', '.join(record.id for record, _ in batch)}")
+
+            claimed_json = {record.id: record_json for record, record_json in batch}
+
+            def on_uploaded(record_id: str):
+                # 寫入 Google Sheet 後才 ack；背景批次寫入時會在寫入 thread 中呼叫
+                self._ack(worker_id, record_id, claimed_json[record_id])
+                self.record_processor.tracker.clear_retry_count(record_id)
+
+            started = time.monotonic()
+            outcomes = self.record_processor.process_records([record for record, _ in batch], on_uploaded)
+            elapsed = time.monotonic() - started
+            # 成功的記錄已交給 Sheet 寫入（或已寫入並 ack），由 on_uploaded ack
+            unsettled = [record_json for record, record_json in batch if not outcomes.get(record.id, False)]
 
-        self.is_running = True
-        logger.info(f"Redis Message Queue 處理器已啟動: {self.queue_name}")
+            for record, record_json in batch:
+                success = outcomes.get(record.id, False)
+                stats.record(success, elapsed / len(batch))
+                METRICS.records_processed.labels(
+                    queue=self.queue_name, outcome="success" if success else "failed"
+                ).inc()
+                if not success:
+                    self._retry_later(worker_id, record.id, record_json)
+                    unsettled.remove(record_json)
+            return True
 
-    def stop(self):
-        """停止處理器"""
-        logger.info(f"正在停止 Redis Message Queue 處理器: {self.queue_name}")
-        self.is_running = False
-        logger.info(f"Redis Message Queue 處理器已停止: {self.queue_name}")
+        except Exception as e:
+            logger.error(f"處理錯誤: {e}")
+            try:
+                self._release_unsettled(worker_id, unsettled)
+            except Exception as recover_error:
+                logger.error(f"放回未完成記錄失敗: {recover_error}")
+            return False
+
+    def requeue_dead_letters(self) -> int:
+        """將 dead-letter list 中的記錄全部放回 queue，回傳筆數"""
+        moved = self._requeue_dead(keys=[self.dead_letter_key, self.queue_name])
+        logger.info(f"已將 {moved} 筆 dead-letter 記錄放回 {self.queue_name}")
+        return moved
+
+    def clear_queue(self):
+        """清空 Redis queue（含延遲重試、dead-letter 與所有 worker 的 processing list）"""
+        processing_keys = list(self.redis.scan_iter(match=self._processing_key("*")))
+        self.redis.delete(
+            self.queue_name,
+            self.queue_ids_key,
+            self.delayed_key,
+            self.dead_letter_key,
+            self.leases_key,
+            *processing_keys,
+        )
+        logger.info(f"已清空 queue: {self.queue_name}")
 
     def get_queue_size(self) -> int:
         """取得 Redis queue 大小"""
         return self.redis.llen(self.queue_name)
 
+    def collect_metrics(self):
+        """給 register_collector 的 gauge 來源：抓取時才向 Redis 查詢 queue 狀態"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.llen(self.queue_name)
+        pipe.zcard(self.delayed_key)
+        pipe.llen(self.dead_letter_key)
+        pipe.scard(self.queue_ids_key)
+        queue_length, delayed, dead, indexed = pipe.execute()
+        labels = {"queue": self.queue_name}
+        yield "spam_blocker_queue_length", "Records waiting in the queue", labels, queue_length
+        yield "spam_blocker_queue_delayed", "Records waiting for a delayed retry", labels, delayed
+        yield "spam_blocker_queue_dead_letters", "Records in the dead-letter list", labels, dead
+        # 索引包含 queue、處理中、延遲重試與 dead-letter，扣掉其他三者即為處理中的筆數
+        yield (
+            "spam_blocker_queue_in_flight",
+            "Records claimed by a worker and not yet acked",
+            labels,
+            max(indexed - queue_length - delayed - dead, 0),
+        )
+        for stats in self.worker_stats.values():
+            yield (
+                "spam_blocker_worker_utilization",
+                "Share of uptime a worker spent processing records",
+                {**labels, "worker": stats.worker_id},
+                stats.as_dict()["utilization"],
+            )
+
     def get_stats(self) -> dict:
         """取得統計資訊"""
         return {
             "queue_name": self.queue_name,
             "queue_size": self.get_queue_size(),
+            "delayed_count": self.redis.zcard(self.delayed_key),
+            "dead_letter_count": self.redis.llen(self.dead_letter_key),
+            "workers": [stats.as_dict() for stats in self.worker_stats.values()],
+            "pre_filter": self.record_processor.pre_filter.get_stats() if self.record_processor.pre_filter else None,
+            "verdict_cache": (
+                self.record_processor.verdict_cache.get_stats() if self.record_processor.verdict_cache else None
+            ),
             "processed_count": self.record_processor.tracker.get_processed_count(),
             "last_processed_id": self.record_processor.tracker.get_last_processed_id(),
         }
@@ -0,0 +1,36 @@
+from typing import NamedTuple
+
+from pydantic import BaseModel
+
+from lib import HumanResource, Supplies
+
+
+class ResourcePipeline(NamedTuple):
+    """一種資源的處理流程設定：從哪個 API 端點抓取、解析成哪個 model、放進哪個 queue"""
+
+    resource_type: str
+    queue_name: str
+    endpoint: str
+    model_class: type[BaseModel]
+    # 列表查詢時額外帶入的參數
+    query: dict
+
+
+# Runtime 依序為每一項建立 queue、fetcher 與定時抓取；新增資源類型時在這裡加一項，
+# 並在 SheetName、GoogleSheetHandler.build_row 與 OllamaClient.get_system_prompt 補上對應的分頁與 prompt
+RESOURCE_PIPELINES: tuple[ResourcePipeline, ...] = (
+    ResourcePipeline(
+        resource_type="human_resource",
+        queue_name="human_resource_validation_queue",
+        endpoint="human_resources",
+        model_class=HumanResource,
+        query={"status": "active"},
+    ),
+    ResourcePipeline(
+        resource_type="supplies",
+        queue_name="supplies_validation_queue",
+        endpoint="supplies",
+        model_class=Supplies,
+        query={"embed": "all"},
+    ),
+)
@@ -1,39 +1,141 @@
 import logging
+import time
 from typing import Optional
 
 import redis
 
+from lib import env_int
+
 logger = logging.getLogger(__name__)
 
+# 標記已處理並移除超過保留期限的紀錄，與寫入在同一個 script 中完成
+# KEYS: processed, valid, invalid, last_processed；ARGV: now, cutoff, 之後每兩個為 record_id, valid(1/0/"")
+MARK_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cutoff = tonumber(ARGV[2])
+for i = 3, #ARGV, 2 do
+    redis.call("ZADD", KEYS[1], now, ARGV[i])
+    if ARGV[i + 1] == "1" then
+        redis.call("ZADD", KEYS[2], now, ARGV[i])
+        redis.call("ZREM", KEYS[3], ARGV[i])
+    elseif ARGV[i + 1] == "0" then
+        redis.call("ZADD", KEYS[3], now, ARGV[i])
+        redis.call("ZREM", KEYS[2], ARGV[i])
+    end
+end
+redis.call("SET", KEYS[4], ARGV[#ARGV - 1])
+for k = 1, 3 do
+    redis.call("ZREMRANGEBYSCORE", KEYS[k], "-inf", cutoff)
+end
+return 1
+"""
+
+# 舊版以 set 保存，轉換成 zset 時每批處理的筆數
+MIGRATE_BATCH_SIZE = 1000
 
-class ProcessedRecordTracker:
-    """使用 Redis 追蹤已處理記錄"""
 
-    def __init__(self, redis_client: redis.Redis):
+class ProcessedRecordTracker:
+    """
+    使用 Redis 追蹤已處理記錄
+
+    已處理 / 有效 / 無效記錄以 zset 保存（score 為處理時間），超過 history_days 的紀錄在每次寫入時移除，
+    記憶體只和保留期間內處理的筆數有關。查詢時以 ZMSCORE 只查這一頁的 ID，不會取回整個集合。
+
+    判斷是精確的，沒有 Bloom filter 的誤判：不會把沒處理過的記錄當成已處理而跳過驗證。
+    超過保留期限的 ID 會被遺忘，只有在記錄被修改（updated_at 變動）或重新回補時才會再被抓到，
+    此時會重新驗證一次（verdict cache 仍有效時不會再呼叫 LLM）。
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        history_days: int = env_int("PROCESSED_HISTORY_DAYS", 30),
+    ):
+        """
+        Args:
+            redis_client: Redis 客戶端
+            history_days: 已處理記錄的保留天數
+        """
         self.redis = redis_client
         self.processed_set_key = "processed_records"
         self.last_processed_key = "last_processed_id"
         self.valid_records_key = "valid_records"
         self.invalid_records_key = "invalid_records"
         self.retry_count_key_prefix = "retry_count:"  # 記錄重試次數
+        self.history_seconds = history_days * 24 * 60 * 60
+        self._mark = self.redis.register_script(MARK_SCRIPT)
+
+    def migrate_legacy_sets(self):
+        """
+        舊版的 processed / valid / invalid 為不會過期的 set，啟動時轉成 zset。
+        先 RENAME 再分批搬移，多個 process 同時啟動也只有一個會搬移；中斷後下次啟動會從 :legacy 接續。
+        搬移的紀錄以目前時間為處理時間，保留期限過後移除。
+        """
+        for key in (self.processed_set_key, self.valid_records_key, self.invalid_records_key):
+            legacy_key = f"{key}:legacy"
+            if self.redis.type(key) in (b"set", "set"):
+                try:
+                    self.redis.rename(key, legacy_key)
+                except redis.ResponseError:
+                    continue  # 已被其他 process rename
+
+            if not self.redis.exists(legacy_key):
+                continue
+
+            now = time.time()
+            migrated = 0
+            cursor = 0
+            while True:
+                cursor, members = self.redis.sscan(legacy_key, cursor, count=MIGRATE_BATCH_SIZE)
+                if members:
+                    self.redis.zadd(key, {member: now for member in members}, nx=True)
+                    migrated += len(members)
+                if cursor == 0:
+                    break
+            self.redis.delete(legacy_key)
+            logger.info(f"已將 {key} 的 {migrated} 筆舊紀錄轉為 zset")
 
     def is_processed(self, record_id: str) -> bool:
         """檢查是否已處理"""
-        return self.redis.sismember(self.processed_set_key, record_id)
-
-    def mark_as_processed(self, record_id: str):
-        """標記為已處理"""
-        self.redis.sadd(self.processed_set_key, record_id)
-        self.redis.set(self.last_processed_key, record_id)
+        return record_id in self.get_processed_ids([record_id])
+
+    def get_processed_ids(self, record_ids: list[str]) -> set[str]:
+        """以一次 ZMSCORE 找出 record_ids 中已處理的 ID"""
+        if not record_ids:
+            return set()
+        scores = self.redis.zmscore(self.processed_set_key, record_ids)
+        return {record_id for record_id, score in zip(record_ids, scores) if score is not None}
+
+    def mark_as_processed(self, record_id: str, valid: Optional[bool] = None):
+        """標記為已處理；有給 valid 時一併標記有效 / 無效"""
+        self.mark_batch_as_processed([(record_id, valid)])
         logger.info(f"記錄 {record_id} 已標記為已處理")
 
+    def mark_batch_as_processed(self, results: list[tuple[str, Optional[bool]]]):
+        """
+        整批標記為已處理，所有寫入與過期紀錄的移除在同一個 script 中一次完成
+
+        Args:
+            results: (record_id, valid) 列表；valid 為 None 時只標記已處理
+        """
+        if not results:
+            return
+        now = time.time()
+        args = [now, now - self.history_seconds]
+        for record_id, valid in results:
+            args += [record_id, "" if valid is None else "1" if valid else "0"]
+        self._mark(
+            keys=[self.processed_set_key, self.valid_records_key, self.invalid_records_key, self.last_processed_key],
+            args=args,
+        )
+
     def mark_as_valid(self, record_id: str):
         """標記為有效記錄"""
-        self.redis.sadd(self.valid_records_key, record_id)
+        self.redis.zadd(self.valid_records_key, {record_id: time.time()})
 
     def mark_as_invalid(self, record_id: str):
         """標記為無效記錄"""
-        self.redis.sadd(self.invalid_records_key, record_id)
+        self.redis.zadd(self.invalid_records_key, {record_id: time.time()})
 
     def get_last_processed_id(self) -> Optional[str]:
         """取得最後處理的記錄 ID"""
@@ -41,16 +143,16 @@ class ProcessedRecordTracker:
         return result.decode("utf-8") if result else None
 
     def get_processed_count(self) -> int:
-        """取得已處理記錄數量"""
-        return self.redis.scard(self.processed_set_key)
+        """取得保留期間內已處理記錄數量"""
+        return self.redis.zcard(self.processed_set_key)
 
     def get_valid_count(self) -> int:
-        """取得有效記錄數量"""
-        return self.redis.scard(self.valid_records_key)
+        """取得保留期間內有效記錄數量"""
+        return self.redis.zcard(self.valid_records_key)
 
     def get_invalid_count(self) -> int:
-        """取得無效記錄數量"""
-        return self.redis.scard(self.invalid_records_key)
+        """取得保留期間內無效記錄數量"""
+        return self.redis.zcard(self.invalid_records_key)
 
     def get_retry_count(self, record_id: str) -> int:
         """取得記錄的重試次數"""
@@ -61,9 +163,11 @@ class ProcessedRecordTracker:
     def increment_retry_count(self, record_id: str) -> int:
         """增加記錄的重試次數，回傳新的次數"""
         key = f"{self.retry_count_key_prefix}{record_id}"
-        new_count = self.redis.incr(key)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.incr(key)
         # 設定過期時間 7 天，避免永久佔用記憶體
-        self.redis.expire(key, 7 * 24 * 60 * 60)
+        pipe.expire(key, 7 * 24 * 60 * 60)
+        new_count, _ = pipe.execute()
         return new_count
 
     def clear_retry_count(self, record_id: str):
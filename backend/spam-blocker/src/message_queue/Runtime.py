@@ -0,0 +1,309 @@
+import heapq
+import itertools
+import logging
+import signal
+import threading
+import time
+from functools import partial
+from typing import Callable, NamedTuple
+
+import redis
+
+from lib import (
+    BufferedSheetWriter,
+    GfApiClient,
+    GoogleSheetHandler,
+    OllamaClient,
+    RuleBasedPreFilter,
+    env_float,
+    env_int,
+)
+from wokers import RecordFetcher, RecordProcessor
+
+from .MessageQueueProcessor import DEFAULT_WORKER_COUNT, MessageQueueProcessor
+from .Pipelines import ResourcePipeline
+from .ProcessedRecordTracker import ProcessedRecordTracker
+from .Scheduler import Scheduler
+from .StreamConsumer import StreamConsumer
+from .VerdictCache import VerdictCache
+
+logger = logging.getLogger(__name__)
+
+# 所有 queue 都沒有記錄時 worker 最多等待的秒數；本 process 抓取到新記錄時會提早喚醒，
+# 這個間隔只影響其他 process 加入的記錄與到期的延遲重試
+IDLE_WAIT_SECONDS = 5
+# 輸出處理統計的間隔
+STATS_INTERVAL_SECONDS = 300
+
+
+def create_redis_client(
+    redis_url: str,
+    max_connections: int = env_int("REDIS_MAX_CONNECTIONS", 32),
+    timeout: float = env_float("REDIS_POOL_TIMEOUT", 20),
+) -> redis.Redis:
+    """
+    建立所有元件共用的 Redis 客戶端（同一個連線池）
+
+    Args:
+        redis_url: Redis 連線 URL
+        max_connections: 連線池上限；連線都在使用中時等待而不是拋出例外
+        timeout: 等待可用連線的秒數
+    """
+    pool = redis.BlockingConnectionPool.from_url(redis_url, max_connections=max_connections, timeout=timeout)
+    return redis.Redis(connection_pool=pool)
+
+
+class PipelineComponents(NamedTuple):
+    """一種資源建立好的 queue 與排程器"""
+
+    pipeline: ResourcePipeline
+    queue_processor: MessageQueueProcessor
+    scheduler: Scheduler
+
+
+def build_pipeline_components(
+    pipeline: ResourcePipeline,
+    redis_client: redis.Redis,
+    tracker: ProcessedRecordTracker,
+    validator: OllamaClient,
+    gf_api_client: GfApiClient,
+    google_sheet_handler: GoogleSheetHandler,
+    sheet_writer: BufferedSheetWriter,
+    worker_count: int = DEFAULT_WORKER_COUNT,
+) -> PipelineComponents:
+    """
+    依 pipeline 設定建立處理元件，所有元件共用同一個 Redis 客戶端
+
+    Args:
+        worker_count: Runtime 的 worker 數（所有 queue 共用同一組 worker thread）
+    """
+    record_processor = RecordProcessor(
+        validator=validator,
+        gf_api_client=gf_api_client,
+        google_sheet_handler=google_sheet_handler,
+        tracker=tracker,
+        resource_type=pipeline.resource_type,
+        verdict_cache=VerdictCache(
+            redis_client,
+            resource_type=pipeline.resource_type,
+            model=validator.ollama_model,
+            system_prompt=validator.get_system_prompt(pipeline.resource_type),
+        ),
+        pre_filter=RuleBasedPreFilter(),
+        sheet_writer=sheet_writer,
+    )
+
+    queue_processor = MessageQueueProcessor(
+        record_processor=record_processor,
+        queue_name=pipeline.queue_name,
+        redis_client=redis_client,
+        worker_count=worker_count,
+        model_class=pipeline.model_class,
+    )
+
+    fetcher = RecordFetcher(
+        tracker=tracker,
+        queue_checker=queue_processor.get_queued_ids,
+        resource_type=pipeline.resource_type,
+    )
+
+    scheduler = Scheduler(
+        fetcher=fetcher,
+        gf_api_client=gf_api_client,
+        redis_client=redis_client,
+        add_to_queue_func=queue_processor.add_to_queue,
+        pipeline=pipeline,
+    )
+
+    return PipelineComponents(pipeline, queue_processor, scheduler)
+
+
+class Runtime:
+    """
+    執行所有資源 pipeline：
+
+    - 一個定時任務 thread 依到期時間執行各資源的抓取，等待時阻塞在 Event 上，停止時立即醒來
+    - 一組 worker thread 輪流處理所有 queue，新增資源類型不會增加 thread 或 Redis 連線
+    - 有 stream_consumer 時以一個 thread 讀取 api-server 的異動事件，定時抓取只作為補漏
+    - 收到 SIGTERM / SIGINT 時停止抓取，等 worker 處理完手上的記錄、Sheet 寫入完成後才結束
+    """
+
+    def __init__(
+        self,
+        components: list[PipelineComponents],
+        sheet_writer: BufferedSheetWriter,
+        fetch_interval: float = env_float("FETCH_INTERVAL", 60),
+        fetch_limit: int = env_int("FETCH_LIMIT", 50),
+        drain_timeout: float = env_float("QUEUE_DRAIN_TIMEOUT", 60),
+        stream_consumer: StreamConsumer | None = None,
+    ):
+        """
+        Args:
+            components: 各資源的處理元件
+            sheet_writer: 背景批次寫入 Google Sheet，worker 停止後才停止
+            fetch_interval: 各資源定時抓取的間隔秒數
+            fetch_limit: 增量同步每頁筆數
+            drain_timeout: 停止時等待 worker 處理完手上記錄的秒數
+            stream_consumer: 讀取 api-server 異動事件的 consumer；None 時只靠定時抓取
+        """
+        self.components = components
+        self.sheet_writer = sheet_writer
+        self.fetch_limit = fetch_limit
+        self.drain_timeout = drain_timeout
+        self.stream_consumer = stream_consumer
+        self.worker_count = max(len(c.queue_processor.worker_ids) for c in components)
+        self._stopping = threading.Event()
+        self._work_available = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        # (到期時間, 序號, 名稱, 間隔, 函數)；序號讓同時到期的任務依加入順序執行
+        self._tasks: list[tuple[float, int, str, float, Callable[[], None]]] = []
+        self._sequence = itertools.count()
+
+        for c in components:
+            self.every(fetch_interval, partial(self._fetch, c), f"fetch:{c.pipeline.resource_type}")
+        self.every(STATS_INTERVAL_SECONDS, self.log_stats, "stats", run_now=False)
+
+    @property
+    def queue_processors(self) -> list[MessageQueueProcessor]:
+        return [c.queue_processor for c in self.components]
+
+    def every(self, interval: float, func: Callable[[], None], name: str, run_now: bool = True):
+        """加入定時任務；run_now 為 True 時啟動後立即執行一次。須在 start() 之前呼叫"""
+        first_run = time.monotonic() + (0 if run_now else interval)
+        heapq.heappush(self._tasks, (first_run, next(self._sequence), name, interval, func))
+
+    def _fetch(self, components: PipelineComponents):
+        components.scheduler.scheduled_fetch(limit=self.fetch_limit)
+        self._wake_workers()
+
+    def _run_tasks(self):
+        """定時任務 thread：依到期時間依序執行，同一時間只會執行一個任務"""
+        while self._tasks:
+            due, _, name, interval, func = self._tasks[0]
+            if self._stopping.wait(max(due - time.monotonic(), 0)):
+                return
+            heapq.heappop(self._tasks)
+            try:
+                func()
+            except Exception as e:
+                logger.error(f"定時任務 {name} 失敗: {e}", exc_info=True)
+            # 從執行完成時開始計算下一次，執行時間超過間隔時不會連續補跑
+            heapq.heappush(self._tasks, (time.monotonic() + interval, next(self._sequence), name, interval, func))
+
+    def _consume_stream(self):
+        """事件 thread：每加入一批記錄就喚醒 worker"""
+        try:
+            self.stream_consumer.run(self._stopping.is_set, on_batch=self._wake_workers)
+        except Exception as e:
+            # 事件 stream 無法使用時繼續以定時抓取運作
+            logger.error(f"事件 stream consumer 結束，改由定時抓取補上: {e}", exc_info=True)
+
+    def _wake_workers(self):
+        with self._work_available:
+            self._work_available.notify_all()
+
+    def _work(self, index: int):
+        """worker thread：每輪從每個 queue 各取一批處理，所有 queue 都沒有記錄時等待新記錄"""
+        assignments = [
+            (processor, processor.worker_ids[index])
+            for processor in self.queue_processors
+            if index < len(processor.worker_ids)
+        ]
+        for processor, worker_id in assignments:
+            try:
+                processor.prepare_worker(worker_id)
+            except Exception as e:
+                logger.error(f"worker {worker_id} 放回未完成記錄失敗: {e}")
+
+        while not self._stopping.is_set():
+            worked = False
+            for processor, worker_id in assignments:
+                if self._stopping.is_set():
+                    break
+                worked = processor.process_next(worker_id) or worked
+            if not worked:
+                with self._work_available:
+                    if not self._stopping.is_set():
+                        self._work_available.wait(IDLE_WAIT_SECONDS)
+
+        for processor, worker_id in assignments:
+            try:
+                processor.release_worker(worker_id)
+            except Exception as e:
+                logger.error(f"worker {worker_id} 釋放租約失敗: {e}")
+
+    def log_stats(self):
+        """輸出各 queue 與 worker 的處理統計"""
+        for processor in self.queue_processors:
+            try:
+                logger.info(f"統計: {processor.get_stats()}")
+            except Exception as e:
+                logger.error(f"取得統計資訊失敗: {e}")
+        logger.info(f"Google Sheets 寫入統計: {self.sheet_writer.get_stats()}")
+
+    def start(self):
+        if self._threads:
+            logger.warning("Runtime 已在運行中")
+            return
+
+        for processor in self.queue_processors:
+            processor.prepare()
+        self.sheet_writer.start()
+
+        self._threads = [threading.Thread(target=self._run_tasks, name="scheduler", daemon=True)]
+        if self.stream_consumer is not None:
+            self._threads.append(threading.Thread(target=self._consume_stream, name="stream-consumer", daemon=True))
+        self._threads += [
+            threading.Thread(target=self._work, args=(i,), name=f"worker-{i}", daemon=True)
+            for i in range(self.worker_count)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(
+            f"Runtime 已啟動：{len(self.components)} 個 pipeline "
+            f"（{', '.join(c.pipeline.resource_type for c in self.components)}），{self.worker_count} 個 worker，"
+            f"事件 stream {'已啟用' if self.stream_consumer is not None else '未啟用'}"
+        )
+
+    def request_stop(self):
+        """要求停止；可在任何 thread（包含 signal handler）中呼叫"""
+        self._stopping.set()
+        self._wake_workers()
+
+    def stop(self):
+        """停止抓取，等 worker 處理完手上的記錄（最多 drain_timeout 秒），最後寫入剩餘的 Sheet 資料"""
+        self.request_stop()
+        deadline = time.monotonic() + self.drain_timeout
+        for thread in self._threads:
+            thread.join(timeout=max(deadline - time.monotonic(), 0))
+        unfinished = [thread.name for thread in self._threads if thread.is_alive()]
+        if unfinished:
+            # 未完成的記錄留在 processing list，租約過期後由其他 worker 放回 queue
+            logger.warning(f"未在 {self.drain_timeout} 秒內結束: {unfinished}")
+        self._threads = []
+        # worker 停止後再寫入剩餘的資料，寫入完成的記錄才會 ack
+        self.sheet_writer.stop()
+        # worker 結束時還在等待寫入的記錄已 ack，釋放其租約
+        for processor in self.queue_processors:
+            for worker_id in processor.worker_ids:
+                try:
+                    processor.release_worker(worker_id)
+                except Exception as e:
+                    logger.error(f"worker {worker_id} 釋放租約失敗: {e}")
+        logger.info("Runtime 已停止")
+
+    def _handle_signal(self, signum, frame):
+        logger.info(f"收到 {signal.Signals(signum).name}，停止抓取並等待處理中的記錄完成（再送一次信號立即結束）")
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        self.request_stop()
+
+    def run_forever(self):
+        """在主 thread 執行，直到收到 SIGTERM / SIGINT"""
+        signal.signal(signal.SIGINT, self._handle_signal)
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        self.start()
+        try:
+            self._stopping.wait()
+        finally:
+            self.stop()
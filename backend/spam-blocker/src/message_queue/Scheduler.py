@@ -4,11 +4,16 @@ from typing import Callable
 
 import redis
 
-from lib import GfApiClient
+from lib import GfApiClient, env_int
 from wokers import RecordFetcher
 
+from .Pipelines import ResourcePipeline
+
 logger = logging.getLogger(__name__)
 
+# 首次回補並行抓取分頁時，每頁往前多讀的筆數（見 GfApiClient.iter_resource_pages）
+BACKFILL_PAGE_OVERLAP = 10
+
 
 class Scheduler:
     """排程器 - 協調資料抓取和 Queue 管理"""
@@ -19,64 +24,182 @@ class Scheduler:
         gf_api_client: GfApiClient,
         redis_client: redis.Redis,
         add_to_queue_func: Callable,
-        resource_type: str,
+        pipeline: ResourcePipeline,
+        max_pages_per_run: int = env_int("SYNC_MAX_PAGES_PER_RUN", 20),
     ):
         """
         Args:
             fetcher: 資料抓取器
             gf_api_client: GF API 客戶端
             redis_client: Redis 客戶端
-            add_to_queue_func: 將記錄加入 queue 的函數
-            resource_type: 資源類型 (human_resource 或 supplies)
+            add_to_queue_func: 將記錄加入 queue 的函數，回傳實際加入的 ID 集合
+            pipeline: 資源的 API 端點、model 與查詢參數
+            max_pages_per_run: 一般模式下每次最多抓取的頁數，剩下的下一次從 watermark 接續
         """
         self.fetcher = fetcher
         self.gf_api_client = gf_api_client
         self.redis = redis_client
         self.add_to_queue = add_to_queue_func
-        self.resource_type = resource_type
-        self.all_records_loaded_key = f"spam_blocker:all_records_loaded:{resource_type}"
-
-    def is_all_records_loaded(self) -> bool:
-        """檢查是否已載入所有記錄"""
-        return self.redis.exists(self.all_records_loaded_key) > 0
-
-    def mark_all_records_loaded(self):
-        """標記已載入所有記錄"""
-        self.redis.set(self.all_records_loaded_key, "1")
-        logger.info(f"已標記 {self.resource_type} 所有記錄載入完成")
-
-    def scheduled_fetch(self, limit: int = 10, offset: int = 0):
-        """定時抓取任務"""
-        if not self.is_all_records_loaded():
-            logger.info(f"[定時任務 - {self.resource_type}] 首次執行，開始載入所有記錄...")
-
-            if self.resource_type == "human_resource":
-                get_method = partial(self.gf_api_client.get_all_human_resources, status="active")
-            else:
-                get_method = partial(self.gf_api_client.get_all_supplies, embed="all")
-
-            new_records = self.fetcher.fetch_all_records(get_method)
-
-            if new_records:
-                self.add_to_queue(new_records)
-                logger.info(f"[定時任務 - {self.resource_type}] 已將 {len(new_records)} 筆資料加入 Redis queue")
-                self.mark_all_records_loaded()
-            else:
-                logger.warning(
-                    f"[定時任務 - {self.resource_type}] 沒有載入到任何新資料（可能全被過濾或 API 異常），保持未完成狀態以便重試"
+        self.pipeline = pipeline
+        self.resource_type = pipeline.resource_type
+        self.max_pages_per_run = max_pages_per_run
+        # watermark：下一次要帶入的 updated_since 與 offset（只有整頁都在同一秒時 offset 才不為 0）
+        self.watermark_key = f"spam_blocker:watermark:{self.resource_type}"
+
+    def get_watermark(self) -> tuple[int, int] | None:
+        """取得 (updated_since, offset)；尚未同步過時回傳 None"""
+        raw = self.redis.hgetall(self.watermark_key)
+        if not raw:
+            return None
+        return int(raw[b"updated_since"]), int(raw[b"offset"])
+
+    def save_watermark(self, updated_since: int, offset: int):
+        """每讀完一頁就寫入，中斷後從這裡接續"""
+        self.redis.hset(self.watermark_key, mapping={"updated_since": updated_since, "offset": offset})
+
+    def reset_watermark(self):
+        """清除 watermark，下一次從頭回補；內容未變的記錄不會重新送驗"""
+        self.redis.delete(self.watermark_key)
+        logger.info(f"已清除 {self.resource_type} 的 watermark")
+
+    def _get_page_method(self, updated_since: int, limit: int, offset: int) -> Callable:
+        return partial(
+            self.gf_api_client.get_resources,
+            self.pipeline.endpoint,
+            self.pipeline.model_class,
+            limit=limit,
+            offset=offset,
+            updated_since=updated_since,
+            **self.pipeline.query,
+        )
+
+    def _iter_all_pages(self, limit: int):
+        """依 (updated_at, id) 排序並行抓取所有分頁"""
+        return self.gf_api_client.iter_resource_pages(
+            self.pipeline.endpoint,
+            self.pipeline.model_class,
+            batch_size=limit,
+            overlap=BACKFILL_PAGE_OVERLAP,
+            updated_since=0,
+            **self.pipeline.query,
+        )
+
+    def _get_latest_updated_at(self) -> int | None:
+        return self.gf_api_client.get_latest_updated_at(self.pipeline.endpoint, **self.pipeline.query)
+
+    def _get_by_ids_method(self, record_ids: list[str]) -> Callable:
+        # 指定 ids 時 API 會忽略篩選條件，由 get_resources_by_ids 在客戶端重新套用 pipeline.query 中的篩選
+        return partial(
+            self.gf_api_client.get_resources_by_ids,
+            self.pipeline.endpoint,
+            self.pipeline.model_class,
+            record_ids,
+            **self.pipeline.query,
+        )
+
+    def _enqueue(self, records: list):
+        """加入 queue 並記錄內容雜湊；只記錄實際加入的，沒加入的下次還會再被選出"""
+        if not records:
+            return
+        added_ids = self.add_to_queue(records) or set()
+        self.fetcher.remember_digests([record for record in records if record.id in added_ids])
+        logger.info(f"[定時任務 - {self.resource_type}] 已將 {len(added_ids)} 筆資料加入 Redis queue")
+
+    def _recheck_edited_in_queue(self):
+        """在 queue 中等待時被修改的記錄，離開 queue 後以最新內容重新檢查"""
+        record_ids = self.fetcher.pop_recheck_ids()
+        if not record_ids:
+            return
+        try:
+            _, changed = self.fetcher.fetch_changed_records(self._get_by_ids_method(record_ids))
+        except Exception as e:
+            logger.error(f"[定時任務 - {self.resource_type}] 重新檢查修改過的記錄失敗: {e}")
+            self.redis.sadd(self.fetcher.recheck_key, *record_ids)
+            return
+        self._enqueue(changed)
+
+    def ingest_ids(self, record_ids: list[str]):
+        """
+        event stream 通知的記錄：以 ids 取得最新內容，內容未變、已在 queue 中的會被過濾
+
+        API 錯誤時拋出例外，由呼叫端保留事件稍後重試
+        """
+        if not record_ids:
+            return
+        _, changed = self.fetcher.fetch_changed_records(self._get_by_ids_method(record_ids))
+        self._enqueue(changed)
+
+    def scheduled_fetch(self, limit: int = 10, backfill: bool = False):
+        """
+        定時抓取任務：從 watermark 開始依 updated_at 由舊到新逐頁抓取
+
+        - 尚未有 watermark（首次執行）時以 initial_backfill 並行抓取所有分頁
+        - backfill=True 時從 watermark 一路抓到追上最新資料為止
+        - 一般模式每次最多抓 max_pages_per_run 頁，沒抓完的下一次從 watermark 接續，不會漏掉
+        - 每讀完一頁才推進 watermark；API 或 Redis 發生錯誤時停在原處，下一次重試
+        """
+        watermark = self.get_watermark()
+        if watermark is None:
+            self.initial_backfill(limit)
+            return
+        updated_since, offset = watermark
+
+        self._recheck_edited_in_queue()
+
+        pages = 0
+        fetched = 0
+        while backfill or pages < self.max_pages_per_run:
+            try:
+                records, changed = self.fetcher.fetch_changed_records(
+                    self._get_page_method(updated_since, limit, offset)
                 )
+                self._enqueue(changed)
+            except Exception as e:
+                logger.error(f"[定時任務 - {self.resource_type}] 抓取資料錯誤，停在 watermark {updated_since}: {e}")
+                return
+
+            pages += 1
+            fetched += len(records)
+            if records:
+                # 下一頁從最後一秒重新讀起（包含該秒已讀過的記錄，內容未變會被過濾），
+                # 讀的期間被修改而移到後面的記錄不會因 offset 位移而漏掉；
+                # 只有整頁都在同一秒時才以 offset 往後翻
+                last_updated_at = max(record.updated_at or 0 for record in records)
+                if last_updated_at == updated_since:
+                    offset += len(records)
+                else:
+                    updated_since, offset = last_updated_at, 0
+                self.save_watermark(updated_since, offset)
+
+            if len(records) < limit:
+                break
+
+        if fetched:
+            logger.info(
+                f"[定時任務 - {self.resource_type}] 共檢查 {fetched} 筆（{pages} 頁），watermark: {updated_since}"
+            )
         else:
-            logger.info(f"[定時任務 - {self.resource_type}] 開始抓取最新 {limit} 筆資料...")
+            logger.info(f"[定時任務 - {self.resource_type}] 沒有新資料")
 
-            if self.resource_type == "human_resource":
-                get_method = partial(self.gf_api_client.get_human_resource, limit=limit, offset=offset, status="active")
-            elif self.resource_type == "supplies":
-                get_method = partial(self.gf_api_client.get_supplies, limit=limit, offset=offset, embed="all")
+    def initial_backfill(self, limit: int):
+        """
+        首次執行：並行抓取所有分頁，每收到一頁就過濾並加入 queue
 
-            new_records = self.fetcher.fetch_new_records(get_method)
+        回補前先記下目前最新一筆的 updated_at 作為之後的 watermark；回補期間被修改的記錄
+        updated_at 都不小於它，會在下一次增量同步時再讀到。
+        """
+        logger.info(f"[定時任務 - {self.resource_type}] 尚未有 watermark，開始回補所有記錄...")
+        try:
+            latest_updated_at = self._get_latest_updated_at()
+            fetched = 0
+            for page in self._iter_all_pages(limit):
+                fetched += len(page)
+                self._enqueue(self.fetcher.filter_changed_records(page))
+        except Exception as e:
+            logger.error(f"[定時任務 - {self.resource_type}] 回補失敗，下一次重新回補: {e}")
+            return
 
-            if new_records:
-                self.add_to_queue(new_records)
-                logger.info(f"[定時任務 - {self.resource_type}] 已將 {len(new_records)} 筆資料加入 Redis queue")
-            else:
-                logger.info(f"[定時任務 - {self.resource_type}] 沒有新資料")
+        self.save_watermark(latest_updated_at or 0, 0)
+        logger.info(
+            f"[定時任務 - {self.resource_type}] 回補完成，共檢查 {fetched} 筆，watermark: {latest_updated_at or 0}"
+        )
@@ -0,0 +1,177 @@
+import logging
+import os
+import socket
+import time
+from collections import defaultdict
+from typing import Callable
+
+import redis
+
+from lib import METRICS, env_float, env_int, env_str
+
+from .Scheduler import Scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class StreamConsumer:
+    """
+    以 consumer group 讀取 api-server 送出的異動事件（Redis Stream），把異動的記錄加入對應的 queue
+
+    - 事件只有 type / id / op，內容一律以 ids 向 GF API 取得最新版本，再經過與定時抓取相同的去重與內容比對
+    - 同一個 group 的多個 process（可在不同主機）分攤事件，每個事件只會送給其中一個
+    - 加入 queue 後才 XACK；失敗的事件留在 pending list，超過 claim_idle 秒後由任一 consumer 以 XAUTOCLAIM 接手重試
+    - 事件遺失（api-server 送出失敗、stream 被截斷）時由定時抓取補上
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        schedulers: dict[str, Scheduler],
+        stream_key: str = env_str("EVENT_STREAM_KEY", "spam_check_events"),
+        group: str = env_str("EVENT_STREAM_GROUP", "spam-blocker"),
+        consumer: str | None = None,
+        batch_size: int = env_int("EVENT_STREAM_BATCH_SIZE", 100),
+        block_ms: int = 5000,
+        claim_idle: float = env_float("EVENT_STREAM_CLAIM_IDLE", 60),
+    ):
+        """
+        Args:
+            redis_client: api-server 送出事件的 Redis（可以和 spam-blocker 自己的 Redis 不同）
+            schedulers: 事件的 type（API 端點名稱）對應的排程器
+            stream_key: stream 的 key，須與 api-server 的 SPAM_CHECK_STREAM 相同
+            group: consumer group 名稱，同一組 spam-blocker 須使用相同名稱
+            consumer: 本 process 在 group 中的名稱，預設為 主機名稱-pid
+            batch_size: 每次讀取的事件數
+            block_ms: 沒有新事件時 XREADGROUP 阻塞的毫秒數，也是停止時最久的等待時間
+            claim_idle: pending 事件閒置多久（秒）後由其他 consumer 接手
+        """
+        self.redis = redis_client
+        self.schedulers = schedulers
+        self.stream_key = stream_key
+        self.group = group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle = claim_idle
+        self._next_claim = 0.0
+
+    def ensure_group(self):
+        """建立 consumer group；group 已存在時略過。新 group 只讀取建立之後的事件，之前的由定時抓取補上"""
+        try:
+            self.redis.xgroup_create(self.stream_key, self.group, id="$", mkstream=True)
+            logger.info(f"已建立 consumer group {self.group}（stream: {self.stream_key}）")
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _claim_stale(self) -> list:
+        """接手閒置超過 claim_idle 秒的 pending 事件（包含自己先前處理失敗的）"""
+        now = time.monotonic()
+        if now < self._next_claim:
+            return []
+        self._next_claim = now + self.claim_idle
+        entries = []
+        start_id = "0-0"
+        while True:
+            response = self.redis.xautoclaim(
+                self.stream_key,
+                self.group,
+                self.consumer,
+                min_idle_time=int(self.claim_idle * 1000),
+                start_id=start_id,
+                count=self.batch_size,
+            )
+            start_id, claimed = response[0], response[1]
+            entries.extend(entry for entry in claimed if entry[1])
+            if start_id in (b"0-0", "0-0") or len(entries) >= self.batch_size:
+                return entries
+
+    def _read_new(self) -> list:
+        response = self.redis.xreadgroup(
+            self.group, self.consumer, {self.stream_key: ">"}, count=self.batch_size, block=self.block_ms
+        )
+        return response[0][1] if response else []
+
+    def handle(self, entries: list) -> int:
+        """
+        依 type 分組，以 ids 取得並加入 queue，成功的事件 XACK
+
+        Returns:
+            已 ack 的事件數
+        """
+        ids_by_type: dict[str, dict[str, list]] = defaultdict(lambda: defaultdict(list))
+        unknown = []
+        for entry_id, fields in entries:
+            fields = {_decode(k): _decode(v) for k, v in fields.items()}
+            resource_type, record_id = fields.get("type"), fields.get("id")
+            if resource_type not in self.schedulers or not record_id:
+                unknown.append(entry_id)
+                continue
+            ids_by_type[resource_type][record_id].append(entry_id)
+
+        acked = []
+        if unknown:
+            # 無法處理的事件重試也不會成功，直接 ack
+            logger.warning(f"略過 {len(unknown)} 筆無法辨識的事件")
+            METRICS.stream_events.labels(resource_type="unknown", outcome="skipped").inc(len(unknown))
+            acked += unknown
+
+        for resource_type, entry_ids_by_record in ids_by_type.items():
+            scheduler = self.schedulers[resource_type]
+            entry_ids = [entry_id for ids in entry_ids_by_record.values() for entry_id in ids]
+            try:
+                scheduler.ingest_ids(list(entry_ids_by_record))
+            except Exception as e:
+                logger.error(
+                    f"[事件 - {scheduler.resource_type}] 處理 {len(entry_ids)} 筆事件失敗，"
+                    f"{self.claim_idle:g} 秒後重試: {e}"
+                )
+                METRICS.stream_events.labels(resource_type=scheduler.resource_type, outcome="failed").inc(
+                    len(entry_ids)
+                )
+                continue
+            METRICS.stream_events.labels(resource_type=scheduler.resource_type, outcome="ingested").inc(len(entry_ids))
+            acked += entry_ids
+
+        if acked:
+            self.redis.xack(self.stream_key, self.group, *acked)
+        return len(acked)
+
+    def poll(self) -> int:
+        """讀取一批事件（先接手閒置的 pending 事件，再讀新事件）並處理；回傳已 ack 的事件數"""
+        entries = self._claim_stale() or self._read_new()
+        if not entries:
+            return 0
+        return self.handle(entries)
+
+    def run(self, should_stop: Callable[[], bool], on_batch: Callable[[], None] = lambda: None):
+        """
+        持續讀取直到 should_stop() 為 True；每處理完一批呼叫 on_batch
+
+        Redis 錯誤時等待後重試，停止時處理中的事件未 ack，由其他 consumer 接手
+        """
+        self.ensure_group()
+        logger.info(f"開始讀取事件 stream {self.stream_key}（group: {self.group}, consumer: {self.consumer}）")
+        while not should_stop():
+            started = time.monotonic()
+            try:
+                if self.poll():
+                    on_batch()
+                else:
+                    # 沒有事件或處理失敗：補足阻塞時間，伺服器不支援 BLOCK 立即返回時不會空轉
+                    time.sleep(max(self.block_ms / 1000 - (time.monotonic() - started), 0))
+            except redis.ResponseError as e:
+                if "NOGROUP" in str(e):
+                    # stream 被刪除後重新建立 group
+                    self.ensure_group()
+                    continue
+                logger.error(f"讀取事件 stream 失敗: {e}")
+                time.sleep(self.block_ms / 1000)
+            except redis.RedisError as e:
+                logger.error(f"讀取事件 stream 失敗: {e}")
+                time.sleep(self.block_ms / 1000)
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from typing import Any
+
+import redis
+
+from lib import HumanResource, Supplies, ValidationResult, env_int
+
+logger = logging.getLogger(__name__)
+
+# 寫入快取並維持大小上限：以 zset 記錄寫入時間，移除過期與超出上限的最舊項目
+# KEYS[1]: index zset；ARGV: now, ttl, max_entries, key1, value1, key2, value2, ...
+PUT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+for i = 4, #ARGV, 2 do
+    redis.call("SET", ARGV[i], ARGV[i + 1], "EX", ttl)
+    redis.call("ZADD", KEYS[1], now, ARGV[i])
+end
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", now - ttl)
+local excess = redis.call("ZCARD", KEYS[1]) - tonumber(ARGV[3])
+if excess > 0 then
+    local oldest = redis.call("ZRANGE", KEYS[1], 0, excess - 1)
+    redis.call("DEL", unpack(oldest))
+    redis.call("ZREM", KEYS[1], unpack(oldest))
+end
+return excess
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+_INVISIBLE = re.compile("[\u200b-\u200f\u2060\ufeff]")
+
+
+def _normalize(value: Any) -> Any:
+    """全半形、大小寫、空白與零寬字元的差異不影響判斷結果"""
+    if isinstance(value, str):
+        value = unicodedata.normalize("NFKC", value)
+        value = _INVISIBLE.sub("", value)
+        return _WHITESPACE.sub(" ", value).strip().lower()
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        # 物資項目的順序不影響判斷結果
+        return sorted((_normalize(item) for item in value), key=lambda item: json.dumps(item, ensure_ascii=False))
+    return value
+
+
+def content_digest(record: HumanResource | Supplies) -> str:
+    """以 prompt 會看到的欄位（不含 id）計算正規化後的內容雜湊"""
+    content = _normalize(record.model_dump(exclude={"id"}))
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class VerdictCache:
+    """以內容雜湊快取 LLM 判斷結果，內容相同（或僅有細微差異）的記錄不需要再次推論"""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        resource_type: str,
+        model: str,
+        system_prompt: str,
+        ttl: int = env_int("VERDICT_CACHE_TTL", 7 * 24 * 60 * 60),
+        max_entries: int = env_int("VERDICT_CACHE_MAX_ENTRIES", 50000),
+    ):
+        """
+        Args:
+            redis_client: Redis 客戶端
+            resource_type: 資源類型 (human_resource 或 supplies)
+            model: LLM 模型名稱，換模型後舊結果不再命中
+            system_prompt: 該資源類型的 system prompt，修改 prompt 後舊結果不再命中
+            ttl: 快取保存秒數
+            max_entries: 快取筆數上限，超過時移除最舊的項目
+        """
+        self.redis = redis_client
+        self.resource_type = resource_type
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prompt_version = hashlib.sha256(f"{model}\n{system_prompt}".encode("utf-8")).hexdigest()[:12]
+        self.key_prefix = f"verdict_cache:{resource_type}:{self.prompt_version}:"
+        self.index_key = f"verdict_cache:{resource_type}:index"
+        self.stats_key = f"verdict_cache:{resource_type}:stats"
+        self._put = self.redis.register_script(PUT_SCRIPT)
+        # 未命中時 LLM 每筆平均耗時（指數移動平均），用來估算命中省下的時間
+        self._avg_llm_seconds: float | None = None
+        self._lock = threading.Lock()
+
+    def key_for(self, record: HumanResource | Supplies) -> str:
+        """以 prompt 會看到的欄位（不含 id）計算快取 key"""
+        return self.key_prefix + content_digest(record)
+
+    def get_many(self, records: list[HumanResource | Supplies]) -> dict[str, ValidationResult]:
+        """查詢快取，回傳命中的 {record_id: ValidationResult}；命中與未命中數一併記錄"""
+        if not records:
+            return {}
+
+        values = self.redis.mget([self.key_for(record) for record in records])
+        results = {}
+        for record, value in zip(records, values):
+            if value is None:
+                continue
+            try:
+                results[record.id] = ValidationResult.model_validate_json(value)
+            except ValueError:
+                continue
+
+        hits = len(results)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hincrby(self.stats_key, "hits", hits)
+        pipe.hincrby(self.stats_key, "misses", len(records) - hits)
+        if hits and self._avg_llm_seconds is not None:
+            pipe.hincrbyfloat(self.stats_key, "saved_seconds", hits * self._avg_llm_seconds)
+        pipe.execute()
+
+        if hits:
+            logger.info(f"verdict cache 命中 {hits}/{len(records)} 筆")
+        return results
+
+    def put_many(
+        self, results: dict[str, ValidationResult], records: list[HumanResource | Supplies], llm_seconds: float
+    ):
+        """
+        寫入 LLM 的判斷結果
+
+        Args:
+            results: {record_id: ValidationResult}
+            records: 送去 LLM 驗證的記錄
+            llm_seconds: 這批 LLM 驗證花費的時間
+        """
+        entries = [
+            value
+            for record in records
+            if record.id in results
+            for value in (self.key_for(record), results[record.id].model_dump_json())
+        ]
+        if not entries:
+            return
+
+        with self._lock:
+            per_record = llm_seconds / len(records)
+            self._avg_llm_seconds = (
+                per_record if self._avg_llm_seconds is None else 0.9 * self._avg_llm_seconds + 0.1 * per_record
+            )
+
+        try:
+            self._put(keys=[self.index_key], args=[time.time(), self.ttl, self.max_entries, *entries])
+        except redis.RedisError as e:
+            logger.error(f"寫入 verdict cache 失敗: {e}")
+
+    def get_stats(self) -> dict:
+        """取得命中率與估計省下的 LLM 時間"""
+        raw = {key.decode("utf-8"): float(value) for key, value in self.redis.hgetall(self.stats_key).items()}
+        hits, misses = int(raw.get("hits", 0)), int(raw.get("misses", 0))
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+            "saved_seconds": round(raw.get("saved_seconds", 0.0), 1),
+            "entries": self.redis.zcard(self.index_key),
+        }
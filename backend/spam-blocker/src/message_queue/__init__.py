@@ -1,9 +1,27 @@
 from .MessageQueueProcessor import MessageQueueProcessor
+from .Pipelines import RESOURCE_PIPELINES, ResourcePipeline
 from .ProcessedRecordTracker import ProcessedRecordTracker
+from .Runtime import (
+    PipelineComponents,
+    Runtime,
+    build_pipeline_components,
+    create_redis_client,
+)
 from .Scheduler import Scheduler
+from .StreamConsumer import StreamConsumer
+from .VerdictCache import VerdictCache, content_digest
 
 __all__ = [
     "MessageQueueProcessor",
+    "PipelineComponents",
     "ProcessedRecordTracker",
+    "RESOURCE_PIPELINES",
+    "ResourcePipeline",
+    "Runtime",
     "Scheduler",
+    "StreamConsumer",
+    "VerdictCache",
+    "build_pipeline_components",
+    "content_digest",
+    "create_redis_client",
 ]
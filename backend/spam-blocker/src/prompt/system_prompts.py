@@ -43,3 +43,12 @@ validate_supplies_prompt = """
 - 除了 json 不要輸出任何其他說明
 </TASK>
 """
+
+# 批次模式：附加在上方 prompt 之後，一次請求判斷多筆資料
+batch_validation_prompt = """
+<BATCH>
+- 這次輸入是一個 JSON 陣列，每個元素是一筆獨立的資料，請逐筆分別判斷，不要互相影響
+- 輸出 results 陣列，每筆資料各一個元素，並以該筆資料的 id 填入 id 欄位
+- 不可遺漏任何一筆，也不要輸出輸入中不存在的 id
+</BATCH>
+"""
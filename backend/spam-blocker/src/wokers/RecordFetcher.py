@@ -1,113 +1,171 @@
 import logging
+import time
 
 from lib import HumanResource, Supplies
 from message_queue import ProcessedRecordTracker
+from message_queue.VerdictCache import content_digest
 
 logger = logging.getLogger(__name__)
 
+# 寫入內容雜湊，並移除超過保留期限的項目（和已處理記錄使用相同的保留期限）
+# KEYS[1]: 雜湊 hash；KEYS[2]: 寫入時間 zset；ARGV: now, cutoff, trim_limit, id1, digest1, id2, digest2, ...
+REMEMBER_SCRIPT = """
+local now = tonumber(ARGV[1])
+for i = 4, #ARGV, 2 do
+    redis.call("HSET", KEYS[1], ARGV[i], ARGV[i + 1])
+    redis.call("ZADD", KEYS[2], now, ARGV[i])
+end
+local expired = redis.call("ZRANGEBYSCORE", KEYS[2], "-inf", ARGV[2], "LIMIT", 0, tonumber(ARGV[3]))
+if #expired > 0 then
+    redis.call("HDEL", KEYS[1], unpack(expired))
+    redis.call("ZREM", KEYS[2], unpack(expired))
+end
+return #expired
+"""
+
+# 每次寫入最多移除的過期項目數，避免單次 script 執行過久
+TRIM_LIMIT = 1000
+
 
 class RecordFetcher:
     """資料抓取器 - 負責從 API 抓取資料並過濾"""
 
-    def __init__(self, tracker: ProcessedRecordTracker, queue_checker: callable):
+    def __init__(self, tracker: ProcessedRecordTracker, queue_checker: callable, resource_type: str):
         """
         Args:
             tracker: 已處理記錄追蹤器
-            queue_checker: 檢查記錄是否在 queue 中的函數
+            queue_checker: 傳入 ID 列表、回傳其中已在 queue 中 ID 集合的函數
+            resource_type: 資源類型 (human_resource 或 supplies)
         """
         self.tracker = tracker
         self.queue_checker = queue_checker
+        # 每筆記錄最後一次送驗時的內容雜湊，用來判斷驗證後是否又被修改
+        self.content_hash_key = f"spam_blocker:content_hash:{resource_type}"
+        self.content_hash_index_key = f"spam_blocker:content_hash:{resource_type}:index"
+        # 在 queue 中等待時又被修改的記錄，離開 queue 後要以最新內容重新檢查
+        self.recheck_key = f"spam_blocker:recheck:{resource_type}"
+        self._remember = self.tracker.redis.register_script(REMEMBER_SCRIPT)
 
     def _filter_records(self, records: list) -> tuple[list, int]:
-        """過濾已處理和已在 queue 中的記錄（使用 set 提升效率）"""
+        """
+        過濾已在 queue 中、以及已處理且內容未變的記錄
+
+        已處理的記錄若內容雜湊與上次送驗時不同，視為驗證後被修改，重新加入 queue。
+        """
         if not records:
             return [], 0
 
-        processed_ids = self._get_processed_ids()
-        queue_ids = self._get_queue_ids()
-
-        filtered_ids = processed_ids | queue_ids
+        record_ids = [record.id for record in records]
+        processed_ids = self._get_processed_ids(record_ids)
+        queue_ids = self._get_queue_ids(record_ids)
+        digests = {record.id: content_digest(record) for record in records}
+        known_digests = self._get_known_digests(record_ids)
 
         new_records = []
         skipped_count = 0
+        # 啟用內容雜湊前就處理過的記錄沒有雜湊可比對，先記錄目前內容，不重新驗證
+        untracked_digests = {}
+        recheck_ids = []
 
         for record in records:
             record_id = record.id
+            known = known_digests.get(record_id)
 
-            if record_id in filtered_ids:
+            if record_id in queue_ids:
                 skipped_count += 1
-                if record_id in processed_ids:
-                    logger.debug(f"記錄 {record_id} 已處理過，跳過")
+                if known is not None and known != digests[record_id]:
+                    recheck_ids.append(record_id)
+                    logger.debug(f"記錄 {record_id} 在 queue 中等待時被修改，離開 queue 後重新檢查")
                 else:
                     logger.debug(f"記錄 {record_id} 已在 queue 中，跳過")
                 continue
 
+            if record_id in processed_ids:
+                if known is None:
+                    untracked_digests[record_id] = digests[record_id]
+                    skipped_count += 1
+                    continue
+                if known == digests[record_id]:
+                    skipped_count += 1
+                    logger.debug(f"記錄 {record_id} 已處理過且內容未變，跳過")
+                    continue
+                logger.info(f"記錄 {record_id} 驗證後內容已修改，重新驗證")
+
             new_records.append(record)
 
+        if untracked_digests:
+            self._save_digests(untracked_digests)
+        if recheck_ids:
+            self.tracker.redis.sadd(self.recheck_key, *recheck_ids)
+
         return new_records, skipped_count
 
-    def _get_processed_ids(self) -> set:
-        """取得所有已處理記錄的 ID"""
+    def _get_processed_ids(self, record_ids: list[str]) -> set:
+        """取得 record_ids 中已處理的 ID（只查詢這批 ID，不取回整個集合）"""
         try:
-            raw_ids = self.tracker.redis.smembers(self.tracker.processed_set_key)
-            return {id.decode("utf-8") if isinstance(id, bytes) else id for id in raw_ids}
+            return self.tracker.get_processed_ids(record_ids)
         except Exception as e:
             logger.error(f"取得已處理記錄 ID 時發生錯誤: {e}")
             return set()
 
-    def _get_queue_ids(self) -> set:
-        """取得所有在 queue 中的記錄 ID"""
+    def _get_queue_ids(self, record_ids: list[str]) -> set:
+        """取得 record_ids 中已在 queue 內的 ID（只查詢這批 ID，不掃描整個 queue）"""
         try:
-            import json
-
-            queue_ids = set()
-
-            queue_processor = self.queue_checker.__self__
-            queue_items = queue_processor.redis.lrange(queue_processor.queue_name, 0, -1)
-
-            for item in queue_items:
-                try:
-                    if isinstance(item, bytes):
-                        item = item.decode("utf-8")
-
-                    record = json.loads(item)
-                    record_id = record.get("id")
-                    if record_id:
-                        queue_ids.add(record_id)
-                except (json.JSONDecodeError, KeyError):
-                    continue
-
-            return queue_ids
+            return self.queue_checker(record_ids)
         except Exception as e:
             logger.error(f"取得 queue 記錄 ID 時發生錯誤: {e}")
             return set()
 
-    def fetch_all_records(self, get_method: callable) -> list[HumanResource] | list[Supplies]:
-        """抓取所有資料，過濾已處理和已在 queue 中的記錄"""
-        try:
-            logger.info("開始載入所有 記錄...")
-            response = get_method()
-            logger.info(f"response: {response}")
-
-            new_records, skipped_count = self._filter_records(response)
-
+    def _get_known_digests(self, record_ids: list[str]) -> dict[str, str]:
+        """以一次 HMGET 取得這批記錄上次送驗時的內容雜湊"""
+        values = self.tracker.redis.hmget(self.content_hash_key, record_ids)
+        return {
+            record_id: value.decode("utf-8") if isinstance(value, bytes) else value
+            for record_id, value in zip(record_ids, values)
+            if value is not None
+        }
+
+    def _save_digests(self, digests: dict[str, str]):
+        now = time.time()
+        self._remember(
+            keys=[self.content_hash_key, self.content_hash_index_key],
+            args=[now, now - self.tracker.history_seconds, TRIM_LIMIT, *[v for item in digests.items() for v in item]],
+        )
+
+    def remember_digests(self, records: list[HumanResource | Supplies]):
+        """記錄已加入 queue 的記錄內容雜湊，之後內容有變才會再次送驗"""
+        if records:
+            self._save_digests({record.id: content_digest(record) for record in records})
+
+    def pop_recheck_ids(self) -> list[str]:
+        """取出已離開 queue、需要以最新內容重新檢查的記錄 ID；仍在 queue 中的留到下次"""
+        raw_ids = self.tracker.redis.smembers(self.recheck_key)
+        if not raw_ids:
+            return []
+        record_ids = [id.decode("utf-8") if isinstance(id, bytes) else id for id in raw_ids]
+        queued_ids = self._get_queue_ids(record_ids)
+        ready_ids = [record_id for record_id in record_ids if record_id not in queued_ids]
+        if ready_ids:
+            self.tracker.redis.srem(self.recheck_key, *ready_ids)
+        return ready_ids
+
+    def filter_changed_records(self, records: list) -> list:
+        """回傳 records 中需要加入 queue 的記錄（新資料，或驗證後內容被修改的資料）"""
+        new_records, skipped_count = self._filter_records(records)
+        if records:
             logger.info(
-                f"載入所有記錄完成：抓取到 {len(new_records)} 筆新資料（共檢查 {len(response)} 筆，跳過 {skipped_count} 筆）"
+                f"抓取到 {len(new_records)} 筆新資料或修改過的資料（共檢查 {len(records)} 筆，跳過 {skipped_count} 筆）"
             )
-            return new_records
-        except Exception as e:
-            logger.error(f"抓取所有資料錯誤: {e}")
-            return []
+        return new_records
 
-    def fetch_new_records(self, get_method: callable) -> list[HumanResource] | list[Supplies]:
-        """抓取最新的幾筆資料，過濾已處理和已在 queue 中的記錄"""
-        try:
-            response = get_method()
+    def fetch_changed_records(self, get_method: callable) -> tuple[list, list]:
+        """
+        抓取一頁資料，過濾已在 queue 中、以及已處理且內容未變的記錄
 
-            new_records, skipped_count = self._filter_records(response)
+        API 錯誤不在這裡吞掉，由呼叫端決定是否推進 watermark。
 
-            logger.info(f"抓取到 {len(new_records)} 筆新資料（共檢查 {len(response)} 筆，跳過 {skipped_count} 筆）")
-            return new_records
-        except Exception as e:
-            logger.error(f"抓取資料錯誤: {e}")
-            return []
+        Returns:
+            (API 回傳的記錄, 需要加入 queue 的記錄)
+        """
+        response = get_method()
+        return response, self.filter_changed_records(response)
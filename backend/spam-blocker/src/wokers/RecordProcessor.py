@@ -1,14 +1,21 @@
 import logging
+import time
+from typing import Callable
 
 from lib import (
+    METRICS,
+    BufferedSheetWriter,
     GfApiClient,
     GoogleSheetHandler,
     HumanResource,
     OllamaClient,
+    PreFilterVerdict,
+    RuleBasedPreFilter,
     Supplies,
     ValidationResult,
+    env_str,
 )
-from message_queue import ProcessedRecordTracker
+from message_queue import ProcessedRecordTracker, VerdictCache
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +30,10 @@ class RecordProcessor:
         google_sheet_handler: GoogleSheetHandler,
         tracker: ProcessedRecordTracker,
         resource_type: str,
+        verdict_cache: VerdictCache = None,
+        pre_filter: RuleBasedPreFilter = None,
+        pre_filter_mode: str = env_str("PREFILTER_MODE", "on"),
+        sheet_writer: BufferedSheetWriter = None,
     ):
         """
         Args:
@@ -31,27 +42,138 @@ class RecordProcessor:
             google_sheet_handler: Google Sheet 處理器
             tracker: 已處理記錄追蹤器
             resource_type: 資源類型 (human_resource 或 supplies)
+            verdict_cache: 判斷結果快取；內容相同的記錄直接沿用先前的結果，不呼叫 LLM
+            pre_filter: LLM 之前的規則式初篩
+            pre_filter_mode: on（明確判定的記錄不送 LLM）、shadow（只記錄判定與 LLM 是否一致）或 off
+            sheet_writer: 背景批次寫入 Google Sheet；未指定時每筆同步寫入
         """
         self.validator = validator
         self.gf_api_client = gf_api_client
         self.google_sheet_handler = google_sheet_handler
         self.tracker = tracker
         self.resource_type = resource_type
-
-    def process_record(self, record: HumanResource | Supplies) -> bool:
+        self.verdict_cache = verdict_cache
+        self.pre_filter = pre_filter if pre_filter_mode in ("on", "shadow") else None
+        self.pre_filter_mode = pre_filter_mode
+        self.sheet_writer = sheet_writer
+
+    def process_record(
+        self, record: HumanResource | Supplies, on_uploaded: Callable[[str], None] | None = None
+    ) -> bool:
         """
         處理一筆記錄：驗證 -> 上傳 -> 標記為已處理
 
+        Args:
+            on_uploaded: 寫入 Google Sheet 並標記為已處理後呼叫（傳入記錄 ID）；
+                使用 sheet_writer 時會在背景寫入完成後才呼叫
+
         Returns:
-            bool: 處理是否成功
+            bool: 處理是否成功（使用 sheet_writer 時代表已交給背景寫入）
         """
-        record_id = record.id
+        logger.info(f"開始處理記錄: {record.id}")
+        return self.process_records([record], on_uploaded)[record.id]
 
-        try:
-            logger.info(f"開始處理記錄: {record_id}")
+    def process_records(
+        self, records: list[HumanResource | Supplies], on_uploaded: Callable[[str], None] | None = None
+    ) -> dict[str, bool]:
+        """
+        批次處理：多筆記錄以一次 LLM 請求驗證，再逐筆上傳
 
-            validation_result = self.validator.get_validation_result(record, self.resource_type)
+        Returns:
+            dict[str, bool]: 各記錄 ID 是否處理成功
+        """
+        if len(records) > 1:
+            logger.info(f"開始批次處理 {len(records)} 筆記錄")
+
+        validation_results = self.validate(records)
+        return {
+            record.id: self.handle_validation_result(record, validation_results.get(record.id), on_uploaded)
+            for record in records
+        }
 
+    def validate(self, records: list[HumanResource | Supplies]) -> dict[str, ValidationResult]:
+        """
+        依序經過規則初篩、verdict cache，只把仍無法判定的記錄送給 LLM；
+        驗證失敗的記錄不會出現在回傳結果中
+        """
+        results = {}
+        shadow_decisions = {}
+        if self.pre_filter:
+            for record in records:
+                decision = self.pre_filter.classify(record)
+                if decision.verdict is PreFilterVerdict.uncertain:
+                    continue
+                if self.pre_filter_mode == "shadow":
+                    shadow_decisions[record.id] = decision
+                else:
+                    results[record.id] = ValidationResult(
+                        valid=decision.verdict is PreFilterVerdict.valid, reason=decision.reason
+                    )
+
+        self._count_verdicts(results, "prefilter")
+
+        pending = [record for record in records if record.id not in results]
+        if self.verdict_cache and pending:
+            try:
+                cached = self.verdict_cache.get_many(pending)
+            except Exception as e:
+                logger.error(f"查詢 verdict cache 失敗: {e}")
+            else:
+                results.update(cached)
+                self._count_verdicts(cached, "cache")
+
+        pending = [record for record in records if record.id not in results]
+        if not pending:
+            return results
+
+        # 同一批中內容相同的記錄只送一筆給 LLM
+        duplicates = {}
+        if self.verdict_cache:
+            representatives = {}
+            for record in pending:
+                representative = representatives.setdefault(self.verdict_cache.key_for(record), record)
+                if representative is not record:
+                    duplicates[record.id] = representative.id
+            pending = list(representatives.values())
+
+        started = time.monotonic()
+        try:
+            fresh = self.validator.get_validation_results(pending, self.resource_type)
+        except Exception as e:
+            logger.error(f"驗證 {len(pending)} 筆記錄時發生錯誤: {e}", exc_info=True)
+            fresh = {}
+
+        if self.verdict_cache and fresh:
+            self.verdict_cache.put_many(fresh, pending, time.monotonic() - started)
+
+        results.update(fresh)
+        self._count_verdicts(fresh, "llm")
+        for record_id, representative_id in duplicates.items():
+            if representative_id in fresh:
+                results[record_id] = fresh[representative_id]
+                self._count_verdicts({record_id: fresh[representative_id]}, "cache")
+
+        for record_id, decision in shadow_decisions.items():
+            if record_id in results:
+                self.pre_filter.record_agreement(decision, results[record_id].valid)
+        return results
+
+    def _count_verdicts(self, results: dict[str, ValidationResult], source: str):
+        for result in results.values():
+            METRICS.verdicts.labels(
+                resource_type=self.resource_type, verdict="valid" if result.valid else "invalid", source=source
+            ).inc()
+
+    def handle_validation_result(
+        self,
+        record: HumanResource | Supplies,
+        validation_result: ValidationResult | None,
+        on_uploaded: Callable[[str], None] | None = None,
+    ) -> bool:
+        """依驗證結果提交 SPAM 判定並上傳；回傳是否成功"""
+        record_id = record.id
+
+        try:
             if not validation_result:
                 logger.error(f"記錄 {record_id} 驗證失敗")
                 return False
@@ -64,7 +186,7 @@ class RecordProcessor:
 
             logger.info(f"validation_result: {validation_result}")
 
-            self.upload_result(record, validation_result, sheet_name)
+            self.upload_result(record, validation_result, sheet_name, on_uploaded)
 
             return True
 
@@ -82,16 +204,31 @@ class RecordProcessor:
             validation_result.reason,
         )
 
-    def upload_result(self, record: HumanResource | Supplies, validation_result, sheet_name: str) -> None:
+    def upload_result(
+        self,
+        record: HumanResource | Supplies,
+        validation_result,
+        sheet_name: str,
+        on_uploaded: Callable[[str], None] | None = None,
+    ) -> None:
         """上傳記錄到 Google Sheet 並標記為已處理"""
         record_id = record.id
 
+        def mark_processed():
+            self.tracker.mark_as_processed(record_id, valid=validation_result.valid)
+            logger.info(f"記錄 {record_id} 已標記為已處理")
+            if on_uploaded:
+                on_uploaded(record_id)
+
         try:
+            if self.sheet_writer:
+                # 寫入成功後才標記為已處理
+                self.sheet_writer.append(record, validation_result, sheet_name, on_flushed=mark_processed)
+                return
+
             self.google_sheet_handler.append_record(record, validation_result, sheet_name)
             logger.info(f"{sheet_name} {record_id} 上傳完成")
-
-            self.tracker.mark_as_processed(record_id)
-            logger.info(f"記錄 {record_id} 已標記為已處理")
+            mark_processed()
         except Exception as e:
             logger.error(f"上傳記錄 {record_id} 時發生錯誤: {e}", exc_info=True)
             raise